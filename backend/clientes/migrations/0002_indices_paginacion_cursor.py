@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='clientes_cl_apellid_894bd6_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['apellido', 'nombre', 'id'], name='clientes_cl_apellid_658798_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contacto',
+            index=models.Index(fields=['fecha', 'id'], name='clientes_co_fecha_a606b8_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_indices_paginacion_cursor'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['ultima_actualizacion'], name='clientes_cl_ultima__d5d529_idx'),
+        ),
+    ]
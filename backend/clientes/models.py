@@ -37,10 +37,11 @@ class Cliente(models.Model):
         verbose_name_plural = "Clientes"
         ordering = ['apellido', 'nombre']
         indexes = [
-            models.Index(fields=['apellido', 'nombre']),
+            models.Index(fields=['apellido', 'nombre', 'id']),
             models.Index(fields=['numero_documento']),
             models.Index(fields=['email']),
             models.Index(fields=['telefono']),
+            models.Index(fields=['ultima_actualizacion']),
         ]
     
     def __str__(self):
@@ -84,6 +85,9 @@ class Contacto(models.Model):
         verbose_name = "Contacto"
         verbose_name_plural = "Contactos"
         ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['fecha', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.get_tipo_display()} con {self.cliente} - {self.fecha.strftime('%d/%m/%Y')}"
\ No newline at end of file
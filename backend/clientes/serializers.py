@@ -1,15 +1,20 @@
+from django.db.models import CharField, Value
+from django.db.models.functions import Concat
 from rest_framework import serializers
+from san_pedrito.campos import CamposDinamicosMixin
 from .models import Cliente, Contacto
 
-class ClienteListSerializer(serializers.ModelSerializer):
+class ClienteListSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializador para listar clientes con información básica"""
     class Meta:
         model = Cliente
         fields = ['id', 'nombre', 'apellido', 'nombre_completo', 'telefono', 
                   'email', 'localidad', 'activo', 'fecha_registro']
         read_only_fields = ['id', 'nombre_completo', 'fecha_registro']
+        dependencias = {'nombre_completo': ['nombre', 'apellido']}
+        anotaciones = {'nombre_completo': Concat('nombre', Value(' '), 'apellido', output_field=CharField())}
 
-class ClienteDetailSerializer(serializers.ModelSerializer):
+class ClienteDetailSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializador para ver detalles completos de un cliente"""
     total_compras = serializers.ReadOnlyField()
     monto_total_compras = serializers.ReadOnlyField()
@@ -22,6 +27,11 @@ class ClienteDetailSerializer(serializers.ModelSerializer):
                   'fecha_registro', 'ultima_actualizacion', 'total_compras', 'monto_total_compras']
         read_only_fields = ['id', 'nombre_completo', 'fecha_registro', 
                            'ultima_actualizacion', 'total_compras', 'monto_total_compras']
+        dependencias = {
+            'nombre_completo': ['nombre', 'apellido'],
+            'total_compras': ['ventas'],
+            'monto_total_compras': ['ventas'],
+        }
 
 class ClienteCreateUpdateSerializer(serializers.ModelSerializer):
     """Serializador para crear y actualizar clientes"""
@@ -57,7 +67,7 @@ class ClienteCreateUpdateSerializer(serializers.ModelSerializer):
                     raise serializers.ValidationError("Ya existe un cliente con este número de documento")
         return value
 
-class ContactoSerializer(serializers.ModelSerializer):
+class ContactoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializador para contactos con clientes"""
     tipo_display = serializers.ReadOnlyField(source='get_tipo_display')
     
@@ -66,6 +76,7 @@ class ContactoSerializer(serializers.ModelSerializer):
         fields = ['id', 'cliente', 'tipo', 'tipo_display', 'fecha', 'asunto', 
                   'descripcion', 'realizado_por', 'seguimiento_requerido', 'fecha_seguimiento']
         read_only_fields = ['id', 'fecha', 'tipo_display']
+        expandibles = {'cliente': ClienteListSerializer}
 
 class ContactoCreateSerializer(serializers.ModelSerializer):
     """Serializador para crear contactos"""
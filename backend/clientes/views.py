@@ -13,8 +13,11 @@ from .serializers import (
     ContactoCreateSerializer
 )
 from .filters import ClienteFilter, ContactoFilter
+from san_pedrito.paginacion import PaginacionSeleccionable
+from san_pedrito.campos import CamposDinamicosViewMixin
+from san_pedrito.lectura import ListadoRapidoMixin
 
-class ClienteViewSet(viewsets.ModelViewSet):
+class ClienteViewSet(ListadoRapidoMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar clientes"""
     queryset = Cliente.objects.all()
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -22,6 +25,8 @@ class ClienteViewSet(viewsets.ModelViewSet):
     search_fields = ['nombre', 'apellido', 'email', 'telefono', 'numero_documento']
     ordering_fields = ['apellido', 'nombre', 'fecha_registro', 'ultima_actualizacion']
     ordering = ['apellido', 'nombre']
+    pagination_class = PaginacionSeleccionable
+    orden_cursor = ('apellido', 'nombre', 'id')
 
     def get_permissions(self):
         if self.action == 'create':
@@ -104,7 +109,7 @@ class ClienteViewSet(viewsets.ModelViewSet):
         serializer = ContactoSerializer(contactos, many=True)
         return Response(serializer.data)
 
-class ContactoViewSet(viewsets.ModelViewSet):
+class ContactoViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar contactos con clientes"""
     queryset = Contacto.objects.all()
     permission_classes = [IsAuthenticated]
@@ -113,6 +118,8 @@ class ContactoViewSet(viewsets.ModelViewSet):
     search_fields = ['asunto', 'descripcion', 'cliente__nombre', 'cliente__apellido']
     ordering_fields = ['fecha', 'tipo', 'seguimiento_requerido', 'fecha_seguimiento']
     ordering = ['-fecha']
+    pagination_class = PaginacionSeleccionable
+    orden_cursor = ('-fecha', '-id')
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -0,0 +1,24 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Evento
+
+@admin.register(Evento)
+class EventoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'estado', 'intentos', 'creado', 'disponible_desde', 'procesado')
+    list_filter = ('estado', 'tipo')
+    search_fields = ('tipo',)
+    date_hierarchy = 'creado'
+    readonly_fields = ('tipo', 'datos', 'estado', 'intentos', 'error', 'disponible_desde',
+                       'reclamado_por', 'reclamado_hasta', 'creado', 'procesado')
+    actions = ['reintentar']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.action(description="Reintentar los eventos seleccionados")
+    def reintentar(self, request, queryset):
+        cantidad = queryset.exclude(estado='PROCESADO').update(
+            estado='PENDIENTE', intentos=0, disponible_desde=timezone.now(),
+            reclamado_por=None, reclamado_hasta=None
+        )
+        self.message_user(request, f"{cantidad} eventos vuelven a estar pendientes.")
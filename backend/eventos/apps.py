@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class EventosConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'eventos'
+    verbose_name = 'Eventos del Sistema'
+    
+    def ready(self):
+        # Registrar los manejadores definidos en el módulo manejadores.py de cada app
+        autodiscover_modules('manejadores')
@@ -0,0 +1,47 @@
+import time
+from django.core.management.base import BaseCommand
+from eventos.outbox import procesar_pendientes, purgar_procesados
+
+
+class Command(BaseCommand):
+    help = "Procesa los eventos pendientes del outbox con los manejadores registrados"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=100,
+            help="Cantidad de eventos a reservar por vez (por defecto 100)"
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=2.0,
+            help="Segundos de espera cuando no hay eventos pendientes (por defecto 2)"
+        )
+        parser.add_argument(
+            '--una-vez', action='store_true',
+            help="Procesa los eventos pendientes y termina, en lugar de quedar esperando"
+        )
+        parser.add_argument(
+            '--purgar-dias', type=int, default=7,
+            help="Elimina los eventos procesados hace más de estos días (0 para no purgar)"
+        )
+
+    def handle(self, *args, **options):
+        total_procesados = total_fallidos = 0
+        try:
+            while True:
+                procesados, fallidos = procesar_pendientes(options['lote'])
+                total_procesados += procesados
+                total_fallidos += fallidos
+                if procesados or fallidos:
+                    self.stdout.write(f"Procesados: {procesados}, con error: {fallidos}")
+                    continue
+                # Sin eventos disponibles
+                if options['purgar_dias']:
+                    purgar_procesados(options['purgar_dias'])
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f"Eventos procesados: {total_procesados}, con error: {total_fallidos}"
+        ))
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Evento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=100)),
+                ('datos', models.JSONField(blank=True, default=dict)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESADO', 'Procesado'), ('FALLIDO', 'Fallido')], default='PENDIENTE', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True, help_text='Último error al procesar el evento', null=True)),
+                ('disponible_desde', models.DateTimeField(default=django.utils.timezone.now, help_text='No se procesa antes de esta fecha (espera entre reintentos)')),
+                ('reclamado_por', models.CharField(blank=True, help_text='Worker que tomó el evento', max_length=32, null=True)),
+                ('reclamado_hasta', models.DateTimeField(blank=True, help_text='Vencimiento de la reserva del worker', null=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('procesado', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Evento',
+                'verbose_name_plural': 'Eventos',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['estado', 'disponible_desde'], name='eventos_eve_estado_abdf19_idx'), models.Index(fields=['reclamado_por'], name='eventos_eve_reclama_573eef_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import models
+from django.utils import timezone
+
+class Evento(models.Model):
+    """
+    Evento de dominio pendiente de procesar (outbox transaccional).
+
+    Se inserta en la misma transacción que el cambio que lo origina, así que existe
+    si y solo si ese cambio se confirmó. El worker (manage.py procesar_eventos) lo
+    toma y lo pasa a los manejadores registrados para su tipo.
+    """
+    ESTADO_CHOICES = (
+        ('PENDIENTE', 'Pendiente'),
+        ('PROCESADO', 'Procesado'),
+        ('FALLIDO', 'Fallido'),
+    )
+    
+    tipo = models.CharField(max_length=100)
+    datos = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PENDIENTE')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, null=True, help_text="Último error al procesar el evento")
+    disponible_desde = models.DateTimeField(default=timezone.now, help_text="No se procesa antes de esta fecha (espera entre reintentos)")
+    reclamado_por = models.CharField(max_length=32, blank=True, null=True, help_text="Worker que tomó el evento")
+    reclamado_hasta = models.DateTimeField(blank=True, null=True, help_text="Vencimiento de la reserva del worker")
+    creado = models.DateTimeField(auto_now_add=True)
+    procesado = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        verbose_name = "Evento"
+        verbose_name_plural = "Eventos"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['estado', 'disponible_desde']),
+            models.Index(fields=['reclamado_por']),
+        ]
+    
+    def __str__(self):
+        return f"{self.tipo} #{self.id} ({self.get_estado_display()})"
@@ -0,0 +1,125 @@
+"""
+Outbox transaccional de eventos de dominio.
+
+publicar() inserta el evento en la transacción en curso, junto con el cambio que lo
+origina (una venta, un movimiento de stock, ...). Los efectos secundarios pesados se
+registran como manejadores con @manejador('tipo') en el módulo manejadores.py de cada
+app y los ejecuta el worker (manage.py procesar_eventos) fuera del request.
+
+El worker reserva lotes de eventos por un tiempo limitado: en PostgreSQL con
+SELECT ... FOR UPDATE SKIP LOCKED, de modo que varios workers no compiten por las mismas
+filas; en SQLite con un UPDATE condicional sobre la reserva. Si un manejador falla, el
+evento se reintenta más tarde con espera exponencial hasta EVENTOS_MAXIMO_INTENTOS. Los
+manejadores deben ser idempotentes: un evento puede procesarse más de una vez si el
+worker se detiene a mitad de camino.
+"""
+import logging
+import traceback
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Evento
+
+logger = logging.getLogger(__name__)
+
+DURACION_RESERVA = timedelta(minutes=5)
+
+_manejadores = defaultdict(list)
+
+
+def manejador(tipo):
+    """Decorador que registra una función para procesar los eventos del tipo indicado"""
+    def registrar(funcion):
+        if funcion not in _manejadores[tipo]:
+            _manejadores[tipo].append(funcion)
+        return funcion
+    return registrar
+
+
+def manejadores(tipo):
+    return list(_manejadores.get(tipo, ()))
+
+
+def publicar(tipo, datos=None):
+    """
+    Registra un evento en la transacción en curso y lo retorna.
+
+    Se inserta aunque este proceso no tenga manejadores para el tipo: los manejadores
+    que importan son los del worker, que pueden estar en otro módulo o llegar en un
+    despliegue posterior. Los eventos sin manejadores en el worker se marcan procesados
+    (y se purgan con los demás).
+    """
+    return Evento.objects.create(tipo=tipo, datos=datos or {})
+
+
+def _espera(intentos):
+    """Espera exponencial entre reintentos: 30s, 1m, 2m, ... hasta 1 hora"""
+    return timedelta(seconds=min(30 * 2 ** (intentos - 1), 3600))
+
+
+def reclamar(lote=100, duracion=DURACION_RESERVA):
+    """Reserva hasta `lote` eventos pendientes para este worker y los retorna"""
+    ahora = timezone.now()
+    token = uuid.uuid4().hex
+    libre = Q(reclamado_hasta__isnull=True) | Q(reclamado_hasta__lt=ahora)
+    with transaction.atomic():
+        candidatos = Evento.objects.filter(libre, estado='PENDIENTE', disponible_desde__lte=ahora).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            candidatos = candidatos.select_for_update(skip_locked=True)
+        ids = list(candidatos.values_list('id', flat=True)[:lote])
+        if not ids:
+            return []
+        # En SQLite no hay bloqueo de filas: el UPDATE condicional evita reservar dos veces
+        Evento.objects.filter(libre, id__in=ids).update(reclamado_por=token, reclamado_hasta=ahora + duracion)
+    return list(Evento.objects.filter(reclamado_por=token, estado='PENDIENTE').order_by('id'))
+
+
+def procesar(evento):
+    """Ejecuta los manejadores del evento y registra el resultado. Retorna True si se procesó."""
+    try:
+        with transaction.atomic():
+            for funcion in manejadores(evento.tipo):
+                funcion(evento)
+    except Exception:
+        evento.intentos += 1
+        evento.error = traceback.format_exc()[-4000:]
+        evento.reclamado_por = None
+        evento.reclamado_hasta = None
+        if evento.intentos >= getattr(settings, 'EVENTOS_MAXIMO_INTENTOS', 8):
+            evento.estado = 'FALLIDO'
+            logger.error("El evento %s falló %s veces y no se reintentará", evento, evento.intentos)
+        else:
+            evento.disponible_desde = timezone.now() + _espera(evento.intentos)
+            logger.warning("Error procesando el evento %s (intento %s)", evento, evento.intentos)
+        evento.save(update_fields=['intentos', 'error', 'estado', 'disponible_desde', 'reclamado_por', 'reclamado_hasta'])
+        return False
+
+    evento.estado = 'PROCESADO'
+    evento.procesado = timezone.now()
+    evento.error = None
+    evento.reclamado_por = None
+    evento.reclamado_hasta = None
+    evento.save(update_fields=['estado', 'procesado', 'error', 'reclamado_por', 'reclamado_hasta'])
+    return True
+
+
+def procesar_pendientes(lote=100):
+    """Reserva y procesa un lote de eventos. Retorna (procesados, fallidos)."""
+    procesados = fallidos = 0
+    for evento in reclamar(lote):
+        if procesar(evento):
+            procesados += 1
+        else:
+            fallidos += 1
+    return procesados, fallidos
+
+
+def purgar_procesados(dias=7):
+    """Elimina los eventos procesados hace más de `dias` días. Retorna la cantidad eliminada."""
+    limite = timezone.now() - timedelta(days=dias)
+    eliminados, _ = Evento.objects.filter(estado='PROCESADO', procesado__lt=limite).delete()
+    return eliminados
@@ -0,0 +1,103 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from prendas.models import Categoria, Talla, Color, Prenda, VariantePrenda
+from prendas.stock import modificar_stock
+from . import outbox
+from .models import Evento
+
+class OutboxTests(TestCase):
+    """Pruebas para la publicación y el procesamiento de eventos del outbox"""
+
+    def setUp(self):
+        self.recibidos = []
+
+    def registrar(self, tipo, funcion=None):
+        funcion = funcion or (lambda evento: self.recibidos.append(evento.datos))
+        outbox.manejador(tipo)(funcion)
+        self.addCleanup(outbox._manejadores[tipo].remove, funcion)
+
+    def test_sin_manejadores_se_guarda(self):
+        """Prueba que un evento sin manejadores se guarda igual y el worker lo completa"""
+        evento = outbox.publicar('prueba.sin_manejador', {'valor': 1})
+        self.assertEqual(Evento.objects.get(), evento)
+
+        self.assertEqual(outbox.procesar_pendientes(), (1, 0))
+        evento.refresh_from_db()
+        self.assertEqual(evento.estado, 'PROCESADO')
+
+    def test_publicar_y_procesar(self):
+        """Prueba que el worker pasa el evento a sus manejadores y lo marca procesado"""
+        self.registrar('prueba.ok')
+        outbox.publicar('prueba.ok', {'valor': 1})
+
+        self.assertEqual(outbox.procesar_pendientes(), (1, 0))
+        self.assertEqual(self.recibidos, [{'valor': 1}])
+        evento = Evento.objects.get()
+        self.assertEqual(evento.estado, 'PROCESADO')
+        self.assertIsNone(evento.reclamado_por)
+        self.assertEqual(outbox.procesar_pendientes(), (0, 0))
+
+    def test_rollback_descarta_evento(self):
+        """Prueba que el evento no existe si la transacción que lo publicó se revierte"""
+        self.registrar('prueba.ok')
+        try:
+            with transaction.atomic():
+                outbox.publicar('prueba.ok', {'valor': 1})
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(Evento.objects.exists())
+
+    @override_settings(EVENTOS_MAXIMO_INTENTOS=2)
+    def test_reintentos_con_espera(self):
+        """Prueba que un manejador que falla se reintenta más tarde y luego queda fallido"""
+        def fallar(evento):
+            raise ValueError("falla de prueba")
+        self.registrar('prueba.falla', fallar)
+        outbox.publicar('prueba.falla')
+
+        with self.assertLogs('eventos.outbox', 'WARNING'):
+            self.assertEqual(outbox.procesar_pendientes(), (0, 1))
+        evento = Evento.objects.get()
+        self.assertEqual((evento.estado, evento.intentos), ('PENDIENTE', 1))
+        self.assertIn('falla de prueba', evento.error)
+        self.assertGreater(evento.disponible_desde, timezone.now())
+        # Todavía en espera
+        self.assertEqual(outbox.procesar_pendientes(), (0, 0))
+
+        Evento.objects.update(disponible_desde=timezone.now())
+        with self.assertLogs('eventos.outbox', 'ERROR'):
+            outbox.procesar_pendientes()
+        evento.refresh_from_db()
+        self.assertEqual((evento.estado, evento.intentos), ('FALLIDO', 2))
+
+    def test_reserva_excluye_otros_workers(self):
+        """Prueba que un evento reservado no lo toma otro worker hasta que vence la reserva"""
+        self.registrar('prueba.ok')
+        outbox.publicar('prueba.ok')
+
+        self.assertEqual(len(outbox.reclamar()), 1)
+        self.assertEqual(outbox.reclamar(), [])
+
+        Evento.objects.update(reclamado_hasta=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(outbox.reclamar()), 1)
+
+    def test_movimiento_de_stock_publica_evento(self):
+        """Prueba que los cambios de stock publican stock.modificado en su transacción"""
+        self.registrar('stock.modificado')
+        prenda = Prenda.objects.create(
+            nombre='Remera', categoria=Categoria.objects.create(nombre='Remeras'),
+            precio_costo=Decimal('100'), precio_venta=Decimal('200')
+        )
+        variante = VariantePrenda.objects.create(
+            prenda=prenda, talla=Talla.objects.create(nombre='2 años', orden=1),
+            color=Color.objects.create(nombre='Rojo'), stock=5
+        )
+        modificar_stock({variante.id: -2}, 'AJUSTE', referencia='prueba')
+
+        outbox.procesar_pendientes()
+        self.assertEqual(self.recibidos[-1]['variantes'], {str(variante.id): -2})
+        self.assertEqual(self.recibidos[-1]['motivo'], 'AJUSTE')
@@ -1,10 +1,10 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Categoria, Talla, Color, Prenda, VariantePrenda, ImagenPrenda
+from .models import Categoria, Talla, Color, Prenda, VariantePrenda, ImagenPrenda, MovimientoStock, AlertaStock
 
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'slug', 'creado', 'actualizado')
+    list_display = ('nombre', 'slug', 'umbral_stock', 'creado', 'actualizado')
     search_fields = ('nombre', 'descripcion')
     prepopulated_fields = {'slug': ('nombre',)}
     readonly_fields = ('creado', 'actualizado')
@@ -44,6 +44,7 @@ class ImagenPrendaInline(admin.TabularInline):
 class PrendaAdmin(admin.ModelAdmin):
     list_display = ('codigo', 'nombre', 'categoria', 'precio_venta', 'stock_total', 'tiene_stock', 'activo')
     list_filter = ('categoria', 'genero', 'activo')
+    list_select_related = ('categoria',)
     search_fields = ('nombre', 'codigo', 'descripcion')
     readonly_fields = ('codigo', 'slug', 'creado', 'actualizado', 'stock_total', 'tiene_stock', 'margen_ganancia')
     prepopulated_fields = {'slug': ('nombre',)}
@@ -59,7 +60,7 @@ class PrendaAdmin(admin.ModelAdmin):
             'fields': ('imagen_principal',)
         }),
         ('Información adicional', {
-            'fields': ('stock_total', 'tiene_stock', 'creado', 'actualizado')
+            'fields': ('stock_total', 'tiene_stock', 'umbral_stock', 'creado', 'actualizado')
         }),
     )
     
@@ -67,6 +68,12 @@ class PrendaAdmin(admin.ModelAdmin):
         if obj:  # Edición
             return self.readonly_fields
         return ('creado', 'actualizado', 'stock_total', 'tiene_stock', 'margen_ganancia')  # Creación
+    
+    def save_formset(self, request, form, formset, change):
+        # Registrar el usuario en los movimientos de stock de las variantes editadas
+        for formulario in formset.forms:
+            formulario.instance.usuario_movimiento = request.user
+        super().save_formset(request, form, formset, change)
 
 @admin.register(VariantePrenda)
 class VariantePrendaAdmin(admin.ModelAdmin):
@@ -76,6 +83,11 @@ class VariantePrendaAdmin(admin.ModelAdmin):
     readonly_fields = ('codigo_barras', 'creado', 'actualizado')
     list_editable = ('stock', 'activo')
     autocomplete_fields = ('prenda', 'talla', 'color')
+    
+    def save_model(self, request, obj, form, change):
+        # Registrar el usuario en el movimiento de stock
+        obj.usuario_movimiento = request.user
+        super().save_model(request, obj, form, change)
 
 @admin.register(ImagenPrenda)
 class ImagenPrendaAdmin(admin.ModelAdmin):
@@ -89,4 +101,39 @@ class ImagenPrendaAdmin(admin.ModelAdmin):
         if obj.imagen:
             return format_html('<img src="{}" height="50" />', obj.imagen.url)
         return "-"
-    miniatura.short_description = 'Imagen'
\ No newline at end of file
+    miniatura.short_description = 'Imagen'
+
+@admin.register(MovimientoStock)
+class MovimientoStockAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'variante', 'motivo', 'cantidad', 'referencia', 'usuario')
+    list_filter = ('motivo', 'fecha', 'variante__prenda__categoria')
+    search_fields = ('variante__codigo_barras', 'variante__prenda__nombre', 'referencia')
+    list_select_related = ('variante__prenda', 'variante__talla', 'variante__color', 'usuario')
+    date_hierarchy = 'fecha'
+    
+    # El libro de movimientos es de solo lectura
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(AlertaStock)
+class AlertaStockAdmin(admin.ModelAdmin):
+    list_display = ('variante', 'stock', 'umbral', 'desde')
+    list_filter = ('variante__prenda__categoria',)
+    search_fields = ('variante__codigo_barras', 'variante__prenda__nombre')
+    list_select_related = ('variante__prenda', 'variante__talla', 'variante__color')
+    
+    # Las alertas se calculan a partir del stock y los umbrales
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
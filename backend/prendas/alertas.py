@@ -0,0 +1,74 @@
+"""
+Alertas de stock bajo.
+
+El umbral de cada variante es el propio, o el de su prenda, o el de su categoría, o
+STOCK_UMBRAL_POR_DEFECTO. La tabla AlertaStock contiene solo las variantes activas
+(de prendas activas) con stock menor o igual a su umbral, incluidas las agotadas, y se
+actualiza para las variantes afectadas cada vez que cambia su stock o su umbral. Así
+el listado y el contador de alertas dependen de la cantidad de alertas y no del
+tamaño del catálogo.
+
+Cambiar STOCK_UMBRAL_POR_DEFECTO no toca ninguna variante: después hay que ejecutar
+manage.py reconstruir_alertas.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import VariantePrenda, AlertaStock
+
+
+def umbral_por_defecto():
+    return getattr(settings, 'STOCK_UMBRAL_POR_DEFECTO', 5)
+
+
+def anotar_umbral(variantes):
+    """Anota umbral_efectivo en un queryset de variantes"""
+    return variantes.annotate(
+        umbral_efectivo=Coalesce(
+            'umbral_stock', 'prenda__umbral_stock', 'prenda__categoria__umbral_stock',
+            Value(umbral_por_defecto())
+        )
+    )
+
+
+def actualizar_alertas(variante_ids):
+    """Agrega o quita de las alertas a las variantes indicadas según su stock y umbral actuales"""
+    variante_ids = set(variante_ids)
+    if not variante_ids:
+        return
+    en_alerta = list(
+        anotar_umbral(VariantePrenda.objects.filter(pk__in=variante_ids))
+        .filter(activo=True, prenda__activo=True, stock__lte=F('umbral_efectivo'))
+        .values_list('pk', 'stock', 'umbral_efectivo')
+    )
+    AlertaStock.objects.filter(variante_id__in=variante_ids - {pk for pk, _, _ in en_alerta}).delete()
+    if en_alerta:
+        ahora = timezone.now()
+        # Las que ya estaban en alerta conservan su fecha de inicio
+        AlertaStock.objects.bulk_create(
+            [AlertaStock(variante_id=pk, stock=stock, umbral=umbral, desde=ahora) for pk, stock, umbral in en_alerta],
+            update_conflicts=True,
+            unique_fields=['variante'],
+            update_fields=['stock', 'umbral'],
+        )
+
+
+def actualizar_alertas_de_prendas(filtro, lote=1000):
+    """Recalcula las alertas de las variantes de las prendas que cumplen el filtro (ej. {'categoria': c})"""
+    ids = list(
+        VariantePrenda.objects.filter(**{f'prenda__{campo}': valor for campo, valor in filtro.items()})
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    for inicio in range(0, len(ids), lote):
+        actualizar_alertas(ids[inicio:inicio + lote])
+
+
+def reconstruir_alertas(lote=1000):
+    """Recalcula las alertas de todas las variantes (por lotes). Retorna la cantidad en alerta."""
+    ids = list(VariantePrenda.objects.order_by('pk').values_list('pk', flat=True))
+    for inicio in range(0, len(ids), lote):
+        with transaction.atomic():
+            actualizar_alertas(ids[inicio:inicio + lote])
+    return AlertaStock.objects.count()
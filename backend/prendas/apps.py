@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class PrendasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'prendas'
-    verbose_name = 'Gestión de Prendas'
\ No newline at end of file
+    verbose_name = 'Gestión de Prendas'
+    
+    def ready(self):
+        import prendas.signals
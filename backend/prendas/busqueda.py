@@ -0,0 +1,166 @@
+"""
+Motor de búsqueda de prendas.
+
+Cada prenda tiene un DocumentoBusqueda con su texto normalizado (minúsculas y sin
+acentos). Sobre esa tabla se indexa según la base de datos:
+
+- PostgreSQL: índice GIN sobre to_tsvector('spanish', texto) y otro GIN con
+  gin_trgm_ops para coincidencias aproximadas (pg_trgm).
+- SQLite: tabla virtual FTS5 mantenida por triggers.
+
+Ambos backends exponen la misma interfaz: filtrar() restringe un queryset de prendas a
+las que coinciden con la consulta y lo ordena por relevancia. Los demás filtros de la
+vista (activo, categoría, stock) y la paginación se aplican en esa misma consulta, así
+que no hay un tope de resultados que se consuman prendas que después se descartan y el
+total de la paginación es el real.
+"""
+import re
+import unicodedata
+from abc import ABC, abstractmethod
+from django.db import connection
+from django.db.models import BooleanField, F, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+from .models import Prenda, VariantePrenda, DocumentoBusqueda
+
+TABLA_FTS_SQLITE = 'prendas_busqueda_fts'
+
+_TERMINO = re.compile(r'\w+', re.UNICODE)
+
+
+def normalizar(texto):
+    """Pasa el texto a minúsculas y le quita los acentos"""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def terminos(consulta):
+    """Separa la consulta en términos normalizados, descartando operadores y signos"""
+    return _TERMINO.findall(normalizar(consulta))
+
+
+def actualizar_documentos(prenda_ids):
+    """Regenera los documentos de búsqueda de las prendas indicadas en pocas consultas"""
+    prenda_ids = set(prenda_ids)
+    if not prenda_ids:
+        return 0
+
+    prendas = Prenda.objects.filter(pk__in=prenda_ids).values_list(
+        'pk', 'nombre', 'descripcion', 'codigo', 'categoria__nombre'
+    )
+    variantes = VariantePrenda.objects.filter(prenda_id__in=prenda_ids).values_list(
+        'prenda_id', 'talla__nombre', 'color__nombre', 'codigo_barras'
+    ).order_by()
+
+    extras = {}
+    for prenda_id, *valores in variantes:
+        extras.setdefault(prenda_id, set()).update(v for v in valores if v)
+
+    documentos = []
+    for pk, nombre, descripcion, codigo, categoria in prendas:
+        partes = [nombre, codigo, categoria, descripcion, *sorted(extras.get(pk, ()))]
+        texto = normalizar(' '.join(p for p in partes if p))
+        documentos.append(DocumentoBusqueda(prenda_id=pk, texto=texto))
+
+    DocumentoBusqueda.objects.bulk_create(
+        documentos,
+        update_conflicts=True,
+        unique_fields=['prenda'],
+        update_fields=['texto', 'actualizado'],
+    )
+    return len(documentos)
+
+
+class BackendBusqueda(ABC):
+    """Interfaz común de los backends de búsqueda"""
+
+    @abstractmethod
+    def filtrar(self, queryset, consulta):
+        """Restringe el queryset de prendas a las coincidencias, ordenadas por relevancia"""
+
+
+class PostgresBusqueda(BackendBusqueda):
+    """Búsqueda con tsvector (ranking por ts_rank) y pg_trgm para tolerar errores de tipeo"""
+
+    def filtrar(self, queryset, consulta):
+        palabras = terminos(consulta)
+        if not palabras:
+            return queryset.none()
+        texto = ' '.join(palabras)
+        documento = F('documento_busqueda__texto')
+        # Mismas expresiones que los índices GIN de la migración 0003
+        vector = Func(Value('spanish'), documento, function='to_tsvector')
+        tsquery = Func(Value('spanish'), Value(' & '.join(f'{p}:*' for p in palabras)), function='to_tsquery')
+        coincide = Func(vector, tsquery, template='(%(expressions)s)', arg_joiner=' @@ ', output_field=BooleanField())
+        similar = Func(Value(texto), documento, template='(%(expressions)s)', arg_joiner=' <%% ', output_field=BooleanField())
+        relevancia = (
+            Func(vector, tsquery, function='ts_rank', output_field=FloatField())
+            + Func(Value(texto), documento, function='word_similarity', output_field=FloatField())
+        )
+        return (
+            queryset.alias(coincide=coincide, similar=similar, relevancia=relevancia)
+            .filter(Q(coincide=True) | Q(similar=True))
+            .order_by('-relevancia', '-pk')
+        )
+
+
+class SQLiteBusqueda(BackendBusqueda):
+    """Búsqueda con FTS5 ordenada por bm25"""
+
+    def filtrar(self, queryset, consulta):
+        palabras = terminos(consulta)
+        if not palabras:
+            return queryset.none()
+        match = ' '.join(f'"{p}"*' for p in palabras)
+        prenda = f"{connection.ops.quote_name(Prenda._meta.db_table)}.{connection.ops.quote_name('id')}"
+        # bm25 es menor cuanto más relevante
+        relevancia = RawSQL(
+            f"SELECT bm25({TABLA_FTS_SQLITE}) FROM {TABLA_FTS_SQLITE} "
+            f"WHERE {TABLA_FTS_SQLITE} MATCH %s AND rowid = {prenda}",
+            [match], output_field=FloatField()
+        )
+        return (
+            queryset.filter(pk__in=RawSQL(f"SELECT rowid FROM {TABLA_FTS_SQLITE} WHERE {TABLA_FTS_SQLITE} MATCH %s", [match]))
+            .alias(relevancia=relevancia)
+            .order_by('relevancia', '-pk')
+        )
+
+
+class TextoBusqueda(BackendBusqueda):
+    """Búsqueda por coincidencia parcial sobre el documento, para bases sin índices de texto"""
+
+    def filtrar(self, queryset, consulta):
+        palabras = terminos(consulta)
+        if not palabras:
+            return queryset.none()
+        for palabra in palabras:
+            queryset = queryset.filter(documento_busqueda__texto__contains=palabra)
+        return queryset.order_by('-pk')
+
+
+_fts_disponible = None
+
+
+def _tabla_fts_disponible():
+    """Indica si la tabla FTS5 existe (SQLite puede estar compilado sin FTS5)"""
+    global _fts_disponible
+    if _fts_disponible is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLA_FTS_SQLITE])
+            _fts_disponible = cursor.fetchone() is not None
+    return _fts_disponible
+
+
+def obtener_backend():
+    """Retorna el backend de búsqueda adecuado para la base de datos en uso"""
+    if connection.vendor == 'postgresql':
+        return PostgresBusqueda()
+    if connection.vendor == 'sqlite' and _tabla_fts_disponible():
+        return SQLiteBusqueda()
+    return TextoBusqueda()
+
+
+def buscar_prendas(queryset, consulta):
+    """Restringe el queryset de prendas a las que coinciden con la consulta, por relevancia"""
+    return obtener_backend().filtrar(queryset, consulta)
@@ -0,0 +1,104 @@
+"""
+Caches en memoria de cada proceso con invalidación global.
+
+Cada cache guarda sus datos en un diccionario local del proceso (sin red ni
+serialización) y los asocia a un número de versión guardado en la cache de Django,
+compartida entre procesos si se configura un backend compartido. Al modificar los
+datos de origen se incrementa la versión y todos los procesos descartan su copia
+local en la siguiente lectura.
+
+Con por_clave=True cada clave tiene además su propia versión global, de modo que un
+cambio puede descartar solo las entradas afectadas (invalidar(claves)) sin vaciar la
+cache de todos los procesos.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+from django.db import transaction
+
+
+class CacheLocalVersionada:
+    """Cache LRU local al proceso, invalidada por un número de versión global"""
+
+    def __init__(self, nombre, maximo=10000, por_clave=False):
+        self.nombre = nombre
+        self.clave_version = f'san_pedrito:version:{nombre}'
+        self.maximo = maximo
+        self.por_clave = por_clave
+        self._datos = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def version(self):
+        """Retorna la versión global vigente de la cache"""
+        return self._versiones([self.clave_version])[self.clave_version]
+
+    def _clave_version(self, clave):
+        return f'{self.clave_version}:{clave}'
+
+    def _versiones(self, claves_version):
+        """Lee las versiones de la cache de Django en una consulta, iniciando las que falten"""
+        versiones = cache.get_many(claves_version)
+        for clave_version in claves_version:
+            if versiones.get(clave_version) is None:
+                cache.add(clave_version, self._version_inicial(), timeout=None)
+                versiones[clave_version] = cache.get(clave_version)
+        return versiones
+
+    @staticmethod
+    def _version_inicial():
+        # Basada en el reloj para no repetir una versión anterior si la clave fue desalojada
+        return int(time.time() * 1000)
+
+    def obtener(self, clave, cargar):
+        """Retorna el valor cacheado para la clave, o lo calcula con cargar() si no está"""
+        if self.por_clave:
+            clave_version = self._clave_version(clave)
+            versiones = self._versiones([self.clave_version, clave_version])
+            version, version_clave = versiones[self.clave_version], versiones[clave_version]
+        else:
+            version, version_clave = self.version(), None
+        with self._lock:
+            if version != self._version:
+                self._datos.clear()
+                self._version = version
+            entrada = self._datos.get(clave)
+            if entrada is not None and entrada[0] == version_clave:
+                self._datos.move_to_end(clave)
+                return entrada[1]
+
+        valor = cargar()
+
+        with self._lock:
+            if version == self._version:
+                self._datos[clave] = (version_clave, valor)
+                self._datos.move_to_end(clave)
+                if len(self._datos) > self.maximo:
+                    self._datos.popitem(last=False)
+        return valor
+
+    def invalidar(self, claves=None):
+        """
+        Incrementa la versión global (o la de cada una de las claves, con por_clave=True)
+        apenas se confirme la transacción en curso.
+        """
+        if claves is None:
+            transaction.on_commit(self._incrementar_version)
+            return
+        claves_version = {self._clave_version(clave) for clave in claves if clave}
+        if claves_version:
+            transaction.on_commit(lambda: self._incrementar(claves_version))
+
+    def _incrementar_version(self):
+        self._incrementar([self.clave_version])
+        with self._lock:
+            self._datos.clear()
+            self._version = None
+
+    def _incrementar(self, claves_version):
+        for clave_version in claves_version:
+            try:
+                cache.incr(clave_version)
+            except ValueError:
+                cache.set(clave_version, self._version_inicial(), timeout=None)
@@ -0,0 +1,108 @@
+"""
+Búsqueda por código escaneado en el punto de venta.
+
+Resuelve un código de barras de variante (o un código de prenda) a un payload compacto
+con los datos necesarios para vender. Los datos de catálogo (prenda, precio, talla,
+color) se unen en una sola consulta y se guardan en una cache local del proceso con una
+versión por código: al modificar una variante o una prenda se descartan solo sus códigos,
+y al modificar una talla o un color, todos.
+
+El stock no se cachea: cambia con cada venta y lo modifican otros procesos (comandos de
+inventario, otros workers), así que se lee en cada escaneo con una consulta por clave
+primaria de las variantes del payload.
+"""
+from .cache import CacheLocalVersionada
+from .models import Prenda, VariantePrenda
+
+cache_escaneo = CacheLocalVersionada('escaneo', por_clave=True)
+
+CAMPOS_VARIANTE = (
+    'id', 'codigo_barras', 'activo',
+    'prenda_id', 'prenda__codigo', 'prenda__nombre', 'prenda__slug', 'prenda__precio_venta',
+    'prenda__activo', 'talla_id', 'talla__nombre', 'color_id', 'color__nombre', 'color__codigo_hex',
+)
+
+
+def _variante_payload(fila):
+    return {
+        'id': fila['id'],
+        'codigo_barras': fila['codigo_barras'],
+        'talla': fila['talla_id'],
+        'talla_nombre': fila['talla__nombre'],
+        'color': fila['color_id'],
+        'color_nombre': fila['color__nombre'],
+        'color_hex': fila['color__codigo_hex'],
+        'activo': fila['activo'],
+    }
+
+
+def _prenda_payload(fila):
+    return {
+        'id': fila['prenda_id'],
+        'codigo': fila['prenda__codigo'],
+        'nombre': fila['prenda__nombre'],
+        'slug': fila['prenda__slug'],
+        'precio_venta': str(fila['prenda__precio_venta']),
+        'activo': fila['prenda__activo'],
+    }
+
+
+def _cargar(codigo):
+    fila = VariantePrenda.objects.filter(codigo_barras=codigo).values(*CAMPOS_VARIANTE).first()
+    if fila is not None:
+        return {
+            'tipo': 'variante',
+            'prenda': _prenda_payload(fila),
+            'variante': _variante_payload(fila),
+        }
+
+    filas = list(
+        VariantePrenda.objects.filter(prenda__codigo=codigo)
+        .order_by('talla__orden', 'talla__nombre', 'color__nombre')
+        .values(*CAMPOS_VARIANTE)
+    )
+    if filas:
+        return {
+            'tipo': 'prenda',
+            'prenda': _prenda_payload(filas[0]),
+            'variantes': [_variante_payload(fila) for fila in filas],
+        }
+
+    prenda = Prenda.objects.filter(codigo=codigo).values(
+        'id', 'codigo', 'nombre', 'slug', 'precio_venta', 'activo'
+    ).first()
+    if prenda is not None:
+        prenda['precio_venta'] = str(prenda['precio_venta'])
+        return {'tipo': 'prenda', 'prenda': prenda, 'variantes': []}
+    return None
+
+
+def _con_stock(payload):
+    """Copia del payload cacheado con el stock actual de sus variantes"""
+    variantes = [payload['variante']] if payload['tipo'] == 'variante' else payload['variantes']
+    if not variantes:
+        return payload
+    stock = dict(VariantePrenda.objects.filter(pk__in=[v['id'] for v in variantes]).values_list('id', 'stock'))
+    actuales = []
+    for variante in variantes:
+        cantidad = stock.get(variante['id'], 0)
+        actuales.append(dict(variante, stock=cantidad, disponible=cantidad > 0 and variante['activo']))
+    if payload['tipo'] == 'variante':
+        return dict(payload, variante=actuales[0])
+    return dict(payload, variantes=actuales)
+
+
+def codigos_de_prendas(prenda_ids):
+    """Códigos escaneables de las prendas indicadas: los de las prendas y los de sus variantes"""
+    codigos = set(Prenda.objects.filter(pk__in=prenda_ids).values_list('codigo', flat=True))
+    codigos.update(VariantePrenda.objects.filter(prenda_id__in=prenda_ids).values_list('codigo_barras', flat=True))
+    return codigos - {None, ''}
+
+
+def escanear(codigo):
+    """Retorna el payload del código escaneado, o None si no corresponde a ninguna variante o prenda"""
+    codigo = codigo.strip()
+    if not codigo:
+        return None
+    payload = cache_escaneo.obtener(codigo, lambda: _cargar(codigo))
+    return None if payload is None else _con_stock(payload)
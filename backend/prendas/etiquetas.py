@@ -0,0 +1,318 @@
+"""
+Hojas de etiquetas para imprimir de variantes de prendas.
+
+Cada etiqueta lleva el código de barras de la variante como QR o Code128, el nombre
+de la prenda, la talla, el color y el precio. Las etiquetas se dibujan una por una
+como PNG en escala de grises y se arman en hojas A4 en blanco y negro (COLUMNAS ×
+FILAS por hoja) en un PDF de varias páginas o en el PNG de una página.
+
+Las etiquetas ya dibujadas se guardan en el storage con el hash de su contenido
+(etiquetas/<código>/<hash>.png), así que reimprimir la mercadería de un envío o las
+copias de una misma variante no vuelve a dibujarlas, y un cambio de precio o de nombre
+genera una clave nueva. El cache se puede borrar en cualquier momento; el comando
+purgar_etiquetas borra las que ya no corresponden a ninguna variante. Las que faltan se
+dibujan en el pool de procesos compartido (san_pedrito.procesos) cuando son al menos
+MINIMO_POOL.
+
+Cada hoja se guarda en blanco y negro (1 bit por píxel, ~480 KB por página A4) hasta
+armar el PDF, así que MAXIMO_ETIQUETAS limita la memoria de un pedido por la API.
+"""
+import hashlib
+import json
+from decimal import Decimal
+from functools import lru_cache
+from io import BytesIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageDraw, ImageFont
+import qrcode
+from san_pedrito.procesos import obtener_pool
+from .models import VariantePrenda
+
+CODIGOS = ('qr', 'code128')
+FORMATOS = {
+    'pdf': 'application/pdf',
+    'png': 'image/png',
+}
+VERSION = 1  # Cambiarla cuando cambia el diseño para no usar etiquetas viejas del cache
+
+DPI = 200
+HOJA = (1654, 2339)  # A4 a 200 dpi
+MARGEN_HOJA = 40
+COLUMNAS = 3
+FILAS = 8
+ETIQUETA = ((HOJA[0] - 2 * MARGEN_HOJA) // COLUMNAS, (HOJA[1] - 2 * MARGEN_HOJA) // FILAS)
+POR_HOJA = COLUMNAS * FILAS
+MARGEN = 16
+MINIMO_POOL = 16
+MAXIMO_ETIQUETAS = POR_HOJA * 50  # 50 páginas
+
+
+class EtiquetasInvalidas(ValueError):
+    """Las variantes pedidas no existen o sus códigos no se pueden imprimir"""
+
+
+# Anchos de barras y espacios de los símbolos Code128 (0-105) y del de fin
+PATRONES_CODE128 = (
+    '212222', '222122', '222221', '121223', '121322', '131222', '122213', '122312', '132212', '221213',
+    '221312', '231212', '112232', '122132', '122231', '113222', '123122', '123221', '223211', '221132',
+    '221231', '213212', '223112', '312131', '311222', '321122', '321221', '312212', '322112', '322211',
+    '212123', '212321', '232121', '111323', '131123', '131321', '112313', '132113', '132311', '211313',
+    '231113', '231311', '112133', '112331', '132131', '113123', '113321', '133121', '313121', '211331',
+    '231131', '213113', '213311', '213131', '311123', '311321', '331121', '312113', '312311', '332111',
+    '314111', '221411', '431111', '111224', '111422', '121124', '121421', '141122', '141221', '112214',
+    '112412', '122114', '122411', '142112', '142211', '241211', '221114', '413111', '241112', '134111',
+    '111242', '121142', '121241', '114212', '124112', '124211', '411212', '421112', '421211', '212141',
+    '214121', '412121', '111143', '111341', '131141', '114113', '114311', '411113', '411311', '113141',
+    '114131', '311141', '411131', '211412', '211214', '211232',
+)
+INICIO_B = 104
+FIN_CODE128 = '2331112'
+ZONA_SILENCIO = 10  # Módulos en blanco a cada lado del código
+
+
+def codificar_code128(texto):
+    """
+    Retorna los anchos (en módulos) de barras y espacios alternados del texto en Code128
+    (juego B: ASCII imprimible). Lanza ValueError si el texto tiene otros caracteres.
+    """
+    if not texto:
+        raise ValueError("No se puede codificar un texto vacío en Code128")
+    valores = []
+    for caracter in texto:
+        codigo = ord(caracter)
+        if not 32 <= codigo <= 126:
+            raise ValueError(f"El carácter {caracter!r} no se puede codificar en Code128")
+        valores.append(codigo - 32)
+    verificador = (INICIO_B + sum(i * valor for i, valor in enumerate(valores, start=1))) % 103
+    patrones = [PATRONES_CODE128[INICIO_B], *(PATRONES_CODE128[v] for v in valores),
+                PATRONES_CODE128[verificador], FIN_CODE128]
+    return [int(ancho) for patron in patrones for ancho in patron]
+
+
+@lru_cache(maxsize=None)
+def _fuente(tamano):
+    return ImageFont.load_default(size=tamano)
+
+
+def _recortar(dibujo, texto, fuente, ancho):
+    """Acorta el texto con puntos suspensivos hasta que entre en el ancho indicado"""
+    if dibujo.textlength(texto, font=fuente) <= ancho:
+        return texto
+    while texto and dibujo.textlength(texto + '…', font=fuente) > ancho:
+        texto = texto[:-1]
+    return texto.rstrip() + '…'
+
+
+def _lineas(dibujo, texto, fuente, ancho, maximo=2):
+    """Reparte el texto en hasta maximo líneas que entren en el ancho (la última recortada)"""
+    lineas = []
+    palabras = texto.split()
+    while palabras and len(lineas) < maximo - 1:
+        linea = palabras.pop(0)
+        while palabras and dibujo.textlength(f"{linea} {palabras[0]}", font=fuente) <= ancho:
+            linea = f"{linea} {palabras.pop(0)}"
+        lineas.append(_recortar(dibujo, linea, fuente, ancho))
+    if palabras:
+        lineas.append(_recortar(dibujo, ' '.join(palabras), fuente, ancho))
+    return lineas
+
+
+def formatear_precio(precio):
+    """'12500.00' -> '$ 12.500'; '1234.50' -> '$ 1.234,50'"""
+    precio = Decimal(precio)
+    decimales = 0 if precio == precio.to_integral_value() else 2
+    texto = f"{precio:,.{decimales}f}".replace(',', '_').replace('.', ',').replace('_', '.')
+    return f"$ {texto}"
+
+
+def _dibujar_qr(etiqueta, codigo, lado, origen):
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=0)
+    qr.add_data(codigo)
+    qr.make(fit=True)
+    imagen = qr.make_image(fill_color='black', back_color='white').get_image().convert('L')
+    modulos = imagen.size[0]
+    escala = max(1, lado // modulos)
+    imagen = imagen.resize((modulos * escala, modulos * escala), Image.NEAREST)
+    desplazamiento = (lado - imagen.size[0]) // 2
+    etiqueta.paste(imagen, (origen[0] + desplazamiento, origen[1] + desplazamiento))
+
+
+def _dibujar_code128(dibujo, codigo, caja):
+    izquierda, arriba, derecha, abajo = caja
+    anchos = codificar_code128(codigo)
+    modulo = max(1, (derecha - izquierda) // (sum(anchos) + 2 * ZONA_SILENCIO))
+    x = izquierda + (derecha - izquierda - sum(anchos) * modulo) // 2
+    for i, ancho in enumerate(anchos):
+        if i % 2 == 0:  # Las posiciones pares son barras, las impares espacios
+            dibujo.rectangle((x, arriba, x + ancho * modulo - 1, abajo), fill=0)
+        x += ancho * modulo
+
+
+def renderizar_etiqueta(datos, codigo='qr'):
+    """
+    Dibuja una etiqueta y retorna el PNG. datos tiene codigo_barras, nombre, talla, color
+    y precio. Se ejecuta en los procesos del pool: no usa la base de datos ni el storage.
+    """
+    ancho, alto = ETIQUETA
+    etiqueta = Image.new('L', ETIQUETA, 255)
+    dibujo = ImageDraw.Draw(etiqueta)
+    titulo, detalle, chica, precio = _fuente(28), _fuente(24), _fuente(20), _fuente(40)
+    variante = f"{datos['talla']} · {datos['color']}"
+
+    if codigo == 'qr':
+        lado = alto - 2 * MARGEN
+        _dibujar_qr(etiqueta, datos['codigo_barras'], lado, (MARGEN, MARGEN))
+        x = 2 * MARGEN + lado
+        disponible = ancho - x - MARGEN
+        y = MARGEN
+        for linea in _lineas(dibujo, datos['nombre'], titulo, disponible):
+            dibujo.text((x, y), linea, font=titulo, fill=0)
+            y += 34
+        dibujo.text((x, y + 6), _recortar(dibujo, variante, detalle, disponible), font=detalle, fill=0)
+        dibujo.text((x, alto - MARGEN - 90), formatear_precio(datos['precio']), font=precio, fill=0)
+        dibujo.text((x, alto - MARGEN - 28), _recortar(dibujo, datos['codigo_barras'], chica, disponible),
+                    font=chica, fill=0)
+    else:
+        disponible = ancho - 2 * MARGEN
+        texto_precio = formatear_precio(datos['precio'])
+        ancho_precio = dibujo.textlength(texto_precio, font=precio)
+        dibujo.text((ancho - MARGEN - ancho_precio, MARGEN), texto_precio, font=precio, fill=0)
+        disponible_titulo = disponible - ancho_precio - MARGEN
+        dibujo.text((MARGEN, MARGEN), _recortar(dibujo, datos['nombre'], titulo, disponible_titulo),
+                    font=titulo, fill=0)
+        dibujo.text((MARGEN, MARGEN + 40), _recortar(dibujo, variante, detalle, disponible_titulo),
+                    font=detalle, fill=0)
+        _dibujar_code128(dibujo, datos['codigo_barras'], (MARGEN, MARGEN + 90, ancho - MARGEN, alto - MARGEN - 34))
+        ancho_codigo = dibujo.textlength(datos['codigo_barras'], font=chica)
+        dibujo.text(((ancho - ancho_codigo) // 2, alto - MARGEN - 26), datos['codigo_barras'], font=chica, fill=0)
+
+    salida = BytesIO()
+    etiqueta.save(salida, 'PNG', optimize=True)
+    return salida.getvalue()
+
+
+def clave_etiqueta(datos, codigo):
+    """Hash del contenido de la etiqueta: si cambia algún dato o el diseño, cambia la clave"""
+    contenido = json.dumps([VERSION, codigo, datos], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def nombre_en_cache(clave, codigo):
+    return f"etiquetas/{codigo}/{clave}.png"
+
+
+COLUMNAS_DATOS = ('pk', 'codigo_barras', 'prenda__nombre', 'talla__nombre', 'color__nombre', 'prenda__precio_venta')
+
+
+def _datos(fila):
+    return {
+        'codigo_barras': fila['codigo_barras'],
+        'nombre': fila['prenda__nombre'],
+        'talla': fila['talla__nombre'],
+        'color': fila['color__nombre'],
+        'precio': str(fila['prenda__precio_venta']),
+    }
+
+
+def datos_etiquetas(copias):
+    """
+    Arma los datos de las etiquetas a partir de {variante_id: copias}, en ese orden y con
+    una entrada por copia. Lanza EtiquetasInvalidas si alguna variante no existe o no
+    tiene código de barras.
+    """
+    filas = {
+        fila['pk']: fila
+        for fila in VariantePrenda.objects.filter(pk__in=copias.keys()).values(*COLUMNAS_DATOS)
+    }
+    faltantes = [pk for pk in copias if pk not in filas]
+    if faltantes:
+        raise EtiquetasInvalidas(f"No existen las variantes: {', '.join(map(str, faltantes))}")
+    sin_codigo = [pk for pk in copias if not filas[pk]['codigo_barras']]
+    if sin_codigo:
+        raise EtiquetasInvalidas(f"Las variantes {', '.join(map(str, sin_codigo))} no tienen código de barras")
+
+    etiquetas = []
+    for pk, cantidad in copias.items():
+        etiquetas.extend([_datos(filas[pk])] * cantidad)
+    return etiquetas
+
+
+def nombres_en_uso():
+    """Nombres en el cache de las etiquetas (de cada tipo de código) de las variantes actuales"""
+    filas = VariantePrenda.objects.exclude(codigo_barras='').exclude(codigo_barras=None).values(*COLUMNAS_DATOS)
+    return {
+        nombre_en_cache(clave_etiqueta(_datos(fila), codigo), codigo)
+        for fila in filas.iterator()
+        for codigo in CODIGOS
+    }
+
+
+def etiquetas_renderizadas(etiquetas, codigo='qr', pool=None):
+    """
+    Retorna {clave: PNG} de las etiquetas distintas de la lista, leyendo del cache las ya
+    dibujadas y dibujando el resto (en el pool si son al menos MINIMO_POOL).
+    """
+    unicas = {}
+    for datos in etiquetas:
+        unicas.setdefault(clave_etiqueta(datos, codigo), datos)
+    if codigo == 'code128':
+        for datos in unicas.values():
+            try:
+                codificar_code128(datos['codigo_barras'])  # Validar antes de mandar al pool
+            except ValueError as e:
+                raise EtiquetasInvalidas(f"{datos['codigo_barras']}: {e}")
+
+    renderizadas = {}
+    faltantes = []
+    for clave, datos in unicas.items():
+        nombre = nombre_en_cache(clave, codigo)
+        if default_storage.exists(nombre):
+            with default_storage.open(nombre, 'rb') as archivo:
+                renderizadas[clave] = archivo.read()
+        else:
+            faltantes.append(clave)
+
+    if len(faltantes) >= MINIMO_POOL:
+        pool = pool or obtener_pool()
+        imagenes = pool.map(renderizar_etiqueta, [unicas[c] for c in faltantes], [codigo] * len(faltantes),
+                            chunksize=max(1, len(faltantes) // 32))
+    else:
+        imagenes = (renderizar_etiqueta(unicas[c], codigo) for c in faltantes)
+    for clave, png in zip(faltantes, imagenes):
+        renderizadas[clave] = png
+        nombre = nombre_en_cache(clave, codigo)
+        if not default_storage.exists(nombre):
+            default_storage.save(nombre, ContentFile(png))
+    return renderizadas
+
+
+def cantidad_paginas(cantidad_etiquetas):
+    return max(1, -(-cantidad_etiquetas // POR_HOJA))
+
+
+def hoja_etiquetas(etiquetas, codigo='qr', formato='pdf', pagina=1, pool=None):
+    """
+    Retorna el archivo con las hojas de etiquetas: un PDF con todas las páginas, o el PNG
+    de la página indicada (desde 1).
+    """
+    if formato == 'png':
+        etiquetas = etiquetas[(pagina - 1) * POR_HOJA:pagina * POR_HOJA]
+    renderizadas = etiquetas_renderizadas(etiquetas, codigo, pool)
+
+    hojas = []
+    for inicio in range(0, max(len(etiquetas), 1), POR_HOJA):
+        hoja = Image.new('L', HOJA, 255)
+        for posicion, datos in enumerate(etiquetas[inicio:inicio + POR_HOJA]):
+            fila, columna = divmod(posicion, COLUMNAS)
+            imagen = Image.open(BytesIO(renderizadas[clave_etiqueta(datos, codigo)]))
+            hoja.paste(imagen, (MARGEN_HOJA + columna * ETIQUETA[0], MARGEN_HOJA + fila * ETIQUETA[1]))
+        # En blanco y negro puro el PDF pesa una fracción y las barras quedan nítidas
+        hojas.append(hoja.convert('1', dither=Image.Dither.NONE))
+
+    salida = BytesIO()
+    if formato == 'pdf':
+        hojas[0].save(salida, 'PDF', save_all=True, append_images=hojas[1:], resolution=DPI)
+    else:
+        hojas[0].save(salida, 'PNG', optimize=True, dpi=(DPI, DPI))
+    return salida.getvalue()
@@ -0,0 +1,161 @@
+"""
+Conteos por faceta del catálogo de prendas.
+
+Para cada faceta (categoría, género, talla, color, stock y rango de precio) se cuenta
+cuántas prendas quedarían al elegir cada valor, aplicando el resto de los filtros
+vigentes pero no el de la propia faceta: así la pantalla puede mostrar "Remeras (34)"
+junto a las demás categorías aunque haya una seleccionada. Cada faceta se resuelve con
+una consulta agrupada, de modo que la cantidad de consultas no depende de la cantidad de
+valores. Los nombres de categorías, tallas y colores salen de la cache de referencias.
+
+El resultado se guarda en la cache de Django con una clave formada por los filtros y
+las versiones del catálogo: version_catalogo, que cambia al modificar prendas (nombre,
+precio, categoría) o variantes (talla, color, activo) pero no con el stock, y la de la
+cache de referencias. Los conteos de stock (tiene_stock) pueden quedar atrasados hasta
+DURACION_CACHE segundos; por eso la duración es corta.
+"""
+import hashlib
+import json
+import math
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField, Max, Min, Q, Value
+from django.db.models.functions import Cast, Floor
+from san_pedrito.campos import PARAMETROS as PARAMETROS_CAMPOS
+from .cache import CacheLocalVersionada
+from .filters import PrendaFilter
+from .models import Categoria, Talla, Color, Prenda, VariantePrenda
+from .referencias import cache_referencias, todos
+
+# Parámetros de PrendaFilter que corresponden a cada faceta
+PARAMETROS_FACETA = {
+    'categoria': ('categoria', 'categoria_slug'),
+    'genero': ('genero',),
+    'talla': ('talla',),
+    'color': ('color',),
+    'tiene_stock': ('tiene_stock',),
+    'precio': ('precio_min', 'precio_max'),
+}
+# Parámetros del request que no afectan a los conteos
+PARAMETROS_IGNORADOS = {'page', 'page_size', 'ordering', 'cursor', 'paginacion', 'format', *PARAMETROS_CAMPOS}
+
+RANGOS_PRECIO = 5
+MAXIMO_RANGOS = 20
+DURACION_CACHE = 60
+
+# Solo se usa su versión, que incrementan las señales de prendas y variantes
+version_catalogo = CacheLocalVersionada('catalogo')
+
+
+def _filtrar(queryset, parametros, excluir=()):
+    datos = parametros.copy()
+    for parametro in excluir:
+        datos.pop(parametro, None)
+    return PrendaFilter(datos, queryset=queryset).qs
+
+
+def _ancho_redondo(rango, cantidad):
+    """Ancho entero de los rangos de precio, redondeado a 1, 2 o 5 por una potencia de 10"""
+    bruto = float(rango) / cantidad
+    if bruto <= 1:
+        return 1
+    potencia = 10 ** math.floor(math.log10(bruto))
+    return next(potencia * factor for factor in (1, 2, 5, 10) if potencia * factor >= bruto)
+
+
+def _conteos_categoria(queryset):
+    conteos = dict(queryset.order_by().values_list('categoria').annotate(cantidad=Count('pk')))
+    return [
+        {'id': categoria.id, 'nombre': categoria.nombre, 'slug': categoria.slug, 'cantidad': conteos[categoria.id]}
+        for categoria in todos(Categoria) if categoria.id in conteos
+    ]
+
+
+def _conteos_genero(queryset):
+    conteos = dict(queryset.order_by().values_list('genero').annotate(cantidad=Count('pk')))
+    return [
+        {'valor': valor, 'nombre': nombre, 'cantidad': conteos[valor]}
+        for valor, nombre in Prenda.GENERO_CHOICES if valor in conteos
+    ]
+
+
+def _conteos_variante(queryset, campo, modelo, extra=()):
+    """Prendas distintas por talla o color entre las variantes de las prendas filtradas"""
+    conteos = dict(
+        VariantePrenda.objects.filter(prenda__in=queryset.order_by().values('pk'))
+        .order_by().values_list(campo).annotate(cantidad=Count('prenda', distinct=True))
+    )
+    return [
+        dict({'id': objeto.id, 'nombre': objeto.nombre, 'cantidad': conteos[objeto.id]},
+             **{nombre: getattr(objeto, nombre) for nombre in extra})
+        for objeto in todos(modelo) if objeto.id in conteos
+    ]
+
+
+def _conteos_stock(queryset):
+    conteos = queryset.order_by().aggregate(
+        con_stock=Count('pk', filter=Q(tiene_stock=True)),
+        sin_stock=Count('pk', filter=Q(tiene_stock=False)),
+    )
+    return {'true': conteos['con_stock'], 'false': conteos['sin_stock']}
+
+
+def _histograma_precio(queryset, rangos):
+    limites = queryset.order_by().aggregate(minimo=Min('precio_venta'), maximo=Max('precio_venta'))
+    minimo, maximo = limites['minimo'], limites['maximo']
+    if minimo is None:
+        return {'min': None, 'max': None, 'ancho': None, 'rangos': []}
+
+    ancho = _ancho_redondo(maximo - minimo, rangos)
+    conteos = dict(
+        queryset.order_by()
+        .annotate(rango=Cast(Floor(F('precio_venta') / Value(ancho)), IntegerField()))
+        .values_list('rango').annotate(cantidad=Count('pk'))
+    )
+    return {
+        'min': minimo,
+        'max': maximo,
+        'ancho': ancho,
+        'rangos': [
+            {'desde': rango * ancho, 'hasta': (rango + 1) * ancho, 'cantidad': cantidad}
+            for rango, cantidad in sorted(conteos.items())
+        ],
+    }
+
+
+def calcular_facetas(queryset, parametros, rangos=RANGOS_PRECIO):
+    """
+    Retorna los conteos por faceta de las prendas del queryset base (sin PrendaFilter
+    aplicado) bajo los filtros de PrendaFilter indicados en parametros (un QueryDict).
+    """
+    def sin(faceta):
+        return _filtrar(queryset, parametros, PARAMETROS_FACETA[faceta])
+
+    return {
+        'total': _filtrar(queryset, parametros).order_by().count(),
+        'categoria': _conteos_categoria(sin('categoria')),
+        'genero': _conteos_genero(sin('genero')),
+        'talla': _conteos_variante(sin('talla'), 'talla', Talla),
+        'color': _conteos_variante(sin('color'), 'color', Color, extra=('codigo_hex',)),
+        'tiene_stock': _conteos_stock(sin('tiene_stock')),
+        'precio': _histograma_precio(sin('precio'), rangos),
+    }
+
+
+def clave_facetas(parametros):
+    """Clave de cache para los filtros indicados y la versión vigente del catálogo"""
+    filtros = sorted(
+        (clave, sorted(parametros.getlist(clave)))
+        for clave in parametros if clave not in PARAMETROS_IGNORADOS
+    )
+    resumen = hashlib.md5(json.dumps(filtros).encode('utf-8')).hexdigest()
+    return f'san_pedrito:facetas:{version_catalogo.version()}:{cache_referencias.version()}:{resumen}'
+
+
+def facetas_cacheadas(queryset, parametros, rangos=RANGOS_PRECIO):
+    """Como calcular_facetas, pero reutiliza el resultado mientras el catálogo no cambie"""
+    clave = clave_facetas(parametros)
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = calcular_facetas(queryset, parametros, rangos)
+        cache.set(clave, resultado, DURACION_CACHE)
+    return resultado
@@ -1,5 +1,15 @@
 import django_filters
-from .models import Prenda, VariantePrenda
+from django.db.models import Exists, OuterRef
+from .models import Prenda, VariantePrenda, MovimientoStock, AlertaStock
+
+def existe_variante(**condiciones):
+    """
+    Condición "la prenda tiene alguna variante que cumple las condiciones" como subconsulta
+    EXISTS correlacionada. A diferencia de filtrar por variantes__... no multiplica las
+    filas de la prenda, así que no hace falta distinct() y varias condiciones se combinan
+    sin costo adicional.
+    """
+    return Exists(VariantePrenda.objects.filter(prenda=OuterRef('pk'), **condiciones))
 
 class PrendaFilter(django_filters.FilterSet):
     """Filtros para el modelo Prenda"""
@@ -21,17 +31,17 @@ class PrendaFilter(django_filters.FilterSet):
     def filter_tiene_stock(self, queryset, name, value):
         """Filtrar prendas que tienen o no stock"""
         if value:  # Si value es True, filtrar prendas con stock
-            return queryset.filter(variantes__stock__gt=0).distinct()
+            return queryset.filter(existe_variante(stock__gt=0))
         else:  # Si value es False, filtrar prendas sin stock
-            return queryset.exclude(variantes__stock__gt=0).distinct()
+            return queryset.filter(~existe_variante(stock__gt=0))
     
     def filter_talla(self, queryset, name, value):
         """Filtrar prendas por talla"""
-        return queryset.filter(variantes__talla_id=value).distinct()
+        return queryset.filter(existe_variante(talla_id=value))
     
     def filter_color(self, queryset, name, value):
         """Filtrar prendas por color"""
-        return queryset.filter(variantes__color_id=value).distinct()
+        return queryset.filter(existe_variante(color_id=value))
 
 class VariantePrendaFilter(django_filters.FilterSet):
     """Filtros para el modelo VariantePrenda"""
@@ -50,4 +60,33 @@ class VariantePrendaFilter(django_filters.FilterSet):
         if value:  # Si value es True, filtrar variantes disponibles
             return queryset.filter(stock__gt=0, activo=True)
         else:  # Si value es False, filtrar variantes no disponibles
-            return queryset.filter(stock=0) | queryset.filter(activo=False)
\ No newline at end of file
+            return queryset.filter(stock=0) | queryset.filter(activo=False)
+
+class MovimientoStockFilter(django_filters.FilterSet):
+    """Filtros para el libro de movimientos de stock"""
+    variante = django_filters.NumberFilter(field_name='variante__id')
+    prenda = django_filters.NumberFilter(field_name='variante__prenda__id')
+    categoria = django_filters.NumberFilter(field_name='variante__prenda__categoria__id')
+    fecha_desde = django_filters.IsoDateTimeFilter(field_name='fecha', lookup_expr='gte')
+    fecha_hasta = django_filters.IsoDateTimeFilter(field_name='fecha', lookup_expr='lte')
+    
+    class Meta:
+        model = MovimientoStock
+        fields = ['variante', 'prenda', 'categoria', 'motivo', 'referencia', 'usuario', 'fecha_desde', 'fecha_hasta']
+
+
+class AlertaStockFilter(django_filters.FilterSet):
+    """Filtros para las alertas de stock bajo"""
+    prenda = django_filters.NumberFilter(field_name='variante__prenda__id')
+    categoria = django_filters.NumberFilter(field_name='variante__prenda__categoria__id')
+    agotada = django_filters.BooleanFilter(method='filter_agotada')
+    
+    class Meta:
+        model = AlertaStock
+        fields = ['prenda', 'categoria', 'agotada']
+    
+    def filter_agotada(self, queryset, name, value):
+        """Filtrar alertas de variantes agotadas (o con stock)"""
+        if value:
+            return queryset.filter(stock=0)
+        return queryset.filter(stock__gt=0)
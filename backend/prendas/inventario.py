@@ -0,0 +1,181 @@
+"""
+Importación del conteo físico de inventario.
+
+Lee un CSV con las columnas codigo_barras y cantidad de a una fila por vez y lo
+procesa en lotes: cada lote resuelve sus códigos con una sola consulta, bloquea las
+variantes, aplica el stock contado (modo 'set') o la diferencia (modo 'delta') y
+guarda los cambios con bulk_update. Las filas con errores se informan sin abortar el
+resto del archivo, y la memoria usada depende del tamaño del lote, no del archivo.
+
+Como cada lote se confirma por separado, un error de lectura a mitad del archivo (una
+codificación inválida, un CSV mal formado) no revierte los lotes ya aplicados: se
+aplican las filas leídas hasta ese punto y el resultado queda marcado como
+interrumpido, con los totales parciales y el error. Solo se rechaza el archivo completo
+si falla antes de leer la primera fila (por ejemplo, el encabezado).
+"""
+import codecs
+import csv
+from itertools import islice
+from django.db import transaction
+from django.utils import timezone
+from .alertas import actualizar_alertas
+from .models import VariantePrenda
+from .movimientos import registrar_movimientos
+from .stock import actualizar_stock_prendas
+
+MODOS = ('set', 'delta')
+COLUMNAS = ('codigo_barras', 'cantidad')
+MAXIMO_ERRORES = 1000
+
+
+class ArchivoInvalido(ValueError):
+    """El archivo no tiene el formato esperado"""
+
+
+class LecturaInterrumpida(ArchivoInvalido):
+    """No se pudo seguir leyendo el archivo a partir de la línea indicada"""
+
+    def __init__(self, linea, mensaje):
+        super().__init__(mensaje)
+        self.linea = linea
+
+
+def _filas(archivo):
+    """Genera (número de línea, código, cantidad) leyendo el archivo binario de a una línea"""
+    lector = csv.DictReader(codecs.iterdecode(archivo, 'utf-8-sig'))
+    try:
+        if lector.fieldnames is None or any(columna not in lector.fieldnames for columna in COLUMNAS):
+            raise ArchivoInvalido(f"El archivo debe tener las columnas: {', '.join(COLUMNAS)}")
+        for fila in lector:
+            yield lector.line_num, (fila['codigo_barras'] or '').strip(), (fila['cantidad'] or '').strip()
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise LecturaInterrumpida(
+            lector.line_num + 1, f"No se pudo leer el archivo después de la línea {lector.line_num}: {e}"
+        )
+
+
+class ResultadoImportacion:
+    """Totales de la importación y detalle (acotado) de las filas con errores"""
+
+    def __init__(self):
+        self.procesadas = 0
+        self.actualizadas = 0
+        self.sin_cambios = 0
+        self.total_errores = 0
+        self.errores = []
+        self.interrumpida = False
+
+    def error(self, linea, codigo, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < MAXIMO_ERRORES:
+            self.errores.append({'fila': linea, 'codigo_barras': codigo, 'error': mensaje})
+
+    def como_dict(self):
+        return {
+            'procesadas': self.procesadas,
+            'actualizadas': self.actualizadas,
+            'sin_cambios': self.sin_cambios,
+            'total_errores': self.total_errores,
+            'errores': self.errores,
+            'interrumpida': self.interrumpida,
+        }
+
+
+def _procesar_lote(filas, modo, referencia, usuario, resultado):
+    errores = []
+    cantidades = []
+    for linea, codigo, cantidad in filas:
+        resultado.procesadas += 1
+        if not codigo:
+            errores.append((linea, codigo, "Falta el código de barras"))
+            continue
+        try:
+            cantidad = int(cantidad)
+        except ValueError:
+            errores.append((linea, codigo, f"Cantidad inválida: '{cantidad}'"))
+            continue
+        if modo == 'set' and cantidad < 0:
+            errores.append((linea, codigo, "El stock contado no puede ser negativo"))
+            continue
+        cantidades.append((linea, codigo, cantidad))
+
+    if cantidades:
+        _aplicar_cantidades(cantidades, modo, referencia, usuario, resultado, errores)
+    # Informar los errores en el orden del archivo
+    for error in sorted(errores):
+        resultado.error(*error)
+
+
+def _aplicar_cantidades(cantidades, modo, referencia, usuario, resultado, errores):
+    """Aplica las cantidades válidas de un lote en una transacción, bloqueando sus variantes"""
+    with transaction.atomic():
+        variantes = {
+            v.codigo_barras: v
+            for v in VariantePrenda.objects.select_for_update()
+            .filter(codigo_barras__in={codigo for _, codigo, _ in cantidades})
+            .only('pk', 'prenda_id', 'codigo_barras', 'stock')
+        }
+        anteriores = {v.pk: v.stock for v in variantes.values()}
+
+        for linea, codigo, cantidad in cantidades:
+            variante = variantes.get(codigo)
+            if variante is None:
+                errores.append((linea, codigo, "No existe una variante con ese código de barras"))
+                continue
+            nuevo = cantidad if modo == 'set' else variante.stock + cantidad
+            if nuevo < 0:
+                errores.append((linea, codigo, f"El stock quedaría negativo (actual {variante.stock})"))
+                continue
+            variante.stock = nuevo
+
+        ahora = timezone.now()
+        modificadas = [v for v in variantes.values() if v.stock != anteriores[v.pk]]
+        for variante in modificadas:
+            variante.actualizado = ahora
+        VariantePrenda.objects.bulk_update(modificadas, ['stock', 'actualizado'])
+
+        # bulk_update no dispara señales: mantener prendas, alertas y libro de movimientos
+        if modificadas:
+            actualizar_stock_prendas({v.prenda_id for v in modificadas})
+            actualizar_alertas(v.pk for v in modificadas)
+            registrar_movimientos(
+                {v.pk: v.stock - anteriores[v.pk] for v in modificadas},
+                'INVENTARIO', referencia, usuario, fecha=ahora
+            )
+        
+    resultado.actualizadas += len(modificadas)
+    resultado.sin_cambios += sum(1 for v in variantes.values() if v.stock == anteriores[v.pk])
+
+
+def importar_conteo(archivo, modo='set', usuario=None, lote=500, referencia=None):
+    """
+    Importa un conteo de inventario desde un CSV binario (archivo subido o abierto en modo 'rb').
+
+    En modo 'set' la cantidad es el stock contado; en modo 'delta' se suma al stock actual.
+    Cada lote se confirma por separado. Retorna un ResultadoImportacion; si la lectura
+    falla a mitad del archivo, el resultado tiene los totales de lo aplicado, el error
+    y interrumpida=True. Lanza ArchivoInvalido si no se pudo leer ninguna fila.
+    """
+    if modo not in MODOS:
+        raise ArchivoInvalido(f"Modo inválido: '{modo}'. Opciones: {', '.join(MODOS)}")
+    referencia = referencia or f"inventario:{timezone.now():%Y%m%d%H%M%S}"
+    resultado = ResultadoImportacion()
+
+    filas = _filas(archivo)
+    interrupcion = None
+    while interrupcion is None:
+        filas_lote = []
+        try:
+            filas_lote.extend(islice(filas, lote))
+        except LecturaInterrumpida as e:
+            interrupcion = e
+        if not filas_lote:
+            break
+        _procesar_lote(filas_lote, modo, referencia, usuario, resultado)
+
+    if interrupcion is not None:
+        if not resultado.procesadas:
+            raise interrupcion
+        resultado.error(interrupcion.linea, '', str(interrupcion))
+        resultado.interrumpida = True
+    return resultado
@@ -0,0 +1,67 @@
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+from prendas.escaneo import cache_escaneo
+from prendas.models import VariantePrenda
+from prendas.views import VariantePrendaViewSet
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+class Command(BaseCommand):
+    help = "Mide la latencia del endpoint de escaneo con varios hilos escaneando en simultáneo"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8, help="Escaneos concurrentes (por defecto 8)")
+        parser.add_argument('--escaneos', type=int, default=5000, help="Total de escaneos a realizar (por defecto 5000)")
+        parser.add_argument('--codigos', type=int, default=200, help="Cantidad de códigos distintos a escanear (por defecto 200)")
+
+    def handle(self, *args, **options):
+        codigos = list(
+            VariantePrenda.objects.exclude(codigo_barras=None)
+            .values_list('codigo_barras', flat=True)[:options['codigos']]
+        )
+        if not codigos:
+            raise CommandError("No hay variantes con código de barras para escanear")
+
+        vista = VariantePrendaViewSet.as_view({'get': 'escanear'})
+        factory = APIRequestFactory()
+
+        def escanear(codigo):
+            request = factory.get(f'/api/prendas/variantes/escanear/{codigo}/')
+            inicio = time.perf_counter()
+            response = vista(request, codigo=codigo)
+            response.render()
+            duracion = (time.perf_counter() - inicio) * 1000
+            return duracion
+
+        # Primer escaneo de cada código: cache fría, una consulta por código
+        cache_escaneo._incrementar_version()
+        frias = [escanear(codigo) for codigo in codigos]
+        self.stdout.write(
+            f"Cache fría ({len(frias)} códigos) - latencia (ms): media {statistics.mean(frias):.2f} | "
+            f"p99 {percentil(frias, 99):.2f}"
+        )
+
+        secuencia = [random.choice(codigos) for _ in range(options['escaneos'])]
+        with ThreadPoolExecutor(max_workers=options['hilos']) as pool:
+            inicio = time.perf_counter()
+            latencias = list(pool.map(escanear, secuencia))
+            total = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f"{len(latencias)} escaneos de {len(codigos)} códigos con {options['hilos']} hilos "
+            f"en {total:.2f}s ({len(latencias) / total:.0f} escaneos/s)"
+        )
+        self.stdout.write(
+            f"Cache caliente - latencia (ms): media {statistics.mean(latencias):.2f} | "
+            f"p50 {percentil(latencias, 50):.2f} | p95 {percentil(latencias, 95):.2f} | "
+            f"p99 {percentil(latencias, 99):.2f} | máx {max(latencias):.2f}"
+        )
@@ -0,0 +1,144 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from prendas.filters import PrendaFilter
+from prendas.models import Categoria, Talla, Color, Prenda, VariantePrenda
+from prendas.stock import actualizar_stock_prendas
+
+PREFIJO = 'BENCH-'
+TAMANIO_PAGINA = 20
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def filtrar_con_join(queryset, parametros):
+    """Filtros de variantes como estaban antes: JOIN con variantes y distinct()"""
+    if 'tiene_stock' in parametros:
+        queryset = queryset.filter(variantes__stock__gt=0).distinct()
+    if 'talla' in parametros:
+        queryset = queryset.filter(variantes__talla_id=parametros['talla']).distinct()
+    if 'color' in parametros:
+        queryset = queryset.filter(variantes__color_id=parametros['color']).distinct()
+    return queryset
+
+
+def filtrar_con_exists(queryset, parametros):
+    return PrendaFilter(parametros, queryset=queryset).qs
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara los filtros de variantes del catálogo con JOIN + DISTINCT y con EXISTS: "
+        "plan de ejecución y latencia de una página del listado (count + primeras filas). "
+        "Con --generar crea prendas de prueba (código BENCH-...) hasta tener esa cantidad de variantes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--generar', type=int, default=0,
+                            help="Variantes de prueba a generar antes de medir (ej. 100000)")
+        parser.add_argument('--eliminar', action='store_true',
+                            help="Elimina las prendas de prueba generadas y termina")
+        parser.add_argument('--repeticiones', type=int, default=20,
+                            help="Mediciones por escenario (por defecto 20)")
+        parser.add_argument('--sin-plan', action='store_true',
+                            help="No mostrar el plan de ejecución de cada consulta")
+
+    def handle(self, *args, **options):
+        if options['eliminar']:
+            prendas = Prenda.objects.filter(codigo__startswith=PREFIJO)
+            VariantePrenda.objects.filter(prenda__in=prendas).delete()
+            _, eliminadas = prendas.delete()
+            self.stdout.write(self.style.SUCCESS(
+                f"Prendas de prueba eliminadas: {eliminadas.get(Prenda._meta.label, 0)}"
+            ))
+            return
+        if options['generar']:
+            self.generar(options['generar'])
+
+        tallas = list(Talla.objects.values_list('pk', flat=True))
+        colores = list(Color.objects.values_list('pk', flat=True))
+        if not tallas or not colores or not VariantePrenda.objects.exists():
+            raise CommandError("No hay variantes para filtrar. Use --generar para crear datos de prueba")
+        self.stdout.write(f"Prendas: {Prenda.objects.count()} | Variantes: {VariantePrenda.objects.count()}")
+
+        talla, color = tallas[len(tallas) // 2], colores[len(colores) // 2]
+        escenarios = [
+            ('tiene_stock', {'tiene_stock': 'true'}),
+            ('talla', {'talla': str(talla)}),
+            ('talla + color', {'talla': str(talla), 'color': str(color)}),
+            ('tiene_stock + talla + color', {'tiene_stock': 'true', 'talla': str(talla), 'color': str(color)}),
+        ]
+        base = Prenda.objects.select_related('categoria').filter(activo=True).order_by('-creado')
+
+        for nombre, parametros in escenarios:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {nombre} =="))
+            resultados = {}
+            for metodo, filtrar in (('JOIN + DISTINCT', filtrar_con_join), ('EXISTS', filtrar_con_exists)):
+                queryset = filtrar(base, parametros)
+                if not options['sin_plan']:
+                    self.stdout.write(f"-- Plan {metodo}:")
+                    self.stdout.write(queryset[:TAMANIO_PAGINA].explain())
+                latencias, ids = self.medir(queryset, options['repeticiones'])
+                resultados[metodo] = (latencias, ids)
+                self.stdout.write(
+                    f"{metodo}: media {statistics.mean(latencias):.2f} ms | "
+                    f"p50 {percentil(latencias, 50):.2f} | p95 {percentil(latencias, 95):.2f}"
+                )
+            if resultados['JOIN + DISTINCT'][1] != resultados['EXISTS'][1]:
+                self.stdout.write(self.style.WARNING("Los resultados de ambos métodos difieren"))
+            antes = statistics.median(resultados['JOIN + DISTINCT'][0])
+            despues = statistics.median(resultados['EXISTS'][0])
+            self.stdout.write(self.style.SUCCESS(f"Mejora de la mediana: {antes / despues:.1f}x"))
+
+    def medir(self, queryset, repeticiones):
+        latencias = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            cantidad = queryset.count()
+            ids = [prenda.pk for prenda in queryset[:TAMANIO_PAGINA]]
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        return latencias, (cantidad, ids)
+
+    @transaction.atomic
+    def generar(self, cantidad, variantes_por_prenda=10):
+        """Crea prendas de prueba con variantes de tallas y colores al azar (sin señales)"""
+        categorias = [Categoria.objects.get_or_create(nombre=f'Bench {i}', defaults={'slug': f'bench-{i}'})[0]
+                      for i in range(10)]
+        tallas = [Talla.objects.get_or_create(nombre=f'Bench {i}', defaults={'orden': i})[0] for i in range(8)]
+        colores = [Color.objects.get_or_create(nombre=f'Bench {i}')[0] for i in range(12)]
+        combinaciones = [(talla, color) for talla in tallas for color in colores]
+
+        inicial = Prenda.objects.filter(codigo__startswith=PREFIJO).count()
+        descripcion = "Descripción de prueba para el benchmark de filtros del catálogo. " * 10
+        prendas = Prenda.objects.bulk_create([
+            Prenda(
+                codigo=f'{PREFIJO}{numero}',
+                slug=f'bench-{numero}',
+                nombre=f'Prenda de prueba {numero}',
+                descripcion=descripcion,
+                categoria=random.choice(categorias),
+                precio_costo=Decimal('1000'),
+                precio_venta=Decimal(random.randrange(1000, 20000, 100)),
+                genero=random.choice('NMF'),
+            )
+            for numero in range(inicial, inicial + -(-cantidad // variantes_por_prenda))
+        ], batch_size=1000)
+
+        variantes = []
+        for prenda in Prenda.objects.filter(codigo__in=[p.codigo for p in prendas]).only('pk', 'codigo'):
+            for talla, color in random.sample(combinaciones, variantes_por_prenda):
+                variantes.append(VariantePrenda(
+                    prenda=prenda, talla=talla, color=color,
+                    stock=random.choice((0, 0, 0, 1, 2, 5, 10)),
+                    codigo_barras=f'{prenda.codigo}-{talla.pk}-{color.pk}',
+                ))
+        VariantePrenda.objects.bulk_create(variantes[:cantidad], batch_size=2000)
+        actualizar_stock_prendas({v.prenda_id for v in variantes[:cantidad]})
+        self.stdout.write(f"Generadas {len(prendas)} prendas y {min(len(variantes), cantidad)} variantes de prueba")
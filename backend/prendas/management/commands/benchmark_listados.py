@@ -0,0 +1,69 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from clientes.models import Cliente
+from clientes.serializers import ClienteListSerializer
+from prendas.models import Prenda
+from prendas.serializers import PrendaListSerializer
+from san_pedrito.lectura import CodificadorFilas
+from ventas.models import Venta
+from ventas.serializers import VentaListSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara filas por segundo de los serializers de listado (instancias + ModelSerializer) "
+        "con el listado rápido (values() + CodificadorFilas), consulta incluida"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=1000, help="Filas por medición (por defecto 1000)")
+        parser.add_argument('--repeticiones', type=int, default=5, help="Mediciones por caso (por defecto 5)")
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/api/'))
+        contexto = {'request': request}
+        casos = [
+            (PrendaListSerializer, Prenda.objects.select_related('categoria')),
+            (VentaListSerializer, Venta.objects.select_related('cliente')),
+            (ClienteListSerializer, Cliente.objects.all()),
+        ]
+        renderer = JSONRenderer()
+        filas = options['filas']
+
+        for serializer_class, queryset in casos:
+            nombre = serializer_class.__name__
+            cantidad = min(filas, queryset.count())
+            if not cantidad:
+                self.stdout.write(self.style.WARNING(f"{nombre}: no hay filas para medir"))
+                continue
+
+            serializer = serializer_class(context=contexto)
+            codificador = CodificadorFilas.para(serializer_class)
+
+            def completo():
+                return serializer_class(queryset[:filas], many=True, context=contexto).data
+
+            def rapido():
+                return codificador.codificar(codificador.preparar(queryset)[:filas], serializer)
+
+            iguales = renderer.render(completo()) == renderer.render(rapido())
+            resultados = {}
+            for metodo, funcion in (('serializer', completo), ('rápido', rapido)):
+                tiempos = []
+                for _ in range(options['repeticiones']):
+                    inicio = time.perf_counter()
+                    funcion()
+                    tiempos.append(time.perf_counter() - inicio)
+                resultados[metodo] = cantidad / statistics.median(tiempos)
+
+            self.stdout.write(
+                f"{nombre} ({cantidad} filas): serializer {resultados['serializer']:,.0f} filas/s | "
+                f"rápido {resultados['rápido']:,.0f} filas/s | "
+                f"{resultados['rápido'] / resultados['serializer']:.1f}x"
+            )
+            if not iguales:
+                self.stdout.write(self.style.ERROR(f"{nombre}: la salida del listado rápido difiere"))
@@ -0,0 +1,60 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from san_pedrito.procesos import crear_pool
+from prendas.etiquetas import CODIGOS, FORMATOS, EtiquetasInvalidas, cantidad_paginas, datos_etiquetas, hoja_etiquetas
+from prendas.models import VariantePrenda
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera la hoja de etiquetas (QR o Code128) de variantes de prendas en un PDF de varias "
+        "páginas o en el PNG de una página, dibujando las etiquetas en un pool de procesos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('salida', help="Archivo a generar (ej. etiquetas.pdf)")
+        parser.add_argument('--variantes', type=int, nargs='+', default=[], help="Ids de variantes")
+        parser.add_argument('--prenda', type=int, nargs='+', default=[],
+                            help="Ids de prendas (todas sus variantes activas)")
+        parser.add_argument('--copias', type=int, default=1, help="Etiquetas por variante (por defecto 1)")
+        parser.add_argument('--por-stock', action='store_true',
+                            help="Una etiqueta por unidad en stock en lugar de --copias")
+        parser.add_argument('--codigo', choices=CODIGOS, default='qr')
+        parser.add_argument('--formato', choices=list(FORMATOS), default=None,
+                            help="pdf o png (por defecto, según la extensión de la salida)")
+        parser.add_argument('--pagina', type=int, default=1, help="Página a generar en formato png")
+        parser.add_argument('--procesos', type=int, default=None,
+                            help="Cantidad de procesos (por defecto, uno por CPU)")
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or ('png' if options['salida'].lower().endswith('.png') else 'pdf')
+        variantes = VariantePrenda.objects.filter(prenda_id__in=options['prenda'], activo=True).order_by(
+            'prenda_id', 'talla__orden', 'talla__nombre', 'color__nombre'
+        )
+        ids = list(dict.fromkeys([*options['variantes'], *variantes.values_list('pk', flat=True)]))
+        if not ids:
+            raise CommandError("Debe indicar --variantes o --prenda con variantes activas")
+        if options['por_stock']:
+            stock = dict(VariantePrenda.objects.filter(pk__in=ids).values_list('pk', 'stock'))
+            copias = {pk: stock.get(pk, 1) for pk in ids if stock.get(pk, 1)}
+        else:
+            copias = {pk: options['copias'] for pk in ids}
+
+        try:
+            etiquetas = datos_etiquetas(copias)
+            # Los procesos hijos no usan la base de datos: no heredar conexiones abiertas
+            connections.close_all()
+            inicio = time.perf_counter()
+            with crear_pool(options['procesos']) as pool:
+                contenido = hoja_etiquetas(etiquetas, options['codigo'], formato, options['pagina'], pool=pool)
+        except EtiquetasInvalidas as e:
+            raise CommandError(str(e))
+
+        with open(options['salida'], 'wb') as archivo:
+            archivo.write(contenido)
+        paginas = cantidad_paginas(len(etiquetas)) if formato == 'pdf' else 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Etiquetas: {len(etiquetas)} | Páginas: {paginas} | {options['salida']} "
+            f"({len(contenido) / 1024:.0f} KB en {time.perf_counter() - inicio:.1f} s)"
+        ))
@@ -0,0 +1,54 @@
+from collections import defaultdict
+from concurrent.futures import as_completed
+from django.core.management.base import BaseCommand
+from django.db import connections
+from san_pedrito.procesos import crear_pool
+from prendas.miniaturas import generar_derivados, marcar_generadas
+from prendas.models import Prenda, ImagenPrenda
+
+CAMPOS = ((Prenda, 'imagen_principal'), (ImagenPrenda, 'imagen'))
+
+
+class Command(BaseCommand):
+    help = "Genera en paralelo las miniaturas (WebP/JPEG) de las imágenes de prendas existentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos', type=int, default=None,
+            help="Cantidad de procesos (por defecto, uno por CPU)"
+        )
+        parser.add_argument(
+            '--forzar', action='store_true',
+            help="Regenera los derivados aunque ya existan"
+        )
+
+    def handle(self, *args, **options):
+        # Filas a marcar por cada imagen original
+        filas = defaultdict(list)
+        for modelo, campo in CAMPOS:
+            pendientes = modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+            if not options['forzar']:
+                pendientes = pendientes.filter(miniaturas_generadas__isnull=True)
+            for pk, nombre in pendientes.values_list('pk', campo):
+                filas[nombre].append((modelo, pk, campo))
+        # Los procesos hijos no usan la base de datos: no heredar conexiones abiertas
+        connections.close_all()
+
+        generados = 0
+        errores = 0
+        with crear_pool(options['procesos']) as pool:
+            futuros = {pool.submit(generar_derivados, nombre, options['forzar']): nombre for nombre in sorted(filas)}
+            for futuro in as_completed(futuros):
+                nombre = futuros[futuro]
+                try:
+                    generados += futuro.result()
+                except Exception as e:
+                    errores += 1
+                    self.stderr.write(f"{nombre}: {e}")
+                    continue
+                for modelo, pk, campo in filas[nombre]:
+                    marcar_generadas(modelo, pk, campo, nombre)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imágenes procesadas: {len(filas)} | Derivados generados: {generados} | Errores: {errores}"
+        ))
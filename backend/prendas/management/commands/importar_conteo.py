@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from prendas.inventario import importar_conteo, ArchivoInvalido, MODOS
+
+
+class Command(BaseCommand):
+    help = "Importa un conteo físico de inventario desde un CSV con las columnas codigo_barras y cantidad"
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo CSV")
+        parser.add_argument(
+            '--modo', choices=MODOS, default='set',
+            help="'set' fija el stock contado, 'delta' lo suma al stock actual (por defecto 'set')"
+        )
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help="Cantidad de filas a procesar por transacción (por defecto 500)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importar_conteo(archivo, modo=options['modo'], lote=options['lote'])
+        except (OSError, ArchivoInvalido) as e:
+            raise CommandError(str(e))
+
+        for error in resultado.errores:
+            self.stderr.write(f"Fila {error['fila']} ({error['codigo_barras']}): {error['error']}")
+        if resultado.interrumpida:
+            self.stderr.write(self.style.WARNING(
+                "La importación se interrumpió: solo se aplicaron las filas anteriores al error"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Filas procesadas: {resultado.procesadas} | Variantes actualizadas: {resultado.actualizadas} | "
+            f"Sin cambios: {resultado.sin_cambios} | Errores: {resultado.total_errores}"
+        ))
@@ -0,0 +1,41 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from prendas.etiquetas import CODIGOS, nombres_en_uso
+
+DIRECTORIO = 'etiquetas'
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra del cache de etiquetas dibujadas las que ya no corresponden a ninguna variante "
+        "(cambios de precio o de nombre, variantes eliminadas o un diseño anterior)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--simular', action='store_true',
+            help="Solo informa lo que se borraría"
+        )
+
+    def handle(self, *args, **options):
+        simular = options['simular']
+        en_uso = nombres_en_uso()
+        conservados = borrados = 0
+        for codigo in CODIGOS:
+            try:
+                _, nombres = default_storage.listdir(f'{DIRECTORIO}/{codigo}')
+            except FileNotFoundError:
+                continue
+            for nombre in nombres:
+                nombre = f'{DIRECTORIO}/{codigo}/{nombre}'
+                if nombre in en_uso:
+                    conservados += 1
+                    continue
+                borrados += 1
+                if not simular:
+                    default_storage.delete(nombre)
+
+        prefijo = "Simulación: " if simular else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefijo}Etiquetas conservadas: {conservados} | Archivos borrados: {borrados}"
+        ))
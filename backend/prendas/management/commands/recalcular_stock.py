@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from prendas.models import Prenda
+from prendas.stock import actualizar_stock_prendas, prendas_desincronizadas
+
+
+class Command(BaseCommand):
+    help = "Recalcula las columnas stock_total y tiene_stock de las prendas a partir de sus variantes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todas', action='store_true',
+            help="Recalcula todas las prendas, no solo las que están desincronizadas"
+        )
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help="Cantidad de prendas a actualizar por transacción (por defecto 1000)"
+        )
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+
+        if options['todas']:
+            ids = Prenda.objects.order_by('pk').values_list('pk', flat=True)
+        else:
+            ids = prendas_desincronizadas().order_by('pk').values_list('pk', flat=True)
+
+        ids = list(ids)
+        actualizadas = 0
+        for inicio in range(0, len(ids), lote):
+            with transaction.atomic():
+                actualizadas += actualizar_stock_prendas(ids[inicio:inicio + lote])
+
+        self.stdout.write(self.style.SUCCESS(f"Prendas actualizadas: {actualizadas}"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from prendas.alertas import reconstruir_alertas
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye las alertas de stock bajo de todas las variantes. Necesario después de "
+        "cambiar STOCK_UMBRAL_POR_DEFECTO."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help="Cantidad de variantes a recalcular por transacción (por defecto 1000)"
+        )
+
+    def handle(self, *args, **options):
+        cantidad = reconstruir_alertas(options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"Variantes en alerta: {cantidad}"))
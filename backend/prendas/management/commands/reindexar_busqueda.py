@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from prendas.models import Prenda
+from prendas.busqueda import actualizar_documentos
+
+
+class Command(BaseCommand):
+    help = "Regenera los documentos de búsqueda de todas las prendas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help="Cantidad de prendas a reindexar por transacción (por defecto 1000)"
+        )
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        ids = list(Prenda.objects.order_by('pk').values_list('pk', flat=True))
+
+        reindexadas = 0
+        for inicio in range(0, len(ids), lote):
+            with transaction.atomic():
+                reindexadas += actualizar_documentos(ids[inicio:inicio + lote])
+
+        self.stdout.write(self.style.SUCCESS(f"Prendas reindexadas: {reindexadas}"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from prendas.movimientos import tomar_snapshot
+
+
+class Command(BaseCommand):
+    help = "Consolida un snapshot de stock para las variantes con movimientos desde su último snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hasta',
+            help="Fecha y hora ISO del snapshot (por defecto, ahora menos un margen de 5 minutos)"
+        )
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help="Cantidad de snapshots a insertar por consulta (por defecto 1000)"
+        )
+
+    def handle(self, *args, **options):
+        hasta = None
+        if options['hasta']:
+            hasta = parse_datetime(options['hasta'])
+            if hasta is None:
+                raise CommandError("La fecha debe tener formato ISO (AAAA-MM-DDTHH:MM)")
+            if timezone.is_naive(hasta):
+                hasta = timezone.make_aware(hasta)
+
+        creados = tomar_snapshot(hasta=hasta, lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"Snapshots creados: {creados}"))
@@ -0,0 +1,7 @@
+from eventos.outbox import manejador
+from .miniaturas import procesar_cambio
+
+@manejador('imagen.modificada')
+def actualizar_miniaturas(evento):
+    """Borra las miniaturas de la imagen reemplazada y genera las de la nueva"""
+    procesar_cambio(evento.datos)
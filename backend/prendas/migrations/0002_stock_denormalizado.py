@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:09
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_stock_prendas(apps, schema_editor):
+    Prenda = apps.get_model('prendas', 'Prenda')
+    VariantePrenda = apps.get_model('prendas', 'VariantePrenda')
+    totales = (
+        VariantePrenda.objects.filter(prenda=OuterRef('pk'))
+        .order_by()
+        .values('prenda')
+        .annotate(total=Sum('stock'))
+        .values('total')
+    )
+    Prenda.objects.update(
+        stock_total=Coalesce(Subquery(totales), Value(0)),
+        tiene_stock=Exists(VariantePrenda.objects.filter(prenda=OuterRef('pk'), stock__gt=0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prendas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prenda',
+            name='stock_total',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Suma del stock de todas las variantes'),
+        ),
+        migrations.AddField(
+            model_name='prenda',
+            name='tiene_stock',
+            field=models.BooleanField(default=False, editable=False, help_text='Indica si al menos una variante tiene stock'),
+        ),
+        migrations.RunPython(calcular_stock_prendas, migrations.RunPython.noop),
+    ]
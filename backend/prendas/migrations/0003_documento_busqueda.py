@@ -0,0 +1,104 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:11
+
+from django.db import migrations, models, OperationalError
+import django.db.models.deletion
+from prendas.busqueda import normalizar
+
+SQL_POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX prendas_busqueda_tsv_idx ON prendas_documentobusqueda "
+    "USING gin (to_tsvector('spanish', texto))",
+    "CREATE INDEX prendas_busqueda_trgm_idx ON prendas_documentobusqueda "
+    "USING gin (texto gin_trgm_ops)",
+]
+
+SQL_POSTGRES_REVERSA = [
+    "DROP INDEX IF EXISTS prendas_busqueda_trgm_idx",
+    "DROP INDEX IF EXISTS prendas_busqueda_tsv_idx",
+]
+
+SQL_SQLITE = [
+    "CREATE VIRTUAL TABLE prendas_busqueda_fts USING fts5(texto, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER prendas_busqueda_fts_ai AFTER INSERT ON prendas_documentobusqueda BEGIN "
+    "INSERT INTO prendas_busqueda_fts(rowid, texto) VALUES (new.prenda_id, new.texto); END",
+    "CREATE TRIGGER prendas_busqueda_fts_ad AFTER DELETE ON prendas_documentobusqueda BEGIN "
+    "DELETE FROM prendas_busqueda_fts WHERE rowid = old.prenda_id; END",
+    "CREATE TRIGGER prendas_busqueda_fts_au AFTER UPDATE ON prendas_documentobusqueda BEGIN "
+    "UPDATE prendas_busqueda_fts SET texto = new.texto WHERE rowid = old.prenda_id; END",
+]
+
+SQL_SQLITE_REVERSA = [
+    "DROP TRIGGER IF EXISTS prendas_busqueda_fts_au",
+    "DROP TRIGGER IF EXISTS prendas_busqueda_fts_ad",
+    "DROP TRIGGER IF EXISTS prendas_busqueda_fts_ai",
+    "DROP TABLE IF EXISTS prendas_busqueda_fts",
+]
+
+
+def crear_indices(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for sql in SQL_POSTGRES:
+            schema_editor.execute(sql)
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQL_SQLITE[0])
+        except OperationalError:
+            # SQLite compilado sin FTS5: la búsqueda usa el documento sin índice
+            return
+        for sql in SQL_SQLITE[1:]:
+            schema_editor.execute(sql)
+
+
+def eliminar_indices(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for sql in SQL_POSTGRES_REVERSA:
+            schema_editor.execute(sql)
+    elif vendor == 'sqlite':
+        for sql in SQL_SQLITE_REVERSA:
+            schema_editor.execute(sql)
+
+
+def generar_documentos(apps, schema_editor):
+    Prenda = apps.get_model('prendas', 'Prenda')
+    VariantePrenda = apps.get_model('prendas', 'VariantePrenda')
+    DocumentoBusqueda = apps.get_model('prendas', 'DocumentoBusqueda')
+
+    extras = {}
+    for prenda_id, *valores in VariantePrenda.objects.values_list(
+        'prenda_id', 'talla__nombre', 'color__nombre', 'codigo_barras'
+    ).order_by().iterator():
+        extras.setdefault(prenda_id, set()).update(v for v in valores if v)
+
+    documentos = []
+    for pk, nombre, descripcion, codigo, categoria in Prenda.objects.values_list(
+        'pk', 'nombre', 'descripcion', 'codigo', 'categoria__nombre'
+    ).iterator():
+        partes = [nombre, codigo, categoria, descripcion, *sorted(extras.get(pk, ()))]
+        documentos.append(DocumentoBusqueda(prenda_id=pk, texto=normalizar(' '.join(p for p in partes if p))))
+    DocumentoBusqueda.objects.bulk_create(documentos, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prendas', '0002_stock_denormalizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentoBusqueda',
+            fields=[
+                ('prenda', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='documento_busqueda', serialize=False, to='prendas.prenda')),
+                ('texto', models.TextField(blank=True, default='')),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Documento de búsqueda',
+                'verbose_name_plural': 'Documentos de búsqueda',
+            },
+        ),
+        migrations.RunPython(crear_indices, eliminar_indices),
+        migrations.RunPython(generar_documentos, migrations.RunPython.noop),
+    ]
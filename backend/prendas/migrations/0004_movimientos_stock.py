@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def snapshot_inicial(apps, schema_editor):
+    """Toma el stock actual de cada variante como punto de partida del libro de movimientos"""
+    VariantePrenda = apps.get_model('prendas', 'VariantePrenda')
+    SnapshotStock = apps.get_model('prendas', 'SnapshotStock')
+    ahora = django.utils.timezone.now()
+    snapshots = [
+        SnapshotStock(variante_id=variante_id, fecha=ahora, stock=stock)
+        for variante_id, stock in VariantePrenda.objects.values_list('id', 'stock').iterator()
+    ]
+    SnapshotStock.objects.bulk_create(snapshots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('prendas', '0003_documento_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+                ('stock', models.IntegerField()),
+                ('variante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='prendas.varianteprenda')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Stock',
+                'verbose_name_plural': 'Snapshots de Stock',
+                'ordering': ['-fecha'],
+                'unique_together': {('variante', 'fecha')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimientoStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.IntegerField(help_text='Variación del stock (negativa para egresos)')),
+                ('motivo', models.CharField(choices=[('INICIAL', 'Stock inicial'), ('VENTA', 'Venta'), ('DEVOLUCION', 'Devolución'), ('AJUSTE', 'Ajuste de stock'), ('EDICION', 'Edición de la variante'), ('INVENTARIO', 'Conteo de inventario')], max_length=20)),
+                ('referencia', models.CharField(blank=True, help_text='Origen del movimiento (ej. venta:<id>)', max_length=100, null=True)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_stock', to=settings.AUTH_USER_MODEL)),
+                ('variante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='prendas.varianteprenda')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Stock',
+                'verbose_name_plural': 'Movimientos de Stock',
+                'ordering': ['-fecha', '-id'],
+                'indexes': [models.Index(fields=['variante', 'fecha'], name='prendas_mov_variant_049363_idx'), models.Index(fields=['fecha'], name='prendas_mov_fecha_384a7e_idx'), models.Index(fields=['referencia'], name='prendas_mov_referen_157982_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_inicial, migrations.RunPython.noop),
+    ]
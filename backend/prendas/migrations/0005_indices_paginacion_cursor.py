@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prendas', '0004_movimientos_stock'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='varianteprenda',
+            index=models.Index(fields=['creado', 'id'], name='prendas_var_creado_991fe6_idx'),
+        ),
+    ]
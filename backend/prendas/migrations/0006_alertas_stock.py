@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def generar_alertas(apps, schema_editor):
+    """Carga las alertas de las variantes que ya están en o por debajo del umbral por defecto"""
+    VariantePrenda = apps.get_model('prendas', 'VariantePrenda')
+    AlertaStock = apps.get_model('prendas', 'AlertaStock')
+    umbral = getattr(settings, 'STOCK_UMBRAL_POR_DEFECTO', 5)
+    ahora = django.utils.timezone.now()
+    alertas = [
+        AlertaStock(variante_id=variante_id, stock=stock, umbral=umbral, desde=ahora)
+        for variante_id, stock in VariantePrenda.objects.filter(
+            activo=True, prenda__activo=True, stock__lte=umbral
+        ).values_list('id', 'stock').iterator()
+    ]
+    AlertaStock.objects.bulk_create(alertas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prendas', '0005_indices_paginacion_cursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='umbral_stock',
+            field=models.PositiveIntegerField(blank=True, help_text='Stock mínimo de las variantes de la categoría antes de alertar', null=True),
+        ),
+        migrations.AddField(
+            model_name='prenda',
+            name='umbral_stock',
+            field=models.PositiveIntegerField(blank=True, help_text='Stock mínimo de las variantes antes de alertar (si no se indica, se usa el de la categoría)', null=True),
+        ),
+        migrations.AddField(
+            model_name='varianteprenda',
+            name='umbral_stock',
+            field=models.PositiveIntegerField(blank=True, help_text='Stock mínimo antes de alertar (si no se indica, se usa el de la prenda)', null=True),
+        ),
+        migrations.CreateModel(
+            name='AlertaStock',
+            fields=[
+                ('variante', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='alerta_stock', serialize=False, to='prendas.varianteprenda')),
+                ('stock', models.PositiveIntegerField()),
+                ('umbral', models.PositiveIntegerField()),
+                ('desde', models.DateTimeField(default=django.utils.timezone.now, help_text='Momento en que la variante entró en alerta')),
+            ],
+            options={
+                'verbose_name': 'Alerta de Stock',
+                'verbose_name_plural': 'Alertas de Stock',
+                'ordering': ['stock', 'desde'],
+                'indexes': [models.Index(fields=['stock', 'desde'], name='prendas_ale_stock_4ac061_idx')],
+            },
+        ),
+        migrations.RunPython(generar_alertas, migrations.RunPython.noop),
+    ]
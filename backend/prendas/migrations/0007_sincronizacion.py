@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prendas', '0006_alertas_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='color',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='talla',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='categoria',
+            index=models.Index(fields=['actualizado'], name='prendas_cat_actuali_781ab1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='color',
+            index=models.Index(fields=['actualizado'], name='prendas_col_actuali_1b035d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prenda',
+            index=models.Index(fields=['actualizado'], name='prendas_pre_actuali_0966da_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='talla',
+            index=models.Index(fields=['actualizado'], name='prendas_tal_actuali_8a4b5a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='varianteprenda',
+            index=models.Index(fields=['actualizado'], name='prendas_var_actuali_14cb0b_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prendas', '0007_sincronizacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagenprenda',
+            name='miniaturas_generadas',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Cuándo se generaron las miniaturas de la imagen actual', null=True),
+        ),
+        migrations.AddField(
+            model_name='prenda',
+            name='miniaturas_generadas',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Cuándo se generaron las miniaturas de la imagen principal actual', null=True),
+        ),
+    ]
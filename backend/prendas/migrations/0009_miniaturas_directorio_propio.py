@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def descartar_miniaturas(apps, schema_editor):
+    """
+    Los derivados generados antes se guardaban junto al original: ya no están donde se
+    los busca. Se dejan de anunciar hasta que generar_miniaturas los vuelva a generar.
+    """
+    for modelo in ('Prenda', 'ImagenPrenda'):
+        apps.get_model('prendas', modelo).objects.exclude(miniaturas_generadas=None).update(miniaturas_generadas=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prendas', '0008_miniaturas_generadas'),
+    ]
+
+    operations = [
+        migrations.RunPython(descartar_miniaturas, migrations.RunPython.noop),
+    ]
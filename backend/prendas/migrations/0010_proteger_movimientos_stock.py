@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prendas', '0009_miniaturas_directorio_propio'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movimientostock',
+            name='variante',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movimientos', to='prendas.varianteprenda'),
+        ),
+        migrations.AlterField(
+            model_name='snapshotstock',
+            name='variante',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='snapshots', to='prendas.varianteprenda'),
+        ),
+    ]
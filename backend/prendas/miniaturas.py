@@ -0,0 +1,148 @@
+"""
+Imágenes derivadas (miniaturas) de las fotos de prendas.
+
+Por cada imagen original se generan versiones reducidas en WebP y JPEG para cada
+tamaño de TAMANOS, en un directorio propio por original dentro de DIRECTORIO
+(prendas/foto.jpg -> miniaturas/prendas/foto.jpg/lista.webp, .../lista.jpg, ...). Los
+originales se suben a otros directorios, así que un derivado nunca pisa ni borra una
+foto subida aunque su nombre se parezca (prendas/foto_lista.jpg).
+
+Guardar, reemplazar o borrar una imagen publica 'imagen.modificada' en el outbox. El
+worker (manage.py procesar_eventos) borra los derivados de la imagen anterior, genera
+los de la nueva y recién entonces marca miniaturas_generadas en la fila. Los
+serializers anuncian los derivados solo con esa marca; mientras tanto (o si la
+generación falla) cada tamaño tiene únicamente la URL de la imagen original.
+"""
+import posixpath
+from io import BytesIO
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.db.models.functions import JSONObject
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+# Lado máximo en píxeles de cada tamaño
+TAMANOS = {
+    'lista': 160,
+    'tarjeta': 480,
+    'detalle': 1200,
+}
+FORMATOS = {
+    'webp': 'WEBP',
+    'jpg': 'JPEG',
+}
+CALIDAD = 80
+DIRECTORIO = 'miniaturas'
+
+
+def nombre_derivado(nombre, tamano, extension):
+    """Retorna el nombre en el storage del derivado de una imagen original"""
+    return posixpath.join(DIRECTORIO, nombre, f"{tamano}.{extension}")
+
+
+def urls_miniaturas(nombre, generadas, tamanos=None, storage=None):
+    """
+    Retorna {tamaño: {'original': url, extensión: url, ...}} para una imagen (nombre en
+    el storage), con los derivados solo si ya se generaron, o None si no hay imagen.
+    """
+    if not nombre:
+        return None
+    storage = storage or default_storage
+    original = storage.url(nombre)
+    return {
+        tamano: {
+            'original': original,
+            **({
+                extension: storage.url(nombre_derivado(nombre, tamano, extension))
+                for extension in FORMATOS
+            } if generadas else {}),
+        }
+        for tamano in (tamanos or TAMANOS)
+    }
+
+
+def anotacion(campo):
+    """Expresión con el nombre de la imagen y la marca de generación, para listados con values()"""
+    return JSONObject(nombre=F(campo), generadas=F('miniaturas_generadas'))
+
+
+def _rgb(imagen):
+    """Convierte la imagen a RGB para JPEG, con fondo blanco si tiene transparencia"""
+    if imagen.mode in ('RGBA', 'LA') or (imagen.mode == 'P' and 'transparency' in imagen.info):
+        imagen = imagen.convert('RGBA')
+        fondo = Image.new('RGB', imagen.size, (255, 255, 255))
+        fondo.paste(imagen, mask=imagen.getchannel('A'))
+        return fondo
+    return imagen.convert('RGB')
+
+
+def generar_derivados(nombre, forzar=False):
+    """
+    Genera los derivados de la imagen original indicada (nombre en el storage).
+
+    Omite los que ya existen salvo que se indique forzar. Solo usa el storage, nunca la
+    base de datos, así que también corre en los procesos del comando generar_miniaturas.
+    Retorna la cantidad generada.
+    """
+    pendientes = [
+        (tamano, extension)
+        for tamano in TAMANOS
+        for extension in FORMATOS
+        if forzar or not default_storage.exists(nombre_derivado(nombre, tamano, extension))
+    ]
+    if not pendientes:
+        return 0
+
+    with default_storage.open(nombre, 'rb') as archivo:
+        original = ImageOps.exif_transpose(Image.open(archivo))
+        original.load()
+
+    generados = 0
+    for tamano in {tamano for tamano, _ in pendientes}:
+        imagen = original.copy()
+        imagen.thumbnail((TAMANOS[tamano], TAMANOS[tamano]), Image.LANCZOS)
+        for extension in (e for t, e in pendientes if t == tamano):
+            salida = BytesIO()
+            formato = FORMATOS[extension]
+            convertida = _rgb(imagen) if formato == 'JPEG' else imagen
+            opciones = {'optimize': True, 'progressive': True} if formato == 'JPEG' else {'method': 4}
+            convertida.save(salida, formato, quality=CALIDAD, **opciones)
+
+            destino = nombre_derivado(nombre, tamano, extension)
+            if default_storage.exists(destino):
+                default_storage.delete(destino)
+            default_storage.save(destino, ContentFile(salida.getvalue()))
+            generados += 1
+    return generados
+
+
+def eliminar_derivados(nombre):
+    """Borra los derivados de una imagen original (los que existan). Retorna la cantidad borrada."""
+    borrados = 0
+    for tamano in TAMANOS:
+        for extension in FORMATOS:
+            derivado = nombre_derivado(nombre, tamano, extension)
+            if default_storage.exists(derivado):
+                default_storage.delete(derivado)
+                borrados += 1
+    return borrados
+
+
+def marcar_generadas(modelo, pk, campo, nombre):
+    """Marca los derivados como generados si la fila todavía tiene esa imagen"""
+    cambios = {'miniaturas_generadas': timezone.now()}
+    if any(f.name == 'actualizado' for f in modelo._meta.concrete_fields):
+        cambios['actualizado'] = cambios['miniaturas_generadas']  # Para la sincronización de la PWA
+    return modelo.objects.filter(pk=pk, **{campo: nombre}).update(**cambios)
+
+
+def procesar_cambio(datos):
+    """Aplica un evento 'imagen.modificada': borra los derivados viejos y genera los nuevos"""
+    anterior, nombre = datos.get('anterior'), datos.get('nombre')
+    if anterior and anterior != nombre:
+        eliminar_derivados(anterior)
+    if nombre:
+        generar_derivados(nombre)
+        marcar_generadas(apps.get_model(datos['modelo']), datos['id'], datos['campo'], nombre)
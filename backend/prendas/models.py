@@ -1,4 +1,6 @@
 from django.db import models
+from django.conf import settings
+from django.utils import timezone
 from django.utils.text import slugify
 import uuid
 
@@ -7,6 +9,7 @@ class Categoria(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
     descripcion = models.TextField(blank=True, null=True)
     slug = models.SlugField(max_length=120, unique=True, blank=True)
+    umbral_stock = models.PositiveIntegerField(blank=True, null=True, help_text="Stock mínimo de las variantes de la categoría antes de alertar")
     creado = models.DateTimeField(auto_now_add=True)
     actualizado = models.DateTimeField(auto_now=True)
     
@@ -14,6 +17,9 @@ class Categoria(models.Model):
         verbose_name = "Categoría"
         verbose_name_plural = "Categorías"
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['actualizado']),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -28,11 +34,15 @@ class Talla(models.Model):
     nombre = models.CharField(max_length=50, unique=True)
     descripcion = models.TextField(blank=True, null=True)
     orden = models.PositiveSmallIntegerField(default=0, help_text="Orden de visualización")
+    actualizado = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Talla"
         verbose_name_plural = "Tallas"
         ordering = ['orden', 'nombre']
+        indexes = [
+            models.Index(fields=['actualizado']),
+        ]
     
     def __str__(self):
         return self.nombre
@@ -41,11 +51,15 @@ class Color(models.Model):
     """Modelo para colores de prendas"""
     nombre = models.CharField(max_length=50, unique=True)
     codigo_hex = models.CharField(max_length=7, blank=True, null=True, help_text="Código hexadecimal del color (ej. #FF5733)")
+    actualizado = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Color"
         verbose_name_plural = "Colores"
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['actualizado']),
+        ]
     
     def __str__(self):
         return self.nombre
@@ -66,8 +80,12 @@ class Prenda(models.Model):
     precio_venta = models.DecimalField(max_digits=10, decimal_places=2, help_text="Precio de venta en ARS")
     genero = models.CharField(max_length=1, choices=GENERO_CHOICES, default='N')
     imagen_principal = models.ImageField(upload_to='prendas/', blank=True, null=True)
+    miniaturas_generadas = models.DateTimeField(blank=True, null=True, editable=False, help_text="Cuándo se generaron las miniaturas de la imagen principal actual")
     slug = models.SlugField(max_length=220, unique=True, blank=True)
     activo = models.BooleanField(default=True, help_text="Indica si la prenda está disponible para la venta")
+    stock_total = models.PositiveIntegerField(default=0, editable=False, help_text="Suma del stock de todas las variantes")
+    tiene_stock = models.BooleanField(default=False, editable=False, help_text="Indica si al menos una variante tiene stock")
+    umbral_stock = models.PositiveIntegerField(blank=True, null=True, help_text="Stock mínimo de las variantes antes de alertar (si no se indica, se usa el de la categoría)")
     creado = models.DateTimeField(auto_now_add=True)
     actualizado = models.DateTimeField(auto_now=True)
     
@@ -75,6 +93,9 @@ class Prenda(models.Model):
         verbose_name = "Prenda"
         verbose_name_plural = "Prendas"
         ordering = ['-creado']
+        indexes = [
+            models.Index(fields=['actualizado']),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.codigo:
@@ -89,16 +110,6 @@ class Prenda(models.Model):
     def __str__(self):
         return f"{self.nombre} ({self.codigo})"
     
-    @property
-    def stock_total(self):
-        """Retorna la suma del stock de todas las variantes de esta prenda"""
-        return sum(variante.stock for variante in self.variantes.all())
-    
-    @property
-    def tiene_stock(self):
-        """Retorna True si hay al menos una variante con stock disponible"""
-        return any(variante.stock > 0 for variante in self.variantes.all())
-    
     @property
     def margen_ganancia(self):
         """Calcula el margen de ganancia como porcentaje"""
@@ -113,6 +124,7 @@ class VariantePrenda(models.Model):
     color = models.ForeignKey(Color, on_delete=models.PROTECT)
     stock = models.PositiveIntegerField(default=0)
     codigo_barras = models.CharField(max_length=50, blank=True, null=True, unique=True)
+    umbral_stock = models.PositiveIntegerField(blank=True, null=True, help_text="Stock mínimo antes de alertar (si no se indica, se usa el de la prenda)")
     imagen = models.ImageField(upload_to='variantes/', blank=True, null=True)
     activo = models.BooleanField(default=True)
     creado = models.DateTimeField(auto_now_add=True)
@@ -123,6 +135,10 @@ class VariantePrenda(models.Model):
         verbose_name_plural = "Variantes de Prendas"
         unique_together = ('prenda', 'talla', 'color')
         ordering = ['prenda', 'talla', 'color']
+        indexes = [
+            models.Index(fields=['creado', 'id']),
+            models.Index(fields=['actualizado']),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.codigo_barras:
@@ -142,6 +158,7 @@ class ImagenPrenda(models.Model):
     """Modelo para imágenes adicionales de prendas"""
     prenda = models.ForeignKey(Prenda, on_delete=models.CASCADE, related_name='imagenes')
     imagen = models.ImageField(upload_to='prendas/')
+    miniaturas_generadas = models.DateTimeField(blank=True, null=True, editable=False, help_text="Cuándo se generaron las miniaturas de la imagen actual")
     titulo = models.CharField(max_length=100, blank=True, null=True)
     orden = models.PositiveSmallIntegerField(default=0, help_text="Orden de visualización")
     creado = models.DateTimeField(auto_now_add=True)
@@ -152,4 +169,105 @@ class ImagenPrenda(models.Model):
         ordering = ['prenda', 'orden']
     
     def __str__(self):
-        return f"Imagen {self.orden} de {self.prenda.nombre}"
\ No newline at end of file
+        return f"Imagen {self.orden} de {self.prenda.nombre}"
+
+class DocumentoBusqueda(models.Model):
+    """Texto de búsqueda desnormalizado de cada prenda (nombre, descripción, código, categoría, tallas y colores)"""
+    prenda = models.OneToOneField(Prenda, on_delete=models.CASCADE, primary_key=True, related_name='documento_busqueda')
+    texto = models.TextField(blank=True, default='')
+    actualizado = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Documento de búsqueda"
+        verbose_name_plural = "Documentos de búsqueda"
+    
+    def __str__(self):
+        return f"Documento de búsqueda de {self.prenda_id}"
+
+class MovimientoStockQuerySet(models.QuerySet):
+    """QuerySet de solo inserción: los movimientos no se modifican ni se eliminan"""
+    
+    def update(self, **kwargs):
+        raise TypeError("Los movimientos de stock no pueden modificarse")
+    
+    def delete(self):
+        raise TypeError("Los movimientos de stock no pueden eliminarse")
+
+class MovimientoStock(models.Model):
+    """Registro inmutable (solo inserción) de cada variación del stock de una variante"""
+    MOTIVO_CHOICES = (
+        ('INICIAL', 'Stock inicial'),
+        ('VENTA', 'Venta'),
+        ('DEVOLUCION', 'Devolución'),
+        ('AJUSTE', 'Ajuste de stock'),
+        ('EDICION', 'Edición de la variante'),
+        ('INVENTARIO', 'Conteo de inventario'),
+    )
+    
+    # PROTECT: el registro no se pierde al borrar la variante (las variantes se desactivan)
+    variante = models.ForeignKey(VariantePrenda, on_delete=models.PROTECT, related_name='movimientos')
+    cantidad = models.IntegerField(help_text="Variación del stock (negativa para egresos)")
+    motivo = models.CharField(max_length=20, choices=MOTIVO_CHOICES)
+    referencia = models.CharField(max_length=100, blank=True, null=True, help_text="Origen del movimiento (ej. venta:<id>)")
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True, related_name='movimientos_stock')
+    fecha = models.DateTimeField(default=timezone.now)
+    
+    objects = MovimientoStockQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = "Movimiento de Stock"
+        verbose_name_plural = "Movimientos de Stock"
+        ordering = ['-fecha', '-id']
+        indexes = [
+            models.Index(fields=['variante', 'fecha']),
+            models.Index(fields=['fecha']),
+            models.Index(fields=['referencia']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_motivo_display()} {self.cantidad:+d} - variante {self.variante_id}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError("Los movimientos de stock no pueden modificarse")
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise TypeError("Los movimientos de stock no pueden eliminarse")
+
+class SnapshotStock(models.Model):
+    """Stock consolidado de una variante a una fecha, calculado a partir de los movimientos"""
+    variante = models.ForeignKey(VariantePrenda, on_delete=models.PROTECT, related_name='snapshots')
+    fecha = models.DateTimeField()
+    stock = models.IntegerField()
+    
+    class Meta:
+        verbose_name = "Snapshot de Stock"
+        verbose_name_plural = "Snapshots de Stock"
+        ordering = ['-fecha']
+        unique_together = ('variante', 'fecha')
+    
+    def __str__(self):
+        return f"Stock {self.stock} de variante {self.variante_id} al {self.fecha:%d/%m/%Y %H:%M}"
+
+class AlertaStock(models.Model):
+    """Variante activa cuyo stock está en o por debajo de su umbral (se mantiene al cambiar el stock)"""
+    variante = models.OneToOneField(VariantePrenda, on_delete=models.CASCADE, primary_key=True, related_name='alerta_stock')
+    stock = models.PositiveIntegerField()
+    umbral = models.PositiveIntegerField()
+    desde = models.DateTimeField(default=timezone.now, help_text="Momento en que la variante entró en alerta")
+    
+    class Meta:
+        verbose_name = "Alerta de Stock"
+        verbose_name_plural = "Alertas de Stock"
+        ordering = ['stock', 'desde']
+        indexes = [
+            models.Index(fields=['stock', 'desde']),
+        ]
+    
+    def __str__(self):
+        return f"Stock {self.stock} (umbral {self.umbral}) de variante {self.variante_id}"
+    
+    @property
+    def agotada(self):
+        return self.stock == 0
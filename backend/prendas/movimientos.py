@@ -0,0 +1,128 @@
+"""
+Libro de movimientos de stock.
+
+Cada variación del stock de una variante queda registrada como un MovimientoStock
+(solo inserción, sin filas compartidas que se actualicen en cada operación). Para
+no tener que sumar toda la historia, periódicamente se consolidan SnapshotStock:
+el stock de una variante a una fecha se calcula como el último snapshot anterior
+más los movimientos posteriores a ese snapshot.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import transaction
+from django.db.models import Exists, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from eventos.outbox import publicar
+from .models import VariantePrenda, MovimientoStock, SnapshotStock
+
+# Margen para no consolidar movimientos de transacciones que todavía no confirmaron
+MARGEN_SNAPSHOT = timedelta(minutes=5)
+
+FECHA_MINIMA = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _usuario_valido(usuario):
+    if usuario is None or not getattr(usuario, 'is_authenticated', False):
+        return None
+    return usuario
+
+
+def registrar_movimientos(deltas, motivo, referencia=None, usuario=None, fecha=None):
+    """
+    Inserta un movimiento por cada variante de deltas ({variante_id: cantidad}) y publica
+    el evento stock.modificado en la misma transacción.
+    """
+    usuario = _usuario_valido(usuario)
+    fecha = fecha or timezone.now()
+    movimientos = MovimientoStock.objects.bulk_create([
+        MovimientoStock(
+            variante_id=variante_id,
+            cantidad=cantidad,
+            motivo=motivo,
+            referencia=referencia,
+            usuario=usuario,
+            fecha=fecha,
+        )
+        for variante_id, cantidad in deltas.items() if cantidad
+    ])
+    if movimientos:
+        publicar('stock.modificado', {
+            'variantes': {str(m.variante_id): m.cantidad for m in movimientos},
+            'motivo': motivo,
+            'referencia': referencia,
+            'fecha': fecha.isoformat(),
+        })
+
+
+def anotar_stock_a_fecha(variantes, fecha):
+    """
+    Anota stock_a_fecha en un queryset de variantes: el último snapshot hasta la fecha
+    más la suma de los movimientos posteriores a ese snapshot.
+    """
+    snapshots = SnapshotStock.objects.filter(variante=OuterRef('pk'), fecha__lte=fecha).order_by('-fecha')
+    variantes = variantes.annotate(
+        stock_snapshot=Coalesce(Subquery(snapshots.values('stock')[:1]), Value(0)),
+        fecha_snapshot=Coalesce(Subquery(snapshots.values('fecha')[:1]), Value(FECHA_MINIMA)),
+    )
+    movimientos = (
+        MovimientoStock.objects.filter(
+            variante=OuterRef('pk'),
+            fecha__gt=OuterRef('fecha_snapshot'),
+            fecha__lte=fecha,
+        )
+        .order_by()
+        .values('variante')
+        .annotate(total=Sum('cantidad'))
+        .values('total')
+    )
+    return variantes.annotate(
+        stock_a_fecha=F('stock_snapshot') + Coalesce(Subquery(movimientos, output_field=IntegerField()), Value(0))
+    )
+
+
+def stock_a_fecha(variante_id, fecha):
+    """Retorna el stock que tenía la variante en la fecha indicada"""
+    return anotar_stock_a_fecha(
+        VariantePrenda.objects.filter(pk=variante_id), fecha
+    ).values_list('stock_a_fecha', flat=True).first()
+
+
+def tomar_snapshot(hasta=None, lote=1000):
+    """
+    Consolida un snapshot a la fecha indicada (por defecto, ahora menos un margen)
+    para cada variante que tuvo movimientos desde su último snapshot.
+
+    El stock del snapshot se calcula desde el libro de movimientos, de modo que las
+    consultas históricas son exactas respecto del libro. Retorna la cantidad de
+    snapshots creados.
+    """
+    hasta = hasta or timezone.now() - MARGEN_SNAPSHOT
+    ultimo_snapshot = SnapshotStock.objects.filter(variante=OuterRef('pk')).order_by('-fecha').values('fecha')[:1]
+    variantes = (
+        VariantePrenda.objects.annotate(
+            ultimo_snapshot=Coalesce(Subquery(ultimo_snapshot), Value(FECHA_MINIMA))
+        )
+        .filter(
+            Exists(MovimientoStock.objects.filter(
+                variante=OuterRef('pk'),
+                fecha__gt=OuterRef('ultimo_snapshot'),
+                fecha__lte=hasta,
+            )),
+            ultimo_snapshot__lt=hasta,
+        )
+        .order_by('pk')
+    )
+    variantes = anotar_stock_a_fecha(variantes, hasta).values_list('pk', 'stock_a_fecha')
+
+    creados = 0
+    snapshots = []
+    with transaction.atomic():
+        for variante_id, stock in variantes.iterator(chunk_size=lote):
+            snapshots.append(SnapshotStock(variante_id=variante_id, fecha=hasta, stock=stock))
+            if len(snapshots) >= lote:
+                SnapshotStock.objects.bulk_create(snapshots)
+                creados += len(snapshots)
+                snapshots = []
+        SnapshotStock.objects.bulk_create(snapshots)
+        creados += len(snapshots)
+    return creados
@@ -0,0 +1,59 @@
+"""
+Cache de datos de referencia: categorías, tallas y colores.
+
+Son tablas chicas que cambian muy poco y se consultan en casi todas las pantallas.
+Se guardan completas en una cache local de cada proceso, invalidada por una versión
+global que se incrementa al guardar o eliminar cualquiera de ellas. La misma versión
+sirve de ETag para las respuestas de sus endpoints, de modo que un If-None-Match
+vigente se responde con 304 sin consultar la base de datos.
+"""
+import hashlib
+from .cache import CacheLocalVersionada
+from .models import Categoria, Talla, Color
+
+cache_referencias = CacheLocalVersionada('referencias', maximo=1000)
+
+MODELOS = (Categoria, Talla, Color)
+
+
+def _cargar(modelo):
+    objetos = list(modelo.objects.all())
+    return {
+        'lista': tuple(objetos),
+        'por_id': {objeto.pk: objeto for objeto in objetos},
+    }
+
+
+def _datos(modelo):
+    return cache_referencias.obtener(('modelo', modelo._meta.label), lambda: _cargar(modelo))
+
+
+def todos(modelo):
+    """Retorna todas las instancias del modelo en su orden por defecto"""
+    return _datos(modelo)['lista']
+
+
+def por_id(modelo, pk):
+    """Retorna la instancia con ese id, o None si no existe"""
+    return _datos(modelo)['por_id'].get(pk)
+
+
+def primero(modelo):
+    """Equivalente cacheado de modelo.objects.first()"""
+    lista = todos(modelo)
+    return lista[0] if lista else None
+
+
+def etag(*partes):
+    """ETag fuerte para una respuesta derivada de los datos de referencia vigentes"""
+    clave = hashlib.md5('|'.join(map(str, partes)).encode('utf-8')).hexdigest()[:16]
+    return f'"ref-{cache_referencias.version()}-{clave}"'
+
+
+def etag_coincide(request, valor):
+    """Indica si el If-None-Match del request incluye el ETag indicado"""
+    encabezado = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if not encabezado:
+        return False
+    etiquetas = [e.strip() for e in encabezado.split(',')]
+    return '*' in etiquetas or valor in etiquetas
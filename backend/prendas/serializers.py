@@ -1,29 +1,92 @@
+from django.db import transaction, IntegrityError
+from django.db.models import BooleanField, ExpressionWrapper, Q
 from rest_framework import serializers
-from .models import Categoria, Talla, Color, Prenda, VariantePrenda, ImagenPrenda
+from san_pedrito.campos import CamposDinamicosMixin
+from .models import Categoria, Talla, Color, Prenda, VariantePrenda, ImagenPrenda, MovimientoStock, AlertaStock
+from .alertas import actualizar_alertas
+from .busqueda import actualizar_documentos
+from .etiquetas import CODIGOS, FORMATOS, MAXIMO_ETIQUETAS, EtiquetasInvalidas, cantidad_paginas, datos_etiquetas
+from .escaneo import cache_escaneo
+from .facetas import version_catalogo
+from . import miniaturas
+from .miniaturas import urls_miniaturas
+from .movimientos import registrar_movimientos
+from . import referencias
+from .stock import actualizar_stock_prendas
 
-class CategoriaSerializer(serializers.ModelSerializer):
+class ReferenciaField(serializers.PrimaryKeyRelatedField):
+    """Relación con una categoría, talla o color resuelta desde la cache de referencias"""
+    
+    def __init__(self, modelo, **kwargs):
+        self.modelo = modelo
+        kwargs.setdefault('queryset', modelo.objects.all())
+        super().__init__(**kwargs)
+    
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        # Si no está en la cache (ej. creada en esta misma transacción) se busca en la base
+        objeto = referencias.por_id(self.modelo, pk) or self.modelo.objects.filter(pk=pk).first()
+        if objeto is None:
+            self.fail('does_not_exist', pk_value=data)
+        return objeto
+
+class MiniaturasField(serializers.ReadOnlyField):
+    """
+    URL de la imagen original y de sus derivados (WebP y JPEG) por tamaño. Los derivados
+    se incluyen solo cuando ya se generaron (miniaturas_generadas de la fila); en los
+    listados con values() el valor sale de la anotación miniaturas.anotacion(campo).
+    """
+    
+    def __init__(self, tamanos=None, **kwargs):
+        self.tamanos = tamanos
+        super().__init__(**kwargs)
+    
+    def get_attribute(self, instance):
+        imagen = super().get_attribute(instance)
+        return {'nombre': imagen.name if imagen else None, 'generadas': instance.miniaturas_generadas}
+    
+    def to_representation(self, value):
+        storage = self.parent.Meta.model._meta.get_field(self.source).storage
+        urls = urls_miniaturas(value['nombre'], value['generadas'], self.tamanos, storage)
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {
+            tamano: {extension: request.build_absolute_uri(url) for extension, url in formatos.items()}
+            for tamano, formatos in urls.items()
+        }
+
+class CategoriaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Categoria
-        fields = ['id', 'nombre', 'descripcion', 'slug', 'creado', 'actualizado']
+        fields = ['id', 'nombre', 'descripcion', 'slug', 'umbral_stock', 'creado', 'actualizado']
         read_only_fields = ['slug', 'creado', 'actualizado']
 
-class TallaSerializer(serializers.ModelSerializer):
+class TallaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Talla
         fields = ['id', 'nombre', 'descripcion', 'orden']
 
-class ColorSerializer(serializers.ModelSerializer):
+class ColorSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Color
         fields = ['id', 'nombre', 'codigo_hex']
 
-class ImagenPrendaSerializer(serializers.ModelSerializer):
+class ImagenPrendaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    miniaturas = MiniaturasField(source='imagen')
+    
     class Meta:
         model = ImagenPrenda
-        fields = ['id', 'imagen', 'titulo', 'orden', 'creado']
+        fields = ['id', 'imagen', 'miniaturas', 'titulo', 'orden', 'creado']
         read_only_fields = ['creado']
+        dependencias = {'miniaturas': ['imagen', 'miniaturas_generadas']}
 
-class VariantePrendaSerializer(serializers.ModelSerializer):
+class VariantePrendaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     talla_nombre = serializers.ReadOnlyField(source='talla.nombre')
     color_nombre = serializers.ReadOnlyField(source='color.nombre')
     color_hex = serializers.ReadOnlyField(source='color.codigo_hex')
@@ -31,44 +94,57 @@ class VariantePrendaSerializer(serializers.ModelSerializer):
     class Meta:
         model = VariantePrenda
         fields = ['id', 'talla', 'talla_nombre', 'color', 'color_nombre', 'color_hex', 
-                  'stock', 'codigo_barras', 'imagen', 'activo', 'disponible', 
+                  'stock', 'umbral_stock', 'codigo_barras', 'imagen', 'activo', 'disponible', 
                   'creado', 'actualizado']
         read_only_fields = ['codigo_barras', 'disponible', 'creado', 'actualizado']
+        expandibles = {'talla': TallaSerializer, 'color': ColorSerializer}
+        dependencias = {'disponible': ['stock', 'activo']}
+        anotaciones = {'disponible': ExpressionWrapper(Q(stock__gt=0, activo=True), output_field=BooleanField())}
 
 class VariantePrendaDetalleSerializer(VariantePrendaSerializer):
     talla = TallaSerializer(read_only=True)
     color = ColorSerializer(read_only=True)
 
-class PrendaListSerializer(serializers.ModelSerializer):
+class PrendaListSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     categoria_nombre = serializers.ReadOnlyField(source='categoria.nombre')
     stock_total = serializers.ReadOnlyField()
     tiene_stock = serializers.ReadOnlyField()
+    miniaturas = MiniaturasField(source='imagen_principal', tamanos=['lista', 'tarjeta'])
     
     class Meta:
         model = Prenda
         fields = ['id', 'codigo', 'nombre', 'categoria', 'categoria_nombre', 
-                  'precio_venta', 'genero', 'imagen_principal', 'slug', 
+                  'precio_venta', 'genero', 'imagen_principal', 'miniaturas', 'slug', 
                   'activo', 'stock_total', 'tiene_stock', 'creado']
         read_only_fields = ['codigo', 'slug', 'stock_total', 'tiene_stock', 'creado']
+        expandibles = {'categoria': CategoriaSerializer}
+        dependencias = {'miniaturas': ['imagen_principal', 'miniaturas_generadas']}
+        anotaciones = {'miniaturas': miniaturas.anotacion('imagen_principal')}
 
-class PrendaDetalleSerializer(serializers.ModelSerializer):
+class PrendaDetalleSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     categoria = CategoriaSerializer(read_only=True)
     variantes = VariantePrendaSerializer(many=True, read_only=True)
     imagenes = ImagenPrendaSerializer(many=True, read_only=True)
     stock_total = serializers.ReadOnlyField()
     tiene_stock = serializers.ReadOnlyField()
     margen_ganancia = serializers.ReadOnlyField()
+    miniaturas = MiniaturasField(source='imagen_principal')
     
     class Meta:
         model = Prenda
         fields = ['id', 'codigo', 'nombre', 'descripcion', 'categoria', 
-                  'precio_costo', 'precio_venta', 'genero', 'imagen_principal', 
-                  'slug', 'activo', 'stock_total', 'tiene_stock', 'margen_ganancia',
+                  'precio_costo', 'precio_venta', 'genero', 'imagen_principal', 'miniaturas', 
+                  'slug', 'activo', 'stock_total', 'tiene_stock', 'umbral_stock', 'margen_ganancia',
                   'variantes', 'imagenes', 'creado', 'actualizado']
         read_only_fields = ['codigo', 'slug', 'stock_total', 'tiene_stock', 
                            'margen_ganancia', 'creado', 'actualizado']
+        dependencias = {
+            'margen_ganancia': ['precio_costo', 'precio_venta'],
+            'miniaturas': ['imagen_principal', 'miniaturas_generadas'],
+        }
 
 class PrendaCreateUpdateSerializer(serializers.ModelSerializer):
+    categoria = ReferenciaField(Categoria)
     imagenes = serializers.ListField(
         child=serializers.ImageField(allow_empty_file=False, use_url=False),
         write_only=True, required=False
@@ -77,7 +153,7 @@ class PrendaCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Prenda
         fields = ['nombre', 'descripcion', 'categoria', 'precio_costo',
-                  'precio_venta', 'genero', 'imagen_principal', 'activo', 'imagenes']
+                  'precio_venta', 'genero', 'imagen_principal', 'activo', 'umbral_stock', 'imagenes']
     
     def validate(self, data):
         # Validar que el precio de venta sea mayor que el precio de costo
@@ -92,8 +168,8 @@ class PrendaCreateUpdateSerializer(serializers.ModelSerializer):
 
         # Crear una variante por defecto con stock 1
         try:
-            default_talla = Talla.objects.first()
-            default_color = Color.objects.first()
+            default_talla = referencias.primero(Talla)
+            default_color = referencias.primero(Color)
             if default_talla and default_color:
                 VariantePrenda.objects.create(
                     prenda=prenda,
@@ -124,9 +200,12 @@ class ImagenPrendaCreateSerializer(serializers.ModelSerializer):
         return value
 
 class VariantePrendaCreateUpdateSerializer(serializers.ModelSerializer):
+    talla = ReferenciaField(Talla)
+    color = ReferenciaField(Color)
+    
     class Meta:
         model = VariantePrenda
-        fields = ['prenda', 'talla', 'color', 'stock', 'imagen', 'activo']
+        fields = ['prenda', 'talla', 'color', 'stock', 'umbral_stock', 'imagen', 'activo']
         
     def validate(self, data):
         # Verificar que no exista ya una variante con la misma combinación de prenda, talla y color
@@ -137,4 +216,179 @@ class VariantePrendaCreateUpdateSerializer(serializers.ModelSerializer):
                 color=data['color']
             ).exists():
                 raise serializers.ValidationError("Ya existe una variante con esta combinación de prenda, talla y color")
-        return data
\ No newline at end of file
+        return data
+
+class MatrizVariantesSerializer(serializers.Serializer):
+    """
+    Crea la grilla de variantes talla × color de una prenda en pocas consultas.
+    
+    stock puede ser un entero (el mismo para todas las variantes) o una matriz con
+    una fila por talla y una columna por color. Las combinaciones que ya existen se omiten.
+    """
+    prenda = serializers.PrimaryKeyRelatedField(queryset=Prenda.objects.all())
+    tallas = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    colores = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    stock = serializers.JSONField(required=False, default=0)
+    activo = serializers.BooleanField(required=False, default=True)
+    
+    def _validar_ids(self, ids, modelo, nombre):
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError({nombre: "Hay elementos repetidos"})
+        objetos = {i: referencias.por_id(modelo, i) for i in ids}
+        if None in objetos.values():
+            # Alguna no está en la cache (ej. recién creada): buscar todas en la base
+            objetos = modelo.objects.in_bulk(ids)
+        faltantes = [i for i in ids if i not in objetos]
+        if faltantes:
+            raise serializers.ValidationError({nombre: f"No existen: {', '.join(map(str, faltantes))}"})
+        return [objetos[i] for i in ids]
+    
+    def _validar_stock(self, stock, filas, columnas):
+        def es_cantidad(valor):
+            return isinstance(valor, int) and not isinstance(valor, bool) and valor >= 0
+        
+        if es_cantidad(stock):
+            return [[stock] * columnas for _ in range(filas)]
+        if (isinstance(stock, list) and len(stock) == filas
+                and all(isinstance(fila, list) and len(fila) == columnas for fila in stock)
+                and all(es_cantidad(valor) for fila in stock for valor in fila)):
+            return stock
+        raise serializers.ValidationError({
+            'stock': "Debe ser un entero no negativo o una matriz de tallas × colores de enteros no negativos"
+        })
+    
+    def validate(self, data):
+        data['tallas'] = self._validar_ids(data['tallas'], Talla, 'tallas')
+        data['colores'] = self._validar_ids(data['colores'], Color, 'colores')
+        data['stock'] = self._validar_stock(data['stock'], len(data['tallas']), len(data['colores']))
+        return data
+    
+    def create(self, validated_data):
+        prenda = validated_data['prenda']
+        request = self.context.get('request')
+        
+        with transaction.atomic():
+            existentes = set(
+                VariantePrenda.objects.filter(prenda=prenda).values_list('talla_id', 'color_id')
+            )
+            variantes = [
+                # bulk_create no llama a save(): el código de barras se arma acá
+                VariantePrenda(
+                    prenda=prenda,
+                    talla=talla,
+                    color=color,
+                    stock=validated_data['stock'][i][j],
+                    activo=validated_data['activo'],
+                    codigo_barras=f"{prenda.codigo}-{talla.id}-{color.id}",
+                )
+                for i, talla in enumerate(validated_data['tallas'])
+                for j, color in enumerate(validated_data['colores'])
+                if (talla.id, color.id) not in existentes
+            ]
+            try:
+                with transaction.atomic():
+                    VariantePrenda.objects.bulk_create(variantes)
+            except IntegrityError:
+                raise serializers.ValidationError(
+                    "Otra operación creó variantes de esta prenda al mismo tiempo, o hay códigos de barras repetidos"
+                )
+            
+            # bulk_create no dispara señales: mantener stock, alertas, búsqueda, movimientos y cache
+            if variantes:
+                actualizar_stock_prendas([prenda.pk])
+                actualizar_alertas(v.pk for v in variantes)
+                actualizar_documentos([prenda.pk])
+                registrar_movimientos(
+                    {v.pk: v.stock for v in variantes}, 'INICIAL',
+                    usuario=getattr(request, 'user', None)
+                )
+                cache_escaneo.invalidar({prenda.codigo, *(v.codigo_barras for v in variantes)})
+                version_catalogo.invalidar()
+        
+        self.omitidas = len(validated_data['tallas']) * len(validated_data['colores']) - len(variantes)
+        return variantes
+
+class EtiquetasSerializer(serializers.Serializer):
+    """
+    Pedido de una hoja de etiquetas. Las variantes se indican por id, con una prenda (todas
+    sus variantes activas) o ambas. copias es la cantidad de etiquetas por variante; con
+    por_stock se imprime una por unidad en stock (ej. al recibir un envío).
+    """
+    variantes = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+    prenda = serializers.PrimaryKeyRelatedField(queryset=Prenda.objects.all(), required=False)
+    copias = serializers.IntegerField(min_value=1, max_value=100, default=1)
+    por_stock = serializers.BooleanField(default=False)
+    codigo = serializers.ChoiceField(choices=CODIGOS, default='qr')
+    formato = serializers.ChoiceField(choices=list(FORMATOS), default='pdf')
+    pagina = serializers.IntegerField(min_value=1, default=1, help_text="Página a generar en formato png")
+    
+    def validate(self, data):
+        ids = list(dict.fromkeys(data['variantes']))
+        if 'prenda' in data:
+            de_la_prenda = (
+                VariantePrenda.objects.filter(prenda=data['prenda'], activo=True)
+                .order_by('talla__orden', 'talla__nombre', 'color__nombre')
+                .values_list('pk', flat=True)
+            )
+            ids.extend(pk for pk in de_la_prenda if pk not in ids)
+        if not ids:
+            raise serializers.ValidationError("Debe indicar las variantes o una prenda con variantes activas")
+        
+        if data['por_stock']:
+            stock = dict(VariantePrenda.objects.filter(pk__in=ids).values_list('pk', 'stock'))
+            # Las que no existen quedan con una copia para que datos_etiquetas las informe
+            copias = {pk: stock.get(pk, 1) for pk in ids if stock.get(pk, 1)}
+            if not copias:
+                raise serializers.ValidationError("Ninguna de las variantes tiene stock")
+        else:
+            copias = {pk: data['copias'] for pk in ids}
+        if sum(copias.values()) > MAXIMO_ETIQUETAS:
+            raise serializers.ValidationError(f"No se pueden generar más de {MAXIMO_ETIQUETAS} etiquetas por pedido")
+        
+        try:
+            data['etiquetas'] = datos_etiquetas(copias)
+        except EtiquetasInvalidas as e:
+            raise serializers.ValidationError({'variantes': str(e)})
+        data['paginas'] = cantidad_paginas(len(data['etiquetas']))
+        if data['formato'] == 'png' and data['pagina'] > data['paginas']:
+            raise serializers.ValidationError({'pagina': f"La hoja tiene {data['paginas']} páginas"})
+        return data
+
+class MovimientoStockSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    variante_descripcion = serializers.ReadOnlyField(source='variante.__str__')
+    motivo_display = serializers.ReadOnlyField(source='get_motivo_display')
+    usuario_email = serializers.ReadOnlyField(source='usuario.email')
+    
+    class Meta:
+        model = MovimientoStock
+        fields = ['id', 'variante', 'variante_descripcion', 'cantidad', 'motivo', 'motivo_display',
+                  'referencia', 'usuario', 'usuario_email', 'fecha']
+        read_only_fields = fields
+
+class StockAFechaSerializer(serializers.ModelSerializer):
+    """Stock histórico de una variante (queryset anotado con anotar_stock_a_fecha)"""
+    prenda_nombre = serializers.ReadOnlyField(source='prenda.nombre')
+    talla_nombre = serializers.ReadOnlyField(source='talla.nombre')
+    color_nombre = serializers.ReadOnlyField(source='color.nombre')
+    stock_a_fecha = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = VariantePrenda
+        fields = ['id', 'prenda', 'prenda_nombre', 'talla', 'talla_nombre', 'color', 'color_nombre',
+                  'codigo_barras', 'stock', 'stock_a_fecha']
+
+class AlertaStockSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    prenda = serializers.ReadOnlyField(source='variante.prenda_id')
+    prenda_nombre = serializers.ReadOnlyField(source='variante.prenda.nombre')
+    prenda_slug = serializers.ReadOnlyField(source='variante.prenda.slug')
+    talla_nombre = serializers.ReadOnlyField(source='variante.talla.nombre')
+    color_nombre = serializers.ReadOnlyField(source='variante.color.nombre')
+    codigo_barras = serializers.ReadOnlyField(source='variante.codigo_barras')
+    agotada = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = AlertaStock
+        fields = ['variante', 'prenda', 'prenda_nombre', 'prenda_slug', 'talla_nombre', 'color_nombre',
+                  'codigo_barras', 'stock', 'umbral', 'agotada', 'desde']
+        read_only_fields = fields
+        dependencias = {'agotada': ['stock']}
@@ -0,0 +1,202 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_init, post_save, post_delete
+from django.dispatch import receiver
+from eventos.outbox import publicar
+from .models import Categoria, Talla, Color, Prenda, VariantePrenda, ImagenPrenda
+from .movimientos import registrar_movimientos
+from .stock import actualizar_stock_prendas
+from .alertas import actualizar_alertas, actualizar_alertas_de_prendas
+from .busqueda import actualizar_documentos
+from .escaneo import cache_escaneo, codigos_de_prendas
+from .facetas import version_catalogo
+from .referencias import cache_referencias
+
+CAMPOS_BUSQUEDA_VARIANTE = {'talla', 'color', 'codigo_barras'}
+CAMPOS_ALERTA = {'stock', 'umbral_stock', 'activo'}
+# Campos que solo cambian con el stock: no afectan a la cache de escaneo
+CAMPOS_STOCK_VARIANTE = {'stock', 'actualizado'}
+CAMPOS_STOCK_PRENDA = {'stock_total', 'tiene_stock', 'actualizado'}
+CAMPOS_IMAGEN = {Prenda: 'imagen_principal', ImagenPrenda: 'imagen'}
+
+def _reindexar_en_lotes(prenda_ids, tamanio=1000):
+    prenda_ids = list(prenda_ids)
+    for inicio in range(0, len(prenda_ids), tamanio):
+        actualizar_documentos(prenda_ids[inicio:inicio + tamanio])
+
+@receiver(pre_save, sender=VariantePrenda)
+def leer_stock_anterior(sender, instance, update_fields=None, **kwargs):
+    """Guarda el stock actual de la variante antes de una edición completa (admin, API de variantes)."""
+    if instance._state.adding or (update_fields is not None and 'stock' not in update_fields):
+        return
+    variantes = VariantePrenda.objects.filter(pk=instance.pk)
+    if transaction.get_connection().in_atomic_block:
+        variantes = variantes.select_for_update()
+    instance._stock_anterior = variantes.values_list('stock', flat=True).first()
+
+@receiver(post_save, sender=VariantePrenda)
+def registrar_movimiento_edicion(sender, instance, created, **kwargs):
+    """Registra en el libro de movimientos el stock inicial o la diferencia de una edición."""
+    usuario = getattr(instance, 'usuario_movimiento', None)
+    if created:
+        registrar_movimientos({instance.pk: instance.stock}, 'INICIAL', usuario=usuario)
+        return
+    anterior = getattr(instance, '_stock_anterior', None)
+    if anterior is not None:
+        registrar_movimientos({instance.pk: instance.stock - anterior}, 'EDICION', usuario=usuario)
+        del instance._stock_anterior
+
+@receiver(post_save, sender=VariantePrenda)
+@receiver(post_delete, sender=VariantePrenda)
+def sincronizar_stock_prenda(sender, instance, **kwargs):
+    """Mantiene actualizados stock_total y tiene_stock de la prenda al modificar una variante."""
+    if isinstance(kwargs.get('origin'), Prenda):
+        return  # La prenda se está eliminando junto con sus variantes
+    actualizar_stock_prendas([instance.prenda_id])
+
+@receiver(post_save, sender=VariantePrenda)
+def actualizar_alerta_variante(sender, instance, update_fields=None, **kwargs):
+    """Agrega o quita la variante de las alertas de stock bajo."""
+    if update_fields is not None and not CAMPOS_ALERTA.intersection(update_fields):
+        return
+    actualizar_alertas([instance.pk])
+
+@receiver(post_save, sender=Prenda)
+def actualizar_alertas_prenda(sender, instance, created, update_fields=None, **kwargs):
+    """Recalcula las alertas de las variantes si cambió el umbral o el estado de la prenda."""
+    if created or (update_fields is not None and not CAMPOS_ALERTA.intersection(update_fields)):
+        return
+    actualizar_alertas_de_prendas({'pk': instance.pk})
+
+@receiver(post_save, sender=Categoria)
+def actualizar_alertas_categoria(sender, instance, created, update_fields=None, **kwargs):
+    """Recalcula las alertas de las variantes de la categoría si cambió su umbral."""
+    if created or (update_fields is not None and 'umbral_stock' not in update_fields):
+        return
+    actualizar_alertas_de_prendas({'categoria': instance.pk})
+
+@receiver(post_save, sender=VariantePrenda)
+@receiver(post_delete, sender=VariantePrenda)
+def reindexar_variante(sender, instance, update_fields=None, **kwargs):
+    """Actualiza el documento de búsqueda si cambió la talla, el color o el código de la variante."""
+    if isinstance(kwargs.get('origin'), Prenda):
+        return
+    if update_fields is not None and not CAMPOS_BUSQUEDA_VARIANTE.intersection(update_fields):
+        return
+    actualizar_documentos([instance.prenda_id])
+
+@receiver(post_save, sender=Prenda)
+def reindexar_prenda(sender, instance, **kwargs):
+    """Actualiza el documento de búsqueda de la prenda."""
+    actualizar_documentos([instance.pk])
+
+@receiver(post_save, sender=Categoria)
+def reindexar_categoria(sender, instance, created, **kwargs):
+    """Actualiza los documentos de las prendas de la categoría (por si cambió su nombre)."""
+    if not created:
+        _reindexar_en_lotes(instance.prendas.values_list('pk', flat=True))
+
+@receiver(post_save, sender=Talla)
+@receiver(post_save, sender=Color)
+def reindexar_talla_color(sender, instance, created, **kwargs):
+    """Actualiza los documentos de las prendas que usan la talla o el color."""
+    if created:
+        return
+    filtro = {'talla': instance} if sender is Talla else {'color': instance}
+    _reindexar_en_lotes(
+        VariantePrenda.objects.filter(**filtro).order_by().values_list('prenda_id', flat=True).distinct()
+    )
+
+@receiver(post_init, sender=VariantePrenda)
+def recordar_codigo_barras(sender, instance, **kwargs):
+    """Guarda el código de barras con el que se cargó la variante: si cambia, hay que descartar los dos."""
+    instance._codigo_barras_original = instance.__dict__.get('codigo_barras')
+
+@receiver(post_save, sender=VariantePrenda)
+@receiver(post_delete, sender=VariantePrenda)
+def invalidar_escaneo_variante(sender, instance, update_fields=None, **kwargs):
+    """Descarta los escaneos cacheados del código de la variante y del de su prenda."""
+    if update_fields is not None and not set(update_fields) - CAMPOS_STOCK_VARIANTE:
+        return  # El stock no se cachea
+    if VariantePrenda.prenda.is_cached(instance):
+        codigo_prenda = instance.prenda.codigo
+    else:
+        codigo_prenda = Prenda.objects.filter(pk=instance.prenda_id).values_list('codigo', flat=True).first()
+    cache_escaneo.invalidar({instance._codigo_barras_original, instance.codigo_barras, codigo_prenda})
+    instance._codigo_barras_original = instance.codigo_barras
+
+@receiver(post_save, sender=Prenda)
+@receiver(post_delete, sender=Prenda)
+def invalidar_escaneo_prenda(sender, instance, update_fields=None, **kwargs):
+    """Descarta los escaneos cacheados de la prenda y de sus variantes."""
+    if update_fields is not None and not set(update_fields) - CAMPOS_STOCK_PRENDA:
+        return
+    cache_escaneo.invalidar(codigos_de_prendas([instance.pk]) | {instance.codigo})
+
+@receiver(post_save, sender=VariantePrenda)
+@receiver(post_delete, sender=VariantePrenda)
+@receiver(post_save, sender=Prenda)
+@receiver(post_delete, sender=Prenda)
+def invalidar_facetas(sender, instance, update_fields=None, **kwargs):
+    """Descarta las facetas cacheadas si cambió el catálogo (no con los cambios de stock)."""
+    if isinstance(kwargs.get('origin'), Prenda) and sender is VariantePrenda:
+        return  # Se invalida con la baja de la prenda
+    solo_stock = CAMPOS_STOCK_PRENDA if sender is Prenda else CAMPOS_STOCK_VARIANTE
+    if update_fields is not None and not set(update_fields) - solo_stock:
+        return
+    version_catalogo.invalidar()
+
+@receiver(post_save, sender=Talla)
+@receiver(post_delete, sender=Talla)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+def invalidar_cache_escaneo(sender, **kwargs):
+    """Descarta todos los escaneos cacheados (los nombres de talla y color están en todos)."""
+    cache_escaneo.invalidar()
+
+@receiver(post_init, sender=Prenda)
+@receiver(post_init, sender=ImagenPrenda)
+def recordar_imagen(sender, instance, **kwargs):
+    """Guarda el nombre de la imagen con la que se cargó la fila, para detectar si se reemplaza."""
+    valor = instance.__dict__.get(CAMPOS_IMAGEN[sender])
+    instance._imagen_original = getattr(valor, 'name', valor) or ''
+
+@receiver(post_save, sender=Prenda)
+@receiver(post_save, sender=ImagenPrenda)
+def publicar_cambio_imagen(sender, instance, update_fields=None, **kwargs):
+    """Publica el cambio de imagen para que el worker reemplace sus miniaturas."""
+    campo = CAMPOS_IMAGEN[sender]
+    if update_fields is not None and campo not in update_fields:
+        return
+    nombre = getattr(instance, campo).name or ''
+    if nombre == instance._imagen_original:
+        return
+    if instance.miniaturas_generadas is not None:
+        # Las miniaturas marcadas son las de la imagen anterior
+        sender.objects.filter(pk=instance.pk).update(miniaturas_generadas=None)
+        instance.miniaturas_generadas = None
+    publicar('imagen.modificada', {
+        'modelo': sender._meta.label, 'id': instance.pk, 'campo': campo,
+        'nombre': nombre, 'anterior': instance._imagen_original,
+    })
+    instance._imagen_original = nombre
+
+@receiver(post_delete, sender=Prenda)
+@receiver(post_delete, sender=ImagenPrenda)
+def publicar_baja_imagen(sender, instance, **kwargs):
+    """Publica la baja para que el worker borre las miniaturas de la imagen."""
+    nombre = getattr(instance, CAMPOS_IMAGEN[sender]).name
+    if nombre:
+        publicar('imagen.modificada', {
+            'modelo': sender._meta.label, 'id': instance.pk, 'campo': CAMPOS_IMAGEN[sender],
+            'nombre': '', 'anterior': nombre,
+        })
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=Talla)
+@receiver(post_delete, sender=Talla)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+def invalidar_cache_referencias(sender, **kwargs):
+    """Descarta las categorías, tallas y colores cacheados en todos los procesos."""
+    cache_referencias.invalidar()
@@ -0,0 +1,160 @@
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Now
+from .models import Prenda, VariantePrenda
+from .alertas import actualizar_alertas
+from .movimientos import registrar_movimientos
+
+
+class StockInsuficiente(Exception):
+    """Se lanza cuando una o más variantes no tienen stock suficiente para un movimiento"""
+
+    def __init__(self, faltantes):
+        self.faltantes = faltantes
+        super().__init__(self.mensajes())
+
+    def mensajes(self):
+        """Retorna un mensaje legible por cada variante que no alcanzó"""
+        if not self.faltantes:
+            return ["El stock de las variantes cambió durante la operación. Intente nuevamente."]
+        mensajes = []
+        for faltante in self.faltantes:
+            if faltante['disponible'] is None:
+                mensajes.append(f"La variante {faltante['variante']} no existe o no está activa")
+            else:
+                mensajes.append(
+                    f"Stock insuficiente para {faltante['descripcion']}. "
+                    f"Solicitado: {faltante['solicitado']}, disponible: {faltante['disponible']}"
+                )
+        return mensajes
+
+
+def _stock_total_subquery():
+    """Subconsulta con la suma del stock de las variantes de cada prenda"""
+    return Coalesce(
+        Subquery(
+            VariantePrenda.objects.filter(prenda=OuterRef('pk'))
+            .order_by()
+            .values('prenda')
+            .annotate(total=Sum('stock'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def _tiene_stock_subquery():
+    """Subconsulta que indica si alguna variante de la prenda tiene stock"""
+    return Exists(VariantePrenda.objects.filter(prenda=OuterRef('pk'), stock__gt=0))
+
+
+def actualizar_stock_prendas(prenda_ids):
+    """
+    Recalcula las columnas stock_total y tiene_stock de las prendas indicadas. También
+    avanza actualizado para que la sincronización incremental envíe el stock nuevo.
+
+    Se ejecuta como un único UPDATE, por lo que debe llamarse dentro de la misma
+    transacción que modificó el stock de las variantes.
+    """
+    prenda_ids = set(prenda_ids)
+    if not prenda_ids:
+        return 0
+    return Prenda.objects.filter(pk__in=prenda_ids).update(
+        stock_total=_stock_total_subquery(),
+        tiene_stock=_tiene_stock_subquery(),
+        actualizado=Now(),
+    )
+
+
+def prendas_desincronizadas():
+    """Retorna las prendas cuyas columnas de stock no coinciden con sus variantes"""
+    return Prenda.objects.annotate(
+        stock_calculado=_stock_total_subquery(),
+        tiene_stock_calculado=_tiene_stock_subquery(),
+    ).exclude(
+        stock_total=F('stock_calculado'),
+        tiene_stock=F('tiene_stock_calculado'),
+    )
+
+
+def actualizar_stock_prendas_de_variantes(variante_ids):
+    """Recalcula el stock de las prendas a las que pertenecen las variantes indicadas"""
+    variante_ids = set(variante_ids)
+    if not variante_ids:
+        return 0
+    prendas = VariantePrenda.objects.filter(pk__in=variante_ids).values('prenda_id')
+    return Prenda.objects.filter(pk__in=prendas).update(
+        stock_total=_stock_total_subquery(),
+        tiene_stock=_tiene_stock_subquery(),
+        actualizado=Now(),
+    )
+
+
+def _faltantes(deltas, solo_activas):
+    """Arma el detalle de las variantes cuyo stock no alcanza para aplicar los deltas"""
+    variantes = VariantePrenda.objects.filter(pk__in=deltas.keys()).select_related('prenda', 'talla', 'color')
+    if solo_activas:
+        variantes = variantes.filter(activo=True)
+    variantes = {v.pk: v for v in variantes}
+    faltantes = []
+    for variante_id, delta in deltas.items():
+        variante = variantes.get(variante_id)
+        if variante is None:
+            faltantes.append({'variante': variante_id, 'descripcion': None, 'solicitado': -delta, 'disponible': None})
+        elif variante.stock + delta < 0:
+            faltantes.append({
+                'variante': variante_id,
+                'descripcion': str(variante),
+                'solicitado': -delta,
+                'disponible': variante.stock,
+            })
+    return faltantes
+
+
+class _UpdateIncompleto(Exception):
+    pass
+
+
+def modificar_stock(deltas, motivo, referencia=None, usuario=None, solo_activas=False):
+    """
+    Aplica variaciones de stock ({variante_id: delta}) con un único UPDATE condicional
+    y las registra en el libro de movimientos con el motivo, la referencia y el usuario.
+
+    Cada fila se actualiza con stock = stock + delta solo si el resultado no queda
+    negativo, de modo que dos operaciones concurrentes nunca venden la misma unidad
+    y no se pisan otras columnas de la variante. Si alguna variante no alcanza (o no
+    está activa, con solo_activas=True) no se modifica ninguna y se lanza
+    StockInsuficiente con el detalle.
+    """
+    deltas = {variante_id: delta for variante_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    delta = Case(
+        *[When(pk=variante_id, then=Value(valor)) for variante_id, valor in deltas.items()],
+        output_field=IntegerField()
+    )
+    try:
+        with transaction.atomic():
+            variantes = VariantePrenda.objects.filter(pk__in=deltas.keys(), stock__gte=-delta)
+            if solo_activas:
+                variantes = variantes.filter(activo=True)
+            actualizadas = variantes.update(stock=F('stock') + delta, actualizado=Now())
+
+            if actualizadas != len(deltas):
+                # Revierte (savepoint) las filas que sí se actualizaron
+                raise _UpdateIncompleto()
+
+            actualizar_stock_prendas_de_variantes(deltas.keys())
+            actualizar_alertas(deltas.keys())
+            registrar_movimientos(deltas, motivo, referencia, usuario)
+    except _UpdateIncompleto:
+        raise StockInsuficiente(_faltantes(deltas, solo_activas))
+
+
+def descontar_stock(cantidades, referencia=None, usuario=None):
+    """Descuenta por venta stock de variantes activas ({variante_id: cantidad}). Ver modificar_stock()."""
+    modificar_stock(
+        {variante_id: -cantidad for variante_id, cantidad in cantidades.items()},
+        'VENTA', referencia, usuario, solo_activas=True
+    )
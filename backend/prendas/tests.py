@@ -0,0 +1,1155 @@
+from decimal import Decimal
+from django.core.files.uploadedfile import SimpleUploadedFile
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+from PIL import Image
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import ProtectedError
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from django.contrib.auth import get_user_model
+from datetime import timedelta
+from django.utils import timezone
+from .models import Categoria, Talla, Color, Prenda, VariantePrenda, MovimientoStock, SnapshotStock, AlertaStock
+from .stock import (
+    actualizar_stock_prendas, prendas_desincronizadas, modificar_stock, descontar_stock, StockInsuficiente
+)
+from .movimientos import stock_a_fecha, tomar_snapshot
+from .inventario import importar_conteo, ArchivoInvalido
+from .miniaturas import nombre_derivado
+from eventos.outbox import procesar_pendientes
+from .etiquetas import codificar_code128, renderizar_etiqueta, POR_HOJA
+from .referencias import cache_referencias
+from .facetas import clave_facetas, version_catalogo
+from .serializers import CategoriaSerializer
+from .views import PrendaViewSet
+
+Usuario = get_user_model()
+
+class StockPrendaTests(TestCase):
+    """Pruebas para las columnas de stock desnormalizadas de Prenda"""
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre='Remeras')
+        self.talla = Talla.objects.create(nombre='2 años', orden=1)
+        self.otra_talla = Talla.objects.create(nombre='4 años', orden=2)
+        self.color = Color.objects.create(nombre='Rojo', codigo_hex='#FF0000')
+        self.prenda = Prenda.objects.create(
+            nombre='Remera lisa',
+            categoria=self.categoria,
+            precio_costo=Decimal('1000'),
+            precio_venta=Decimal('2000')
+        )
+
+    def test_prenda_nueva_sin_stock(self):
+        """Prueba que una prenda sin variantes no tiene stock"""
+        self.assertEqual(self.prenda.stock_total, 0)
+        self.assertFalse(self.prenda.tiene_stock)
+
+    def test_alta_y_modificacion_de_variantes(self):
+        """Prueba que crear y modificar variantes actualiza el stock de la prenda"""
+        variante = VariantePrenda.objects.create(prenda=self.prenda, talla=self.talla, color=self.color, stock=3)
+        VariantePrenda.objects.create(prenda=self.prenda, talla=self.otra_talla, color=self.color, stock=2)
+        self.prenda.refresh_from_db()
+        self.assertEqual(self.prenda.stock_total, 5)
+        self.assertTrue(self.prenda.tiene_stock)
+
+        variante.stock = 0
+        variante.save()
+        self.prenda.refresh_from_db()
+        self.assertEqual(self.prenda.stock_total, 2)
+        self.assertTrue(self.prenda.tiene_stock)
+
+    def test_baja_de_variante(self):
+        """Prueba que eliminar una variante actualiza el stock de la prenda"""
+        variante = VariantePrenda.objects.create(prenda=self.prenda, talla=self.talla, color=self.color)
+        # Stock cargado sin movimientos (una variante con movimientos no se puede eliminar)
+        VariantePrenda.objects.filter(pk=variante.pk).update(stock=3)
+        actualizar_stock_prendas([self.prenda.pk])
+        variante.delete()
+        self.prenda.refresh_from_db()
+        self.assertEqual(self.prenda.stock_total, 0)
+        self.assertFalse(self.prenda.tiene_stock)
+
+    def test_reparar_prendas_desincronizadas(self):
+        """Prueba que se detectan y reparan prendas con stock desincronizado"""
+        VariantePrenda.objects.create(prenda=self.prenda, talla=self.talla, color=self.color, stock=3)
+        Prenda.objects.filter(pk=self.prenda.pk).update(stock_total=10, tiene_stock=False)
+        self.assertEqual(list(prendas_desincronizadas()), [self.prenda])
+
+        actualizar_stock_prendas([self.prenda.pk])
+        self.assertFalse(prendas_desincronizadas().exists())
+
+    def test_descontar_stock_de_varias_variantes(self):
+        """Prueba que se descuenta el stock de varias variantes en una operación"""
+        a = VariantePrenda.objects.create(prenda=self.prenda, talla=self.talla, color=self.color, stock=3)
+        b = VariantePrenda.objects.create(prenda=self.prenda, talla=self.otra_talla, color=self.color, stock=2)
+        descontar_stock({a.pk: 3, b.pk: 1})
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.prenda.refresh_from_db()
+        self.assertEqual((a.stock, b.stock, self.prenda.stock_total), (0, 1, 1))
+
+    def test_stock_insuficiente_no_modifica_ninguna_variante(self):
+        """Prueba que si una variante no alcanza no se descuenta stock de ninguna"""
+        a = VariantePrenda.objects.create(prenda=self.prenda, talla=self.talla, color=self.color, stock=3)
+        b = VariantePrenda.objects.create(prenda=self.prenda, talla=self.otra_talla, color=self.color, stock=1)
+        with self.assertRaises(StockInsuficiente) as contexto:
+            descontar_stock({a.pk: 2, b.pk: 2})
+
+        self.assertEqual(
+            contexto.exception.faltantes,
+            [{'variante': b.pk, 'descripcion': str(b), 'solicitado': 2, 'disponible': 1}]
+        )
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual((a.stock, b.stock), (3, 1))
+
+    def test_descontar_stock_de_variante_inactiva(self):
+        """Prueba que no se puede vender una variante inactiva, pero sí ajustar su stock"""
+        variante = VariantePrenda.objects.create(
+            prenda=self.prenda, talla=self.talla, color=self.color, stock=3, activo=False
+        )
+        with self.assertRaises(StockInsuficiente):
+            descontar_stock({variante.pk: 1})
+        modificar_stock({variante.pk: -1}, 'AJUSTE')
+        variante.refresh_from_db()
+        self.assertEqual(variante.stock, 2)
+
+class MovimientoStockTests(TestCase):
+    """Pruebas para el libro de movimientos de stock y el stock histórico"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Remeras')
+        talla = Talla.objects.create(nombre='2 años', orden=1)
+        color = Color.objects.create(nombre='Rojo')
+        prenda = Prenda.objects.create(
+            nombre='Remera lisa',
+            categoria=categoria,
+            precio_costo=Decimal('1000'),
+            precio_venta=Decimal('2000')
+        )
+        self.variante = VariantePrenda.objects.create(prenda=prenda, talla=talla, color=color, stock=5)
+
+    def movimientos(self):
+        return list(self.variante.movimientos.order_by('id').values_list('motivo', 'cantidad', 'referencia'))
+
+    def test_registra_alta_venta_y_edicion(self):
+        """Prueba que cada cambio de stock queda registrado con su motivo"""
+        descontar_stock({self.variante.pk: 2}, referencia='venta:1')
+        self.variante.refresh_from_db()
+        self.variante.stock = 10
+        self.variante.save()
+
+        self.assertEqual(self.movimientos(), [
+            ('INICIAL', 5, None),
+            ('VENTA', -2, 'venta:1'),
+            ('EDICION', 7, None),
+        ])
+
+    def test_stock_insuficiente_no_registra_movimientos(self):
+        """Prueba que un descuento rechazado no deja movimientos"""
+        with self.assertRaises(StockInsuficiente):
+            descontar_stock({self.variante.pk: 6})
+        self.assertEqual(self.movimientos(), [('INICIAL', 5, None)])
+
+    def test_libro_de_solo_insercion(self):
+        """Prueba que los movimientos no se pueden modificar ni eliminar"""
+        movimiento = self.variante.movimientos.get()
+        with self.assertRaises(TypeError):
+            MovimientoStock.objects.filter(pk=movimiento.pk).update(cantidad=1)
+        with self.assertRaises(TypeError):
+            movimiento.delete()
+
+    def test_borrar_variante_o_prenda_no_borra_el_libro(self):
+        """Prueba que no se puede eliminar una variante o prenda con movimientos o snapshots"""
+        tomar_snapshot(hasta=timezone.now())
+        for objeto in (self.variante, self.variante.prenda):
+            with self.assertRaises(ProtectedError):
+                objeto.delete()
+        self.assertEqual(MovimientoStock.objects.count(), 1)
+        self.assertEqual(SnapshotStock.objects.count(), 1)
+
+        admin = get_user_model().objects.create_superuser(
+            email='admin@example.com', password='adminpassword', nombre='Admin', apellido='User'
+        )
+        cliente = APIClient()
+        cliente.force_authenticate(user=admin)
+        response = cliente.delete(reverse('varianteprenda-detail', args=[self.variante.pk]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+        self.assertTrue(VariantePrenda.objects.filter(pk=self.variante.pk).exists())
+
+    def test_stock_a_fecha_con_snapshot(self):
+        """Prueba el stock histórico combinando snapshots y movimientos posteriores"""
+        ahora = timezone.now()
+        modificar_stock({self.variante.pk: -1}, 'AJUSTE')
+        self.assertEqual(stock_a_fecha(self.variante.pk, ahora), 5)
+        self.assertEqual(stock_a_fecha(self.variante.pk, timezone.now()), 4)
+
+        self.assertEqual(tomar_snapshot(hasta=timezone.now()), 1)
+        self.assertEqual(SnapshotStock.objects.get(variante=self.variante).stock, 4)
+        modificar_stock({self.variante.pk: 3}, 'AJUSTE')
+        self.assertEqual(stock_a_fecha(self.variante.pk, timezone.now()), 7)
+        self.assertEqual(stock_a_fecha(self.variante.pk, ahora - timedelta(days=1)), 0)
+
+class PrendaAPITests(APITestCase):
+    """Pruebas para la API de Prenda"""
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            email='test@example.com',
+            password='testpassword',
+            nombre='Test',
+            apellido='User'
+        )
+        self.categoria = Categoria.objects.create(nombre='Remeras')
+        self.talla = Talla.objects.create(nombre='2 años', orden=1)
+        self.color = Color.objects.create(nombre='Rojo', codigo_hex='#FF0000')
+        for i in range(20):
+            prenda = Prenda.objects.create(
+                nombre=f'Remera {i}',
+                categoria=self.categoria,
+                precio_costo=Decimal('1000'),
+                precio_venta=Decimal('2000')
+            )
+            VariantePrenda.objects.create(prenda=prenda, talla=self.talla, color=self.color, stock=i)
+
+    def test_listado_con_cantidad_constante_de_consultas(self):
+        """Prueba que listar prendas no ejecuta consultas por cada fila"""
+        url = reverse('prenda-list')
+        with self.assertNumQueries(2):  # COUNT de la paginación + página de prendas
+            response = self.client.get(url, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(sum(p['stock_total'] for p in response.data['results']), sum(range(20)))
+
+    def test_filtros_de_variantes_sin_duplicados(self):
+        """Prueba que combinar filtros de variantes no repite prendas ni usa DISTINCT"""
+        otra_talla = Talla.objects.create(nombre='4 años', orden=2)
+        prenda = Prenda.objects.get(nombre='Remera 5')
+        VariantePrenda.objects.create(prenda=prenda, talla=otra_talla, color=self.color, stock=3)
+
+        url = reverse('prenda-list')
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, {'tiene_stock': 'true', 'color': self.color.pk}, format='json')
+        self.assertEqual(response.data['count'], 19)
+        self.assertFalse(any('DISTINCT' in q['sql'] for q in consultas.captured_queries))
+
+        response = self.client.get(url, {'talla': otra_talla.pk, 'color': self.color.pk}, format='json')
+        self.assertEqual([p['id'] for p in response.data['results']], [prenda.pk])
+        response = self.client.get(url, {'tiene_stock': 'false'}, format='json')
+        self.assertEqual([p['nombre'] for p in response.data['results']], ['Remera 0'])
+
+    def test_ajustar_stock_actualiza_prenda(self):
+        """Prueba que ajustar el stock de una variante actualiza la prenda"""
+        admin = Usuario.objects.create_superuser(
+            email='admin@example.com',
+            password='adminpassword',
+            nombre='Admin',
+            apellido='User'
+        )
+        self.client.force_authenticate(user=admin)
+        variante = VariantePrenda.objects.get(prenda__nombre='Remera 0')
+        url = reverse('varianteprenda-ajustar-stock', args=[variante.pk])
+        response = self.client.post(url, {'cantidad': 4}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['stock'], 4)
+        variante.prenda.refresh_from_db()
+        self.assertEqual(variante.prenda.stock_total, 4)
+        self.assertTrue(variante.prenda.tiene_stock)
+
+        response = self.client.post(url, {'cantidad': -5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        variante.refresh_from_db()
+        self.assertEqual(variante.stock, 4)
+
+class BusquedaPrendaTests(APITestCase):
+    """Pruebas para la búsqueda de prendas"""
+
+    def setUp(self):
+        self.remeras = Categoria.objects.create(nombre='Remeras')
+        self.pantalones = Categoria.objects.create(nombre='Pantalones')
+        self.talla = Talla.objects.create(nombre='2 años', orden=1)
+        self.color = Color.objects.create(nombre='Azul Marino')
+        self.remera = Prenda.objects.create(
+            nombre='Remera estampada',
+            descripcion='Algodón peinado',
+            categoria=self.remeras,
+            precio_costo=Decimal('1000'),
+            precio_venta=Decimal('2000')
+        )
+        self.jogger = Prenda.objects.create(
+            nombre='Jogger frisa',
+            categoria=self.pantalones,
+            precio_costo=Decimal('1500'),
+            precio_venta=Decimal('3000')
+        )
+        VariantePrenda.objects.create(prenda=self.jogger, talla=self.talla, color=self.color, stock=1)
+
+    def buscar(self, q):
+        response = self.client.get(reverse('prenda-buscar'), {'q': q}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [p['id'] for p in response.data['results']]
+
+    def test_busca_por_nombre_descripcion_y_categoria(self):
+        """Prueba la búsqueda por nombre, descripción (sin acentos) y categoría"""
+        self.assertEqual(self.buscar('remera'), [self.remera.id])
+        self.assertEqual(self.buscar('algodon'), [self.remera.id])
+        self.assertEqual(self.buscar('pantal'), [self.jogger.id])
+
+    def test_busca_por_color_y_codigo(self):
+        """Prueba la búsqueda por color de una variante y por código de prenda"""
+        self.assertEqual(self.buscar('marino'), [self.jogger.id])
+        self.assertEqual(self.buscar(self.remera.codigo), [self.remera.id])
+
+    def test_documento_se_actualiza_al_renombrar_categoria(self):
+        """Prueba que renombrar una categoría actualiza los documentos de sus prendas"""
+        self.pantalones.nombre = 'Joggings'
+        self.pantalones.save()
+        self.assertEqual(self.buscar('joggings'), [self.jogger.id])
+        self.assertEqual(self.buscar('pantalones'), [])
+
+    def test_paginado_sobre_prendas_activas(self):
+        """Prueba que las inactivas no se cuentan y que el total es el de todas las coincidencias"""
+        for numero in range(3):
+            Prenda.objects.create(
+                nombre=f'Remera lisa {numero}', categoria=self.remeras, activo=numero > 0,
+                precio_costo=Decimal('1000'), precio_venta=Decimal('2000')
+            )
+        response = self.client.get(reverse('prenda-buscar'), {'q': 'remera', 'page_size': 1}, format='json')
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(self.buscar('remera')), 3)
+
+    def test_sin_termino(self):
+        """Prueba que la búsqueda sin término retorna error"""
+        response = self.client.get(reverse('prenda-buscar'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class EscaneoTests(APITestCase):
+    """Pruebas para el endpoint de escaneo del punto de venta"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Remeras')
+        talla = Talla.objects.create(nombre='2 años', orden=1)
+        color = Color.objects.create(nombre='Rojo')
+        self.prenda = Prenda.objects.create(
+            nombre='Remera lisa',
+            categoria=categoria,
+            precio_costo=Decimal('1000'),
+            precio_venta=Decimal('2000')
+        )
+        self.variante = VariantePrenda.objects.create(prenda=self.prenda, talla=talla, color=color, stock=3)
+
+    def escanear(self, codigo):
+        return self.client.get(reverse('varianteprenda-escanear', args=[codigo]), format='json')
+
+    def test_escanear_codigo_de_barras(self):
+        """Prueba que el código de barras retorna la variante con precio y stock"""
+        response = self.escanear(self.variante.codigo_barras)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tipo'], 'variante')
+        self.assertEqual(response.data['prenda']['precio_venta'], '2000.00')
+        self.assertEqual(response.data['variante']['stock'], 3)
+
+    def test_escanear_codigo_de_prenda(self):
+        """Prueba que el código de prenda retorna todas sus variantes"""
+        response = self.escanear(self.prenda.codigo)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tipo'], 'prenda')
+        self.assertEqual([v['id'] for v in response.data['variantes']], [self.variante.id])
+
+    def test_escaneo_cacheado_con_stock_actual(self):
+        """Prueba que el catálogo se cachea y el stock se lee en cada escaneo sin invalidar la cache"""
+        self.escanear(self.variante.codigo_barras)
+        with self.assertNumQueries(1):  # Solo el stock
+            self.escanear(self.variante.codigo_barras)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            descontar_stock({self.variante.pk: 2})
+        self.assertEqual(callbacks, [])
+        with self.assertNumQueries(1):
+            response = self.escanear(self.variante.codigo_barras)
+        self.assertEqual(response.data['variante']['stock'], 1)
+        self.assertTrue(response.data['variante']['disponible'])
+
+    def test_cambio_de_precio_descarta_solo_sus_codigos(self):
+        """Prueba que modificar una prenda descarta los escaneos de sus códigos y no los de otras"""
+        otra = Prenda.objects.create(
+            nombre='Short', categoria=self.prenda.categoria,
+            precio_costo=Decimal('1000'), precio_venta=Decimal('1800')
+        )
+        self.escanear(self.variante.codigo_barras)
+        self.escanear(otra.codigo)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.prenda.precio_venta = Decimal('2500')
+            self.prenda.save()
+        response = self.escanear(self.variante.codigo_barras)
+        self.assertEqual(response.data['prenda']['precio_venta'], '2500.00')
+        with self.assertNumQueries(0):  # Prenda sin variantes: no hay stock que leer
+            self.escanear(otra.codigo)
+
+    def test_escanear_codigo_inexistente(self):
+        """Prueba que un código desconocido retorna 404"""
+        response = self.escanear('NO-EXISTE')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class MatrizVariantesTests(APITestCase):
+    """Pruebas para la creación de la grilla de variantes talla × color"""
+
+    def setUp(self):
+        admin = Usuario.objects.create_superuser(
+            email='admin@example.com',
+            password='adminpassword',
+            nombre='Admin',
+            apellido='User'
+        )
+        self.client.force_authenticate(user=admin)
+        categoria = Categoria.objects.create(nombre='Remeras')
+        self.tallas = [Talla.objects.create(nombre=f'{i} años', orden=i) for i in range(10)]
+        cache_referencias._incrementar_version()  # Los datos de pruebas anteriores no se confirmaron
+        self.colores = [Color.objects.create(nombre=f'Color {i}') for i in range(8)]
+        self.prenda = Prenda.objects.create(
+            nombre='Remera lisa',
+            categoria=categoria,
+            precio_costo=Decimal('1000'),
+            precio_venta=Decimal('2000')
+        )
+        self.url = reverse('varianteprenda-matriz')
+
+    def crear(self, tallas, colores, stock=2):
+        return self.client.post(self.url, {
+            'prenda': self.prenda.pk,
+            'tallas': [t.pk for t in tallas],
+            'colores': [c.pk for c in colores],
+            'stock': stock,
+        }, format='json')
+
+    def test_crea_grilla_completa(self):
+        """Prueba que se crea la grilla con códigos de barras, stock, movimientos y búsqueda"""
+        response = self.crear(self.tallas, self.colores)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['creadas'], 80)
+
+        variante = VariantePrenda.objects.get(talla=self.tallas[3], color=self.colores[5])
+        self.assertEqual(variante.codigo_barras, f"{self.prenda.codigo}-{self.tallas[3].pk}-{self.colores[5].pk}")
+        self.prenda.refresh_from_db()
+        self.assertEqual(self.prenda.stock_total, 160)
+        self.assertEqual(MovimientoStock.objects.filter(motivo='INICIAL').count(), 80)
+        self.assertIn('color 7', self.prenda.documento_busqueda.texto)
+
+    def test_consultas_no_dependen_del_tamano_de_la_grilla(self):
+        """Prueba que la cantidad de consultas es la misma para una grilla chica y una grande"""
+        self.crear(self.tallas[:1], self.colores[:1], stock=0)  # Cargar la cache de referencias
+        VariantePrenda.objects.all().delete()
+        with CaptureQueriesContext(connection) as chica:
+            self.crear(self.tallas[:1], self.colores[:1])
+        # Las variantes con movimientos no se eliminan: la grilla grande va en otra prenda
+        self.prenda = Prenda.objects.create(
+            nombre='Buzo', categoria=self.prenda.categoria, precio_costo=Decimal('1000'), precio_venta=Decimal('2000')
+        )
+        with CaptureQueriesContext(connection) as grande:
+            self.crear(self.tallas, self.colores)
+        self.assertEqual(len(chica), len(grande))
+
+    def test_omite_combinaciones_existentes_y_stock_por_celda(self):
+        """Prueba que se omiten las variantes existentes y se respeta el stock de cada celda"""
+        self.crear(self.tallas[:1], self.colores[:1], stock=1)
+        response = self.crear(self.tallas[:2], self.colores[:2], stock=[[1, 2], [3, 4]])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['creadas'], response.data['omitidas']), (3, 1))
+        self.prenda.refresh_from_db()
+        self.assertEqual(self.prenda.stock_total, 1 + 2 + 3 + 4)
+
+    def test_datos_invalidos(self):
+        """Prueba que se rechazan tallas inexistentes y matrices de stock mal formadas"""
+        response = self.client.post(self.url, {
+            'prenda': self.prenda.pk, 'tallas': [9999], 'colores': [self.colores[0].pk]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.crear(self.tallas[:2], self.colores[:2], stock=[[1, 2]])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(VariantePrenda.objects.exists())
+
+class ImportarConteoTests(APITestCase):
+    """Pruebas para la importación del conteo físico de inventario"""
+
+    def setUp(self):
+        admin = Usuario.objects.create_superuser(
+            email='admin@example.com',
+            password='adminpassword',
+            nombre='Admin',
+            apellido='User'
+        )
+        self.client.force_authenticate(user=admin)
+        categoria = Categoria.objects.create(nombre='Remeras')
+        color = Color.objects.create(nombre='Rojo')
+        prenda = Prenda.objects.create(
+            nombre='Remera lisa',
+            categoria=categoria,
+            precio_costo=Decimal('1000'),
+            precio_venta=Decimal('2000')
+        )
+        self.prenda = prenda
+        self.a = VariantePrenda.objects.create(
+            prenda=prenda, talla=Talla.objects.create(nombre='2 años', orden=1), color=color, stock=5
+        )
+        self.b = VariantePrenda.objects.create(
+            prenda=prenda, talla=Talla.objects.create(nombre='4 años', orden=2), color=color, stock=1
+        )
+        self.url = reverse('varianteprenda-importar-conteo')
+
+    def importar(self, contenido, modo='set'):
+        archivo = SimpleUploadedFile('conteo.csv', contenido.encode('utf-8'), content_type='text/csv')
+        return self.client.post(self.url, {'archivo': archivo, 'modo': modo}, format='multipart')
+
+    def test_modo_set_con_errores_por_fila(self):
+        """Prueba que se fija el stock contado y las filas inválidas se informan sin abortar"""
+        response = self.importar(
+            "codigo_barras,cantidad\n"
+            f"{self.a.codigo_barras},7\n"
+            "NO-EXISTE,3\n"
+            f"{self.b.codigo_barras},x\n"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['procesadas'], 3)
+        self.assertEqual(response.data['actualizadas'], 1)
+        self.assertEqual([e['fila'] for e in response.data['errores']], [3, 4])
+
+        self.a.refresh_from_db()
+        self.prenda.refresh_from_db()
+        self.assertEqual((self.a.stock, self.prenda.stock_total), (7, 8))
+        self.assertEqual(self.a.movimientos.get(motivo='INVENTARIO').cantidad, 2)
+
+    def test_modo_delta_no_deja_stock_negativo(self):
+        """Prueba que en modo delta se suma la cantidad y se rechazan las que dejarían stock negativo"""
+        response = self.importar(
+            f"codigo_barras,cantidad\n{self.a.codigo_barras},-2\n{self.b.codigo_barras},-3\n", modo='delta'
+        )
+        self.assertEqual(response.data['total_errores'], 1)
+        self.a.refresh_from_db()
+        self.b.refresh_from_db()
+        self.assertEqual((self.a.stock, self.b.stock), (3, 1))
+
+    def test_columnas_faltantes(self):
+        """Prueba que un archivo sin las columnas esperadas se rechaza"""
+        response = self.importar("codigo,stock\nX,1\n")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_error_de_lectura_a_mitad_del_archivo(self):
+        """Prueba que un error de lectura tras el primer lote devuelve los totales parciales"""
+        contenido = (
+            f"codigo_barras,cantidad\n{self.a.codigo_barras},7\n".encode('utf-8')
+            + b"\xff\xfe,3\n"
+            + f"{self.b.codigo_barras},9\n".encode('utf-8')
+        )
+        resultado = importar_conteo(BytesIO(contenido), lote=1)
+        self.assertTrue(resultado.interrumpida)
+        self.assertEqual((resultado.procesadas, resultado.actualizadas, resultado.total_errores), (1, 1, 1))
+        self.assertEqual(resultado.errores[0]['fila'], 3)
+
+        self.a.refresh_from_db()
+        self.b.refresh_from_db()
+        self.assertEqual((self.a.stock, self.b.stock), (7, 1))
+
+        # Por el endpoint también se informan los totales en lugar de un 400
+        archivo = SimpleUploadedFile('conteo.csv', contenido, content_type='text/csv')
+        response = self.client.post(self.url, {'archivo': archivo}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['interrumpida'])
+        self.assertEqual(response.data['sin_cambios'], 1)
+
+        # Si falla antes de leer la primera fila, se rechaza el archivo
+        with self.assertRaises(ArchivoInvalido):
+            importar_conteo(BytesIO(b"codigo_barras,cantidad\n\xff,1\n"))
+
+class MiniaturasTests(APITestCase):
+    """Pruebas para la generación de miniaturas de las imágenes de prendas"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        configuracion = override_settings(MEDIA_ROOT=self.media)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        self.categoria = Categoria.objects.create(nombre='Remeras')
+
+    def imagen(self):
+        salida = BytesIO()
+        Image.new('RGBA', (2000, 1500), (200, 30, 30, 128)).save(salida, 'PNG')
+        return SimpleUploadedFile('foto.png', salida.getvalue(), content_type='image/png')
+
+    def crear_prenda(self):
+        return Prenda.objects.create(
+            nombre='Remera lisa',
+            categoria=self.categoria,
+            precio_costo=Decimal('1000'),
+            precio_venta=Decimal('2000'),
+            imagen_principal=self.imagen()
+        )
+
+    def test_genera_derivados_y_expone_urls(self):
+        """Prueba que el worker genera los derivados y recién entonces se anuncian sus URLs"""
+        prenda = self.crear_prenda()
+        original = prenda.imagen_principal.name
+        derivado = nombre_derivado(original, 'tarjeta', 'webp')
+
+        response = self.client.get(reverse('prenda-list'), format='json')
+        miniaturas = response.data['results'][0]['miniaturas']
+        self.assertEqual(set(miniaturas), {'lista', 'tarjeta'})
+        self.assertEqual(set(miniaturas['tarjeta']), {'original'})
+        self.assertTrue(miniaturas['tarjeta']['original'].endswith(original))
+        self.assertFalse(prenda.imagen_principal.storage.exists(derivado))
+
+        procesar_pendientes()
+        with prenda.imagen_principal.storage.open(derivado) as archivo:
+            self.assertEqual(Image.open(archivo).size, (480, 360))
+
+        response = self.client.get(reverse('prenda-list'), format='json')
+        miniaturas = response.data['results'][0]['miniaturas']
+        self.assertTrue(miniaturas['tarjeta']['webp'].endswith(derivado))
+        self.assertTrue(miniaturas['tarjeta']['original'].endswith(original))
+
+        response = self.client.get(reverse('prenda-detail', args=[prenda.slug]), format='json')
+        self.assertIn('jpg', response.data['miniaturas']['detalle'])
+
+    def test_reemplazo_y_baja_borran_derivados(self):
+        """Prueba que al reemplazar o borrar la imagen se borran los derivados de la anterior"""
+        prenda = self.crear_prenda()
+        procesar_pendientes()
+        storage = prenda.imagen_principal.storage
+        anterior = nombre_derivado(prenda.imagen_principal.name, 'lista', 'jpg')
+        self.assertTrue(storage.exists(anterior))
+
+        prenda.imagen_principal = self.imagen()
+        prenda.save()
+        prenda.refresh_from_db()
+        self.assertIsNone(prenda.miniaturas_generadas)
+        procesar_pendientes()
+        self.assertFalse(storage.exists(anterior))
+        nuevo = nombre_derivado(prenda.imagen_principal.name, 'lista', 'jpg')
+        self.assertTrue(storage.exists(nuevo))
+        prenda.refresh_from_db()
+        self.assertIsNotNone(prenda.miniaturas_generadas)
+
+        prenda.delete()
+        procesar_pendientes()
+        self.assertFalse(storage.exists(nuevo))
+
+    def test_original_con_nombre_de_derivado(self):
+        """Prueba que una foto subida con nombre de derivado de otra no se pisa ni se borra"""
+        subida = self.imagen()
+        contenido = subida.read()
+        subida.seek(0)
+        subida.name = 'foto_lista.jpg'  # El nombre que antes tenía el derivado 'lista' de foto.png
+        parecida = Prenda.objects.create(
+            nombre='Remera estampada', categoria=self.categoria, precio_costo=Decimal('1000'),
+            precio_venta=Decimal('2000'), imagen_principal=subida
+        )
+        prenda = self.crear_prenda()
+        self.assertEqual(prenda.imagen_principal.name, 'prendas/foto.png')
+        procesar_pendientes()
+        storage = prenda.imagen_principal.storage
+        derivado = nombre_derivado(prenda.imagen_principal.name, 'lista', 'jpg')
+        self.assertNotEqual(derivado, parecida.imagen_principal.name)
+        self.assertTrue(storage.exists(derivado))
+
+        prenda.delete()
+        procesar_pendientes()
+        self.assertFalse(storage.exists(derivado))
+        with storage.open(parecida.imagen_principal.name) as archivo:
+            self.assertEqual(archivo.read(), contenido)
+
+    def test_prenda_sin_imagen(self):
+        """Prueba que una prenda sin imagen no tiene miniaturas"""
+        Prenda.objects.create(
+            nombre='Remera lisa',
+            categoria=self.categoria,
+            precio_costo=Decimal('1000'),
+            precio_venta=Decimal('2000')
+        )
+        response = self.client.get(reverse('prenda-list'), format='json')
+        self.assertIsNone(response.data['results'][0]['miniaturas'])
+
+class PaginacionCursorTests(APITestCase):
+    """Pruebas para la paginación por cursor del listado de variantes"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Remeras')
+        color = Color.objects.create(nombre='Rojo')
+        prenda = Prenda.objects.create(
+            nombre='Remera lisa',
+            categoria=categoria,
+            precio_costo=Decimal('1000'),
+            precio_venta=Decimal('2000')
+        )
+        for i in range(25):
+            VariantePrenda.objects.create(
+                prenda=prenda, talla=Talla.objects.create(nombre=f'{i} años', orden=i), color=color
+            )
+        # Mismo valor de orden para todas: el desempate por id debe mantener el orden total
+        VariantePrenda.objects.update(creado=timezone.now())
+        self.url = reverse('varianteprenda-list')
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        """Prueba que avanzar y retroceder por cursor recorre todas las filas sin COUNT"""
+        ids = []
+        url = f'{self.url}?paginacion=cursor&page_size=10'
+        paginas = []
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url, format='json')
+            self.assertNotIn('count', response.data)
+            paginas.append(response.data)
+            ids.extend(v['id'] for v in response.data['results'])
+            url = response.data['next']
+
+        esperados = list(VariantePrenda.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual(ids, esperados)
+        self.assertEqual(len(paginas), 3)
+
+        response = self.client.get(paginas[2]['previous'], format='json')
+        self.assertEqual(response.data['results'], paginas[1]['results'])
+
+    def test_paginacion_por_numero_por_defecto(self):
+        """Prueba que sin parámetro se mantiene la paginación por número de página"""
+        response = self.client.get(self.url, format='json')
+        self.assertEqual(response.data['count'], 25)
+
+    def test_cursor_invalido(self):
+        """Prueba que un cursor mal formado retorna 404"""
+        response = self.client.get(self.url, {'cursor': 'no-es-un-cursor'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class ReferenciasTests(APITestCase):
+    """Pruebas para la cache de categorías, tallas y colores con ETag"""
+
+    def setUp(self):
+        cache_referencias._incrementar_version()
+        self.talla = Talla.objects.create(nombre='2 años', orden=1)
+        self.color = Color.objects.create(nombre='Rojo')
+        self.categoria = Categoria.objects.create(nombre='Remeras')
+
+    def test_if_none_match_responde_304_sin_consultas(self):
+        """Prueba que un ETag vigente se responde con 304 sin consultar la base"""
+        url = reverse('talla-list')
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, format='json')
+        self.assertEqual(response.data['results'][0]['nombre'], '2 años')
+
+    def test_modificacion_invalida_etag(self):
+        """Prueba que modificar una talla cambia el ETag y los datos servidos"""
+        url = reverse('talla-list')
+        etag = self.client.get(url, format='json')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.talla.nombre = '3 años'
+            self.talla.save()
+
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['nombre'], '3 años')
+
+    def test_serializer_resuelve_referencias_desde_cache(self):
+        """Prueba que crear una prenda no consulta categoría, talla ni color por defecto"""
+        admin = Usuario.objects.create_superuser(
+            email='admin@example.com',
+            password='adminpassword',
+            nombre='Admin',
+            apellido='User'
+        )
+        self.client.force_authenticate(user=admin)
+        datos = {
+            'nombre': 'Remera lisa',
+            'categoria': self.categoria.pk,
+            'precio_costo': '1000',
+            'precio_venta': '2000',
+        }
+        self.client.post(reverse('prenda-list'), dict(datos, nombre='Otra remera'), format='json')
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(reverse('prenda-list'), datos, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        tablas = ('"prendas_categoria"', '"prendas_talla"', '"prendas_color"')
+        self.assertFalse([
+            q['sql'] for q in consultas.captured_queries
+            if q['sql'].startswith('SELECT') and q['sql'].split(' FROM ')[1].split()[0] in tablas
+        ])
+        variante = VariantePrenda.objects.get(prenda__nombre='Remera lisa')
+        self.assertEqual((variante.talla, variante.color), (self.talla, self.color))
+
+@override_settings(STOCK_UMBRAL_POR_DEFECTO=2)
+class AlertasStockTests(APITestCase):
+    """Pruebas para las alertas de stock bajo con umbrales por variante, prenda y categoría"""
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre='Remeras')
+        self.talla = Talla.objects.create(nombre='2 años', orden=1)
+        self.color = Color.objects.create(nombre='Rojo')
+        self.prenda = Prenda.objects.create(
+            nombre='Remera lisa',
+            categoria=self.categoria,
+            precio_costo=Decimal('1000'),
+            precio_venta=Decimal('2000')
+        )
+        self.variante = VariantePrenda.objects.create(prenda=self.prenda, talla=self.talla, color=self.color, stock=5)
+
+    def en_alerta(self):
+        return list(AlertaStock.objects.values_list('variante_id', 'stock', 'umbral'))
+
+    def test_alerta_al_descontar_y_reponer_stock(self):
+        """Prueba que la alerta aparece al bajar del umbral (incluso agotada) y desaparece al reponer"""
+        self.assertEqual(self.en_alerta(), [])
+        descontar_stock({self.variante.pk: 3})
+        self.assertEqual(self.en_alerta(), [(self.variante.pk, 2, 2)])
+        descontar_stock({self.variante.pk: 2})
+        self.assertEqual(self.en_alerta(), [(self.variante.pk, 0, 2)])
+        modificar_stock({self.variante.pk: 10}, 'AJUSTE')
+        self.assertEqual(self.en_alerta(), [])
+
+    def test_umbral_de_variante_prenda_y_categoria(self):
+        """Prueba que el umbral se toma de la variante, la prenda o la categoría, en ese orden"""
+        self.categoria.umbral_stock = 5
+        self.categoria.save()
+        self.assertEqual(self.en_alerta(), [(self.variante.pk, 5, 5)])
+
+        self.prenda.umbral_stock = 1
+        self.prenda.save()
+        self.assertEqual(self.en_alerta(), [])
+
+        self.variante.umbral_stock = 8
+        self.variante.save()
+        self.assertEqual(self.en_alerta(), [(self.variante.pk, 5, 8)])
+
+    def test_reconstruir_al_cambiar_umbral_por_defecto(self):
+        """Prueba que el comando reconstruye las alertas con el nuevo umbral por defecto"""
+        otra = VariantePrenda.objects.create(
+            prenda=self.prenda, talla=self.talla, color=Color.objects.create(nombre='Azul'), stock=1
+        )
+        self.assertEqual(self.en_alerta(), [(otra.pk, 1, 2)])
+        with override_settings(STOCK_UMBRAL_POR_DEFECTO=5):
+            call_command('reconstruir_alertas', '--lote', '1', stdout=StringIO())
+        self.assertEqual(sorted(self.en_alerta()), [(self.variante.pk, 5, 5), (otra.pk, 1, 5)])
+        call_command('reconstruir_alertas', stdout=StringIO())
+        self.assertEqual(self.en_alerta(), [(otra.pk, 1, 2)])
+
+    def test_variante_inactiva_no_alerta(self):
+        """Prueba que desactivar la variante la quita de las alertas"""
+        self.variante.stock = 0
+        self.variante.save()
+        self.variante.activo = False
+        self.variante.save(update_fields=['activo'])
+        self.assertEqual(self.en_alerta(), [])
+
+    def test_endpoints_de_alertas(self):
+        """Prueba el listado paginado, el contador y el listado de prendas con stock bajo"""
+        admin = Usuario.objects.create_superuser(
+            email='admin@example.com',
+            password='adminpassword',
+            nombre='Admin',
+            apellido='User'
+        )
+        self.client.force_authenticate(user=admin)
+        descontar_stock({self.variante.pk: 5})
+
+        response = self.client.get(reverse('alertastock-list'), format='json')
+        self.assertEqual(response.data['count'], 1)
+        self.assertTrue(response.data['results'][0]['agotada'])
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('alertastock-cantidad'), format='json')
+        self.assertEqual(response.data, {'cantidad': 1, 'agotadas': 1})
+
+        response = self.client.get(reverse('prenda-stock-bajo'), format='json')
+        self.assertEqual([p['id'] for p in response.data['results']], [self.prenda.pk])
+
+class FacetasTests(APITestCase):
+    """Pruebas para los conteos por faceta del catálogo"""
+
+    def setUp(self):
+        cache_referencias._incrementar_version()
+        version_catalogo._incrementar_version()
+        self.remeras = Categoria.objects.create(nombre='Remeras')
+        self.pantalones = Categoria.objects.create(nombre='Pantalones')
+        self.talla = Talla.objects.create(nombre='2 años', orden=1)
+        self.otra_talla = Talla.objects.create(nombre='4 años', orden=2)
+        self.rojo = Color.objects.create(nombre='Rojo', codigo_hex='#FF0000')
+        self.azul = Color.objects.create(nombre='Azul')
+        precios = [('Remera lisa', self.remeras, 'F', '1500'), ('Remera rayada', self.remeras, 'M', '2500'),
+                   ('Jogging', self.pantalones, 'N', '4200')]
+        self.prendas = [
+            Prenda.objects.create(nombre=nombre, categoria=categoria, genero=genero,
+                                  precio_costo=Decimal('100'), precio_venta=Decimal(precio))
+            for nombre, categoria, genero, precio in precios
+        ]
+        VariantePrenda.objects.create(prenda=self.prendas[0], talla=self.talla, color=self.rojo, stock=2)
+        VariantePrenda.objects.create(prenda=self.prendas[0], talla=self.otra_talla, color=self.rojo, stock=0)
+        VariantePrenda.objects.create(prenda=self.prendas[1], talla=self.talla, color=self.azul, stock=0)
+        VariantePrenda.objects.create(prenda=self.prendas[2], talla=self.otra_talla, color=self.azul, stock=3)
+
+    def facetas(self, **parametros):
+        response = self.client.get(reverse('prenda-facetas'), parametros)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_conteos_sin_filtros(self):
+        """Prueba los conteos de cada faceta y el histograma de precios"""
+        datos = self.facetas()
+        self.assertEqual(datos['total'], 3)
+        self.assertEqual([(c['nombre'], c['cantidad']) for c in datos['categoria']], [('Pantalones', 1), ('Remeras', 2)])
+        self.assertEqual({g['valor']: g['cantidad'] for g in datos['genero']}, {'N': 1, 'M': 1, 'F': 1})
+        self.assertEqual([(t['nombre'], t['cantidad']) for t in datos['talla']], [('2 años', 2), ('4 años', 2)])
+        self.assertEqual([(c['nombre'], c['cantidad']) for c in datos['color']], [('Azul', 2), ('Rojo', 1)])
+        self.assertEqual(datos['tiene_stock'], {'true': 2, 'false': 1})
+        self.assertEqual(datos['precio']['ancho'], 1000)
+        self.assertEqual(
+            [(r['desde'], r['cantidad']) for r in datos['precio']['rangos']],
+            [(1000, 1), (2000, 1), (4000, 1)]
+        )
+
+    def test_faceta_ignora_su_propio_filtro(self):
+        """Prueba que la faceta filtrada sigue mostrando los demás valores y el resto se restringe"""
+        datos = self.facetas(categoria=self.remeras.pk)
+        self.assertEqual(datos['total'], 2)
+        self.assertEqual(len(datos['categoria']), 2)
+        self.assertEqual([(t['nombre'], t['cantidad']) for t in datos['talla']], [('2 años', 2), ('4 años', 1)])
+        self.assertEqual(datos['tiene_stock'], {'true': 1, 'false': 1})
+
+    def test_cantidad_de_consultas_constante_y_cache(self):
+        """Prueba que las consultas no dependen de la cantidad de valores y que el resultado se cachea"""
+        self.facetas(color=self.rojo.pk)
+        Categoria.objects.bulk_create([Categoria(nombre=f'Categoria {i}', slug=f'categoria-{i}') for i in range(10)])
+        for i in range(10):
+            Prenda.objects.create(nombre=f'Prenda {i}', categoria=Categoria.objects.get(nombre=f'Categoria {i}'),
+                                  precio_costo=Decimal('100'), precio_venta=Decimal(1000 + i * 300))
+        cache_referencias._incrementar_version()
+        version_catalogo._incrementar_version()
+        self.facetas(genero='N')
+
+        with CaptureQueriesContext(connection) as consultas:
+            datos = self.facetas(color=self.azul.pk)
+        self.assertEqual(len(consultas), 8)
+        self.assertEqual(datos['total'], 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.facetas(color=self.azul.pk), datos)
+
+    def test_version_del_catalogo(self):
+        """Prueba que una venta (cambio de stock) no descarta las facetas y un cambio de precio sí"""
+        clave = clave_facetas(QueryDict())
+        with self.captureOnCommitCallbacks(execute=True):
+            descontar_stock({self.prendas[0].variantes.first().pk: 1})
+        self.assertEqual(clave_facetas(QueryDict()), clave)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.prendas[0].precio_venta = Decimal('1600')
+            self.prendas[0].save()
+        self.assertNotEqual(clave_facetas(QueryDict()), clave)
+
+    def test_rangos_invalidos(self):
+        """Prueba que se valida la cantidad de rangos de precio"""
+        response = self.client.get(reverse('prenda-facetas'), {'rangos': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class CamposDinamicosTests(APITestCase):
+    """Pruebas para la selección de campos con ?fields=, ?omit= y ?expand="""
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre='Remeras')
+        self.talla = Talla.objects.create(nombre='2 años', orden=1)
+        self.otra_talla = Talla.objects.create(nombre='4 años', orden=2)
+        self.color = Color.objects.create(nombre='Rojo', codigo_hex='#FF0000')
+        self.prenda = Prenda.objects.create(
+            nombre='Remera lisa',
+            descripcion='Remera de algodón',
+            categoria=self.categoria,
+            precio_costo=Decimal('1000'),
+            precio_venta=Decimal('2000')
+        )
+        for talla in (self.talla, self.otra_talla):
+            VariantePrenda.objects.create(prenda=self.prenda, talla=talla, color=self.color, stock=3)
+        self.url = reverse('prenda-detail', args=[self.prenda.slug])
+
+    def test_detalle_completo_sin_parametros(self):
+        """Prueba que sin parámetros la respuesta no cambia y las relaciones se precargan"""
+        with self.assertNumQueries(3):  # prenda + variantes + imágenes
+            response = self.client.get(self.url, format='json')
+        self.assertIn('descripcion', response.data)
+        self.assertEqual(len(response.data['variantes']), 2)
+        self.assertEqual(response.data['variantes'][0]['talla'], self.talla.pk)
+
+    def test_fields_limita_campos_y_consulta(self):
+        """Prueba que ?fields= deja solo esos campos, no precarga relaciones y no lee otras columnas"""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url, {'fields': 'id,nombre,margen_ganancia'}, format='json')
+        self.assertEqual(set(response.data), {'id', 'nombre', 'margen_ganancia'})
+        self.assertEqual(response.data['margen_ganancia'], 100)
+        self.assertEqual(len(consultas), 1)
+        self.assertNotIn('descripcion', consultas[0]['sql'])
+        self.assertNotIn('prendas_categoria', consultas[0]['sql'])
+
+    def test_campos_anidados_omit_y_expand(self):
+        """Prueba las rutas de campos anidados, la omisión y la expansión de relaciones"""
+        response = self.client.get(
+            self.url, {'fields': 'id,variantes.stock,variantes.talla', 'expand': 'variantes.talla'}, format='json'
+        )
+        self.assertEqual(set(response.data), {'id', 'variantes'})
+        self.assertEqual(set(response.data['variantes'][0]), {'stock', 'talla'})
+        self.assertEqual(response.data['variantes'][0]['talla']['nombre'], '2 años')
+
+        with self.assertNumQueries(2):  # prenda + variantes
+            response = self.client.get(self.url, {'omit': 'imagenes,descripcion,variantes.creado'}, format='json')
+        self.assertNotIn('imagenes', response.data)
+        self.assertNotIn('descripcion', response.data)
+        self.assertNotIn('creado', response.data['variantes'][0])
+        self.assertIn('creado', response.data)
+
+    def test_expand_en_listado(self):
+        """Prueba que expandir la categoría del listado no agrega consultas por fila"""
+        with self.assertNumQueries(2):  # COUNT + página
+            response = self.client.get(reverse('prenda-list'), {'expand': 'categoria', 'fields': 'id'}, format='json')
+        self.assertEqual(response.data['results'][0], {
+            'id': self.prenda.pk, 'categoria': CategoriaSerializer(self.categoria).data
+        })
+
+class ListadoRapidoTests(APITestCase):
+    """Pruebas para el listado de prendas armado desde values() sin instanciar el serializer por fila"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Remeras')
+        talla = Talla.objects.create(nombre='2 años', orden=1)
+        color = Color.objects.create(nombre='Rojo')
+        for i in range(3):
+            prenda = Prenda.objects.create(
+                nombre=f'Remera {i}', categoria=categoria, genero='FMN'[i],
+                precio_costo=Decimal('1000'), precio_venta=Decimal('2000.5') + i
+            )
+            VariantePrenda.objects.create(prenda=prenda, talla=talla, color=color, stock=i)
+        Prenda.objects.filter(nombre='Remera 1').update(
+            imagen_principal='prendas/foto.jpg', miniaturas_generadas=timezone.now()
+        )
+
+    def respuestas(self, parametros):
+        url = reverse('prenda-list')
+        rapida = self.client.get(url, parametros, format='json')
+        with mock.patch.object(PrendaViewSet, 'listado_rapido', False):
+            completa = self.client.get(url, parametros, format='json')
+        return rapida, completa
+
+    def test_salida_identica_al_serializer(self):
+        """Prueba que el JSON es idéntico byte a byte al del serializer, paginando por página y por cursor"""
+        for parametros in ({}, {'paginacion': 'cursor', 'page_size': 2}, {'ordering': 'precio_venta'}):
+            rapida, completa = self.respuestas(parametros)
+            self.assertEqual(rapida.status_code, status.HTTP_200_OK)
+            self.assertEqual(rapida.content, completa.content)
+        self.assertIn(b'miniaturas/prendas/foto.jpg/lista.webp', rapida.content)
+
+    def test_una_consulta_por_pagina(self):
+        """Prueba que el listado hace el COUNT y una consulta para la página, sin consultas por fila"""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('prenda-list'), format='json')
+        self.assertEqual(response.data['count'], 3)
+
+class EtiquetasTests(APITestCase):
+    """Pruebas para la generación de hojas de etiquetas de variantes"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        configuracion = override_settings(MEDIA_ROOT=self.media)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        admin = Usuario.objects.create_superuser(
+            email='admin@example.com',
+            password='adminpassword',
+            nombre='Admin',
+            apellido='User'
+        )
+        self.client.force_authenticate(user=admin)
+        categoria = Categoria.objects.create(nombre='Bodies')
+        self.prenda = Prenda.objects.create(
+            nombre='Body manga larga', categoria=categoria,
+            precio_costo=Decimal('5000'), precio_venta=Decimal('12500')
+        )
+        colores = [Color.objects.create(nombre=f'Color {i}') for i in range(2)]
+        tallas = [Talla.objects.create(nombre=f'{i} meses', orden=i) for i in range(2)]
+        self.variantes = [
+            VariantePrenda.objects.create(prenda=self.prenda, talla=talla, color=color, stock=3)
+            for talla in tallas for color in colores
+        ]
+        self.url = reverse('varianteprenda-etiquetas')
+
+    def test_code128(self):
+        """Prueba la codificación Code128: inicio B, dígito verificador y símbolo de fin"""
+        anchos = codificar_code128('AB-1')
+        # Inicio + 4 caracteres + verificador de 11 módulos cada uno, y el fin de 13
+        self.assertEqual(sum(anchos), 11 * 6 + 13)
+        self.assertEqual(anchos[:6], [2, 1, 1, 2, 1, 4])
+        # (104 + 33·1 + 34·2 + 13·3 + 17·4) % 103 = 3 -> '121223'
+        self.assertEqual(anchos[-13:-7], [1, 2, 1, 2, 2, 3])
+        with self.assertRaises(ValueError):
+            codificar_code128('Ñandú')
+
+    def test_hoja_pdf_por_stock(self):
+        """Prueba que se genera un PDF con una etiqueta por unidad en stock y varias páginas"""
+        self.variantes[0].stock = POR_HOJA
+        self.variantes[0].save()
+        response = self.client.post(self.url, {'prenda': self.prenda.pk, 'por_stock': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        self.assertEqual(response['X-Total-Paginas'], '2')  # 24 + 3 + 3 + 3 etiquetas
+
+    def test_cache_por_contenido(self):
+        """Prueba que las etiquetas ya dibujadas se reutilizan y un cambio de precio las redibuja"""
+        datos = {'variantes': [v.pk for v in self.variantes], 'copias': 2, 'formato': 'png', 'codigo': 'code128'}
+        with mock.patch('prendas.etiquetas.renderizar_etiqueta', wraps=renderizar_etiqueta) as renderizar:
+            primera = self.client.post(self.url, datos, format='json')
+            self.assertEqual(renderizar.call_count, 4)  # Una por variante, no por copia
+            segunda = self.client.post(self.url, datos, format='json')
+            self.assertEqual(renderizar.call_count, 4)
+            self.prenda.precio_venta = Decimal('13000')
+            self.prenda.save()
+            self.client.post(self.url, datos, format='json')
+            self.assertEqual(renderizar.call_count, 8)
+        self.assertEqual(primera.content, segunda.content)
+        self.assertEqual(Image.open(BytesIO(primera.content)).size, (1654, 2339))
+
+    def test_purgar_etiquetas_sin_uso(self):
+        """Prueba que la purga borra solo las etiquetas que ya no corresponden a ninguna variante"""
+        datos = {'variantes': [v.pk for v in self.variantes], 'formato': 'png', 'codigo': 'code128'}
+        self.client.post(self.url, datos, format='json')
+        self.prenda.precio_venta = Decimal('13000')
+        self.prenda.save()
+        self.client.post(self.url, datos, format='json')
+        _, nombres = default_storage.listdir('etiquetas/code128')
+        self.assertEqual(len(nombres), 8)
+
+        call_command('purgar_etiquetas', stdout=StringIO())
+        _, nombres = default_storage.listdir('etiquetas/code128')
+        self.assertEqual(len(nombres), 4)
+        self.client.post(self.url, datos, format='json')
+        self.assertEqual(len(default_storage.listdir('etiquetas/code128')[1]), 4)
+
+    def test_pedido_invalido(self):
+        """Prueba que se rechazan variantes inexistentes y páginas fuera de la hoja"""
+        response = self.client.post(self.url, {'variantes': [9999]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {'variantes': [self.variantes[0].pk], 'formato': 'png', 'pagina': 2},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -6,7 +6,9 @@ from .views import (
     ColorViewSet,
     PrendaViewSet,
     VariantePrendaViewSet,
-    ImagenPrendaViewSet
+    ImagenPrendaViewSet,
+    MovimientoStockViewSet,
+    AlertaStockViewSet
 )
 
 router = DefaultRouter()
@@ -16,6 +18,8 @@ router.register(r'colores', ColorViewSet)
 router.register(r'prendas', PrendaViewSet)
 router.register(r'variantes', VariantePrendaViewSet)
 router.register(r'imagenes', ImagenPrendaViewSet)
+router.register(r'movimientos', MovimientoStockViewSet)
+router.register(r'alertas-stock', AlertaStockViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
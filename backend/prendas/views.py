@@ -3,8 +3,12 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Sum
-from .models import Categoria, Talla, Color, Prenda, VariantePrenda, ImagenPrenda
+from django.db.models import Q, Count, Exists, OuterRef, Prefetch, ProtectedError
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time
+from .models import Categoria, Talla, Color, Prenda, VariantePrenda, ImagenPrenda, MovimientoStock, AlertaStock
 from .serializers import (
     CategoriaSerializer, 
     TallaSerializer, 
@@ -16,11 +20,63 @@ from .serializers import (
     VariantePrendaDetalleSerializer,
     VariantePrendaCreateUpdateSerializer,
     ImagenPrendaSerializer,
-    ImagenPrendaCreateSerializer
+    ImagenPrendaCreateSerializer,
+    MovimientoStockSerializer,
+    StockAFechaSerializer,
+    MatrizVariantesSerializer,
+    EtiquetasSerializer,
+    AlertaStockSerializer
 )
-from .filters import PrendaFilter, VariantePrendaFilter
+from .filters import PrendaFilter, VariantePrendaFilter, MovimientoStockFilter, AlertaStockFilter, existe_variante
+from .busqueda import buscar_prendas
+from .facetas import facetas_cacheadas, RANGOS_PRECIO, MAXIMO_RANGOS
+from .escaneo import escanear as escanear_codigo
+from .etiquetas import FORMATOS as FORMATOS_ETIQUETAS, EtiquetasInvalidas, hoja_etiquetas
+from .stock import modificar_stock, StockInsuficiente
+from san_pedrito.paginacion import PaginacionSeleccionable
+from san_pedrito.campos import CamposDinamicosViewMixin
+from san_pedrito.lectura import ListadoRapidoMixin
+from .movimientos import anotar_stock_a_fecha
+from .referencias import cache_referencias, etag, etag_coincide
+from .inventario import importar_conteo as importar_conteo_csv, ArchivoInvalido
 
-class CategoriaViewSet(viewsets.ModelViewSet):
+def _parsear_fecha(valor):
+    """Convierte una fecha u hora ISO en un datetime con zona; una fecha sola se toma al final del día"""
+    if len(valor) == 10:
+        dia = parse_date(valor)
+        fecha = datetime.combine(dia, time.max) if dia else None
+    else:
+        fecha = parse_datetime(valor)
+    if fecha is None:
+        raise ValueError(valor)
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+class ReferenciaCacheadaMixin:
+    """
+    Lecturas de datos de referencia servidas desde la cache local, con ETag fuerte:
+    si el If-None-Match coincide con la versión vigente se responde 304 sin ir a la base.
+    """
+    
+    def _respuesta_cacheada(self, request, generar):
+        valor_etag = etag(
+            self.basename, self.action, request.get_host(),
+            sorted(self.kwargs.items()), sorted(request.query_params.lists())
+        )
+        encabezados = {'ETag': valor_etag, 'Cache-Control': 'no-cache'}
+        if etag_coincide(request, valor_etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=encabezados)
+        datos = cache_referencias.obtener(valor_etag, lambda: generar().data)
+        return Response(datos, headers=encabezados)
+    
+    def list(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(request, lambda: super(ReferenciaCacheadaMixin, self).list(request, *args, **kwargs))
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(request, lambda: super(ReferenciaCacheadaMixin, self).retrieve(request, *args, **kwargs))
+
+class CategoriaViewSet(ReferenciaCacheadaMixin, viewsets.ModelViewSet):
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
     permission_classes = [AllowAny]
@@ -34,7 +90,7 @@ class CategoriaViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         return [IsAdminUser()]
 
-class TallaViewSet(viewsets.ModelViewSet):
+class TallaViewSet(ReferenciaCacheadaMixin, viewsets.ModelViewSet):
     queryset = Talla.objects.all()
     serializer_class = TallaSerializer
     permission_classes = [IsAuthenticated]
@@ -47,7 +103,7 @@ class TallaViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         return [IsAdminUser()]
 
-class ColorViewSet(viewsets.ModelViewSet):
+class ColorViewSet(ReferenciaCacheadaMixin, viewsets.ModelViewSet):
     queryset = Color.objects.all()
     serializer_class = ColorSerializer
     permission_classes = [IsAuthenticated]
@@ -60,7 +116,22 @@ class ColorViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         return [IsAdminUser()]
 
-class PrendaViewSet(viewsets.ModelViewSet):
+class BajaProtegidaMixin:
+    """
+    Responde 400 en lugar de 500 cuando la fila no se puede eliminar porque tiene
+    movimientos de stock o ventas (PROTECT): esas variantes se desactivan.
+    """
+    
+    def destroy(self, request, *args, **kwargs):
+        try:
+            return super().destroy(request, *args, **kwargs)
+        except ProtectedError:
+            return Response(
+                {'error': 'Tiene movimientos de stock o ventas registrados; desactivarla en lugar de eliminarla'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+class PrendaViewSet(BajaProtegidaMixin, ListadoRapidoMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = Prenda.objects.all()
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -77,17 +148,22 @@ class PrendaViewSet(viewsets.ModelViewSet):
         return PrendaListSerializer
     
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'buscar']:
+        if self.action in ['list', 'retrieve', 'buscar', 'facetas']:
             return [AllowAny()]
         return [IsAdminUser()]
     
     def get_queryset(self):
-        queryset = Prenda.objects.all()
+        queryset = Prenda.objects.select_related('categoria')
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch('variantes', queryset=VariantePrenda.objects.select_related('talla', 'color')),
+                'imagenes',
+            )
         
         # Filtrar por stock disponible si se solicita
         stock_disponible = self.request.query_params.get('stock_disponible', None)
         if stock_disponible == 'true':
-            queryset = queryset.filter(variantes__stock__gt=0).distinct()
+            queryset = queryset.filter(existe_variante(stock__gt=0))
         
         # Filtrar por activo por defecto (a menos que se especifique lo contrario)
         mostrar_inactivos = self.request.query_params.get('mostrar_inactivos', 'false')
@@ -103,12 +179,9 @@ class PrendaViewSet(viewsets.ModelViewSet):
         if not query:
             return Response({'error': 'Se requiere un término de búsqueda'}, status=status.HTTP_400_BAD_REQUEST)
         
-        queryset = self.get_queryset().filter(
-            Q(nombre__icontains=query) | 
-            Q(descripcion__icontains=query) | 
-            Q(codigo__icontains=query) |
-            Q(categoria__nombre__icontains=query)
-        )
+        # Coincidencias ordenadas por relevancia según el motor de búsqueda de la base de
+        # datos, en la misma consulta que los filtros de la vista y la paginación
+        queryset = buscar_prendas(self.get_queryset(), query)
         
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -118,19 +191,51 @@ class PrendaViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def facetas(self, request):
+        """
+        Endpoint con la cantidad de prendas por valor de cada filtro (categoría, género, talla,
+        color, stock y rangos de precio) bajo los filtros indicados. ?rangos=N elige la
+        cantidad aproximada de rangos de precio.
+        """
+        try:
+            rangos = int(request.query_params.get('rangos', RANGOS_PRECIO))
+        except ValueError:
+            rangos = 0
+        if not 1 <= rangos <= MAXIMO_RANGOS:
+            return Response(
+                {'error': f'rangos debe ser un número entre 1 y {MAXIMO_RANGOS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # La búsqueda por texto y los filtros de get_queryset aplican a todas las facetas
+        queryset = filters.SearchFilter().filter_queryset(request, self.get_queryset(), self)
+        return Response(facetas_cacheadas(queryset, request.query_params, rangos))
+    
     @action(detail=False, methods=['get'])
     def stock_bajo(self, request):
-        """Endpoint para obtener prendas con stock bajo"""
-        umbral = int(request.query_params.get('umbral', 5))
-        
-        # Obtener prendas con al menos una variante pero con stock total bajo
-        queryset = Prenda.objects.annotate(
-            total_stock=Sum('variantes__stock')
-        ).filter(
-            variantes__isnull=False,
-            total_stock__gt=0,
-            total_stock__lte=umbral
-        ).distinct()
+        """
+        Endpoint para obtener prendas con stock bajo: las que tienen alguna variante en alerta,
+        o, si se indica ?umbral=N, las que tienen variantes y un stock total de hasta N unidades
+        """
+        umbral = request.query_params.get('umbral', None)
+        if umbral is None:
+            queryset = Prenda.objects.filter(
+                Exists(AlertaStock.objects.filter(variante__prenda=OuterRef('pk')))
+            ).select_related('categoria')
+        else:
+            try:
+                umbral = int(umbral)
+            except ValueError:
+                return Response(
+                    {'error': 'El umbral debe ser un número entero'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # Usa la columna desnormalizada stock_total (incluye las prendas agotadas)
+            queryset = Prenda.objects.filter(
+                Exists(VariantePrenda.objects.filter(prenda=OuterRef('pk'))),
+                stock_total__lte=umbral
+            ).select_related('categoria')
         
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -140,12 +245,14 @@ class PrendaViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
-class VariantePrendaViewSet(viewsets.ModelViewSet):
+class VariantePrendaViewSet(BajaProtegidaMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = VariantePrenda.objects.all()
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_class = VariantePrendaFilter
     ordering_fields = ['prenda__nombre', 'talla__orden', 'color__nombre']
+    pagination_class = PaginacionSeleccionable
+    orden_cursor = ('-creado', '-id')
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -155,12 +262,12 @@ class VariantePrendaViewSet(viewsets.ModelViewSet):
         return VariantePrendaSerializer
     
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'escanear']:
             return [AllowAny()]
         return [IsAdminUser()]
     
     def get_queryset(self):
-        queryset = VariantePrenda.objects.all()
+        queryset = VariantePrenda.objects.select_related('talla', 'color')
         
         # Filtrar por prenda
         prenda_id = self.request.query_params.get('prenda_id', None)
@@ -187,22 +294,179 @@ class VariantePrendaViewSet(viewsets.ModelViewSet):
         
         try:
             cantidad = int(cantidad)
-        except ValueError:
+        except (ValueError, TypeError):
             return Response(
                 {'error': 'La cantidad debe ser un número entero'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Ajustar el stock
-        variante.stock += cantidad
-        if variante.stock < 0:
-            variante.stock = 0
-        variante.save()
+        # Ajustar el stock con un UPDATE atómico (sin quedar en negativo)
+        try:
+            modificar_stock({variante.pk: cantidad}, 'AJUSTE', usuario=request.user)
+        except StockInsuficiente as e:
+            return Response({'error': e.mensajes()}, status=status.HTTP_400_BAD_REQUEST)
+        variante.refresh_from_db(fields=['stock', 'actualizado'])
         
         serializer = self.get_serializer(variante)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'])
+    def matriz(self, request):
+        """Endpoint para crear de una vez la grilla de variantes talla × color de una prenda"""
+        serializer = MatrizVariantesSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        variantes = serializer.save()
+        return Response(
+            {
+                'creadas': len(variantes),
+                'omitidas': serializer.omitidas,
+                'variantes': VariantePrendaSerializer(variantes, many=True).data,
+            },
+            status=status.HTTP_201_CREATED
+        )
+    
+    @action(detail=False, methods=['post'])
+    def etiquetas(self, request):
+        """
+        Endpoint para imprimir etiquetas (QR o Code128 con nombre, talla, color y precio):
+        retorna las hojas en PDF o la página pedida en PNG
+        """
+        serializer = EtiquetasSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        
+        try:
+            contenido = hoja_etiquetas(datos['etiquetas'], datos['codigo'], datos['formato'], datos['pagina'])
+        except EtiquetasInvalidas as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response = HttpResponse(contenido, content_type=FORMATOS_ETIQUETAS[datos['formato']])
+        response['Content-Disposition'] = f'inline; filename="etiquetas.{datos["formato"]}"'
+        response['X-Total-Paginas'] = datos['paginas']
+        return response
+    
+    @action(detail=False, methods=['post'])
+    def importar_conteo(self, request):
+        """
+        Endpoint para cargar un conteo físico de inventario desde un CSV (archivo con columnas
+        codigo_barras y cantidad). modo='set' fija el stock contado; modo='delta' lo suma.
+        """
+        archivo = request.FILES.get('archivo', None)
+        if archivo is None:
+            return Response(
+                {'error': 'Debe adjuntar el archivo CSV en el campo "archivo"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            resultado = importar_conteo_csv(
+                archivo, modo=request.data.get('modo', 'set'), usuario=request.user
+            )
+        except ArchivoInvalido as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado.como_dict())
+    
+    def perform_update(self, serializer):
+        # Registrar el usuario en el movimiento de stock de la edición
+        serializer.instance.usuario_movimiento = self.request.user
+        serializer.save()
+    
+    def _fecha_consulta(self, request):
+        fecha = request.query_params.get('fecha', None)
+        if not fecha:
+            return None
+        return _parsear_fecha(fecha)
+    
+    @action(detail=True, methods=['get'])
+    def stock_a_fecha(self, request, pk=None):
+        """Endpoint para obtener el stock que tenía una variante en una fecha (?fecha=AAAA-MM-DD[THH:MM])"""
+        try:
+            fecha = self._fecha_consulta(request)
+        except ValueError:
+            fecha = None
+        if fecha is None:
+            return Response(
+                {'error': 'Debe indicar una fecha válida (AAAA-MM-DD o fecha y hora ISO)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        variante = self.get_object()
+        queryset = VariantePrenda.objects.filter(pk=variante.pk).select_related('prenda', 'talla', 'color')
+        serializer = StockAFechaSerializer(anotar_stock_a_fecha(queryset, fecha).get())
+        return Response({'fecha': fecha, **serializer.data})
+    
+    @action(detail=False, methods=['get'])
+    def stock_historico(self, request):
+        """Endpoint para obtener el stock de las variantes a una fecha, filtrable por prenda y categoría"""
+        try:
+            fecha = self._fecha_consulta(request)
+        except ValueError:
+            fecha = None
+        if fecha is None:
+            return Response(
+                {'error': 'Debe indicar una fecha válida (AAAA-MM-DD o fecha y hora ISO)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.filter_queryset(self.get_queryset()).filter(creado__lte=fecha)
+        categoria = request.query_params.get('categoria', None)
+        if categoria:
+            queryset = queryset.filter(prenda__categoria_id=categoria)
+        queryset = anotar_stock_a_fecha(
+            queryset.select_related('prenda', 'talla', 'color').order_by('prenda__nombre', 'talla__orden', 'pk'),
+            fecha
+        )
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = StockAFechaSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = StockAFechaSerializer(queryset, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'], url_path=r'escanear/(?P<codigo>[^/]+)')
+    def escanear(self, request, codigo=None):
+        """Endpoint para el punto de venta: resuelve un código de barras de variante o un código de prenda"""
+        resultado = escanear_codigo(codigo)
+        if resultado is None:
+            return Response(
+                {'error': 'No se encontró ninguna variante ni prenda con ese código'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(resultado)
+
+class MovimientoStockViewSet(CamposDinamicosViewMixin, viewsets.ReadOnlyModelViewSet):
+    """Libro de movimientos de stock (solo lectura)"""
+    queryset = MovimientoStock.objects.select_related(
+        'variante__prenda', 'variante__talla', 'variante__color', 'usuario'
+    )
+    serializer_class = MovimientoStockSerializer
+    permission_classes = [IsAdminUser]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = MovimientoStockFilter
+    ordering_fields = ['fecha', 'cantidad']
+    pagination_class = PaginacionSeleccionable
+    paginacion_por_defecto = 'cursor'
+    orden_cursor = ('-fecha', '-id')
+
+class AlertaStockViewSet(CamposDinamicosViewMixin, viewsets.ReadOnlyModelViewSet):
+    """Variantes con stock en o por debajo de su umbral (incluidas las agotadas)"""
+    queryset = AlertaStock.objects.select_related('variante__prenda', 'variante__talla', 'variante__color')
+    serializer_class = AlertaStockSerializer
+    permission_classes = [IsAdminUser]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = AlertaStockFilter
+    ordering_fields = ['stock', 'desde']
+    
+    @action(detail=False, methods=['get'])
+    def cantidad(self, request):
+        """Endpoint liviano para el contador del panel: cantidad de alertas y de variantes agotadas"""
+        totales = AlertaStock.objects.aggregate(
+            cantidad=Count('pk'),
+            agotadas=Count('pk', filter=Q(stock=0))
+        )
+        return Response(totales)
 
-class ImagenPrendaViewSet(viewsets.ModelViewSet):
+class ImagenPrendaViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = ImagenPrenda.objects.all()
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.OrderingFilter]
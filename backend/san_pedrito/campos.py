@@ -0,0 +1,205 @@
+"""
+Selección de campos de las respuestas de la API.
+
+Los serializers de lectura con CamposDinamicosMixin aceptan tres parámetros:
+
+    ?fields=id,nombre,variantes.stock   solo esos campos (con rutas para los anidados)
+    ?omit=descripcion,variantes.creado  todos los campos menos esos
+    ?expand=cliente,items.variante      reemplaza el id de una relación por el objeto
+
+Las relaciones que se pueden expandir se declaran en Meta.expandibles
+({campo: serializer o ruta 'app.serializers.Clase'}). Los campos calculados que leen
+atributos del modelo declaran esos atributos en Meta.dependencias
+({campo: ['atributo', ...]}).
+
+Las vistas con CamposDinamicosViewMixin además ajustan la consulta a los campos
+pedidos en list y retrieve: cargan solo las columnas necesarias con only(), descartan
+los select_related y prefetch_related de relaciones que no se van a mostrar y agregan
+select_related para las relaciones expandidas.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+PARAMETRO_CAMPOS = 'fields'
+PARAMETRO_OMITIR = 'omit'
+PARAMETRO_EXPANDIR = 'expand'
+PARAMETROS = (PARAMETRO_CAMPOS, PARAMETRO_OMITIR, PARAMETRO_EXPANDIR)
+
+
+def _arbol(valor):
+    """'id,variantes.stock' -> {'id': {}, 'variantes': {'stock': {}}}"""
+    arbol = {}
+    for ruta in valor.split(','):
+        nodo = arbol
+        for parte in filter(None, (p.strip() for p in ruta.split('.'))):
+            nodo = nodo.setdefault(parte, {})
+    return arbol
+
+
+class Seleccion:
+    """Campos pedidos para un serializer: incluir (None para todos), omitir y expandir"""
+
+    def __init__(self, incluir=None, omitir=None, expandir=None):
+        self.incluir = incluir
+        self.omitir = omitir or {}
+        self.expandir = expandir or {}
+
+    @classmethod
+    def desde_request(cls, request):
+        """Retorna la selección de los parámetros del request, o None si no pide ninguna"""
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        parametros = request.query_params
+        if not any(parametros.get(nombre) for nombre in PARAMETROS):
+            return None
+        campos = parametros.get(PARAMETRO_CAMPOS)
+        return cls(
+            _arbol(campos) if campos else None,
+            _arbol(parametros.get(PARAMETRO_OMITIR, '')),
+            _arbol(parametros.get(PARAMETRO_EXPANDIR, '')),
+        )
+
+    @property
+    def reduce(self):
+        """Indica si la selección deja afuera algún campo"""
+        return self.incluir is not None or bool(self.omitir)
+
+    def hija(self, nombre):
+        """Selección para el serializer anidado en el campo indicado"""
+        incluir = self.incluir.get(nombre) if self.incluir is not None else None
+        return Seleccion(incluir or None, self.omitir.get(nombre), self.expandir.get(nombre))
+
+    def aplicar(self, campos, expandibles):
+        """Filtra y expande el diccionario de campos de un serializer"""
+        for nombre in self.expandir:
+            if nombre in expandibles:
+                campos[nombre] = _campo_expandido(expandibles[nombre])
+        for nombre in list(campos):
+            if self.incluir is not None and nombre not in self.incluir and nombre not in self.expandir:
+                del campos[nombre]
+            elif nombre in self.omitir and not self.omitir[nombre]:
+                del campos[nombre]
+        for nombre, campo in campos.items():
+            anidado = campo.child if isinstance(campo, serializers.ListSerializer) else campo
+            if isinstance(anidado, CamposDinamicosMixin):
+                anidado._seleccion = self.hija(nombre)
+        return campos
+
+
+def _campo_expandido(definicion):
+    if isinstance(definicion, tuple):
+        clase, opciones = definicion
+    else:
+        clase, opciones = definicion, {}
+    if isinstance(clase, str):
+        clase = import_string(clase)
+    return clase(read_only=True, **opciones)
+
+
+class CamposDinamicosMixin:
+    """Serializer de lectura que respeta ?fields=, ?omit= y ?expand="""
+
+    def _seleccion_campos(self):
+        if hasattr(self, '_seleccion'):
+            return self._seleccion
+        padre = self.parent
+        if isinstance(padre, serializers.ListSerializer):
+            padre = padre.parent
+        if padre is not None:
+            return None  # Anidado en un serializer que no pasó una selección
+        return Seleccion.desde_request(self.context.get('request'))
+
+    def get_fields(self):
+        campos = super().get_fields()
+        seleccion = self._seleccion_campos()
+        if seleccion is None:
+            return campos
+        return seleccion.aplicar(campos, getattr(self.Meta, 'expandibles', {}))
+
+
+def _rutas_select_related(arbol, prefijo=''):
+    rutas = []
+    for nombre, hijos in arbol.items():
+        ruta = f'{prefijo}{nombre}'
+        rutas.append(ruta)
+        rutas.extend(_rutas_select_related(hijos, f'{ruta}__'))
+    return rutas
+
+
+def _raiz_prefetch(lookup):
+    ruta = lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup
+    return ruta.split('__')[0]
+
+
+def ajustar_queryset(queryset, serializer, columnas_extra=()):
+    """
+    Limita la consulta a lo que usan los campos del serializer: columnas con only() y
+    relaciones cargadas con select_related/prefetch_related. Si algún campo lee un
+    atributo que no se puede resolver a una columna no se usa only().
+    """
+    opciones = queryset.model._meta
+    dependencias = getattr(serializer.Meta, 'dependencias', {})
+    usados = set()
+    columnas = {opciones.pk.name, *columnas_extra}
+    relaciones_anidadas = set()
+    resoluble = True
+
+    for nombre, campo in serializer.fields.items():
+        if campo.write_only:
+            continue
+        if campo.source == '*':
+            resoluble = False
+            continue
+        raices = list(dependencias.get(nombre, [campo.source_attrs[0]]))
+        for raiz in raices:
+            if raiz.startswith('get_') and raiz.endswith('_display'):
+                raiz = raiz[4:-8]
+            try:
+                campo_modelo = opciones.get_field(raiz)
+            except FieldDoesNotExist:
+                if raiz not in queryset.query.annotations:
+                    resoluble = False
+                continue
+            usados.add(campo_modelo.name)
+            if campo_modelo.concrete:
+                columnas.add(campo_modelo.name)
+            if campo_modelo.many_to_one and isinstance(campo, serializers.Serializer):
+                relaciones_anidadas.add(campo_modelo.name)
+
+    # select_related: solo las relaciones usadas, más las que se muestran anidadas
+    seleccionadas = queryset.query.select_related
+    if seleccionadas is not True:
+        rutas = [
+            ruta for ruta in _rutas_select_related(seleccionadas or {})
+            if ruta.split('__')[0] in usados
+        ]
+        rutas.extend(relaciones_anidadas.difference(rutas))
+        queryset = queryset.select_related(None)
+        if rutas:
+            queryset = queryset.select_related(*rutas)
+
+    prefetch = [l for l in queryset._prefetch_related_lookups if _raiz_prefetch(l) in usados]
+    queryset = queryset.prefetch_related(None).prefetch_related(*prefetch)
+
+    if resoluble:
+        queryset = queryset.only(*columnas)
+    return queryset
+
+
+class CamposDinamicosViewMixin:
+    """Ajusta la consulta de list y retrieve a los campos pedidos con ?fields=/?omit=/?expand="""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        if Seleccion.desde_request(self.request) is None:
+            return queryset
+        serializer = self.get_serializer()
+        if not isinstance(serializer, CamposDinamicosMixin):
+            return queryset
+        orden = [campo.lstrip('-') for campo in getattr(self, 'orden_cursor', ())]
+        return ajustar_queryset(queryset, serializer, [c for c in orden if c != 'pk'])
@@ -0,0 +1,264 @@
+"""
+Exportación de listados a CSV y XLSX en streaming.
+
+Las filas se escriben a medida que se leen de la base (con iterator(chunk_size=...),
+que en PostgreSQL usa un cursor del servidor) y se envían en bloques con
+StreamingHttpResponse: ni la consulta ni el archivo se arman completos en memoria, así
+que el consumo no depende de la cantidad de filas.
+
+El XLSX se escribe sin dependencias: es un ZIP con unas pocas partes XML fijas y la
+hoja, que se genera fila por fila. zipfile escribe en una salida que no permite seek
+(los tamaños van en un descriptor después de cada parte), y lo que produce se entrega
+por bloques.
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+TAMANIO_LOTE = 2000
+TAMANIO_BLOQUE = 64 * 1024
+
+
+class Columna:
+    """Columna de una exportación: título y valor tomado de la fila de values()"""
+
+    def __init__(self, titulo, clave, convertir=None):
+        self.titulo = titulo
+        self.clave = clave
+        self.convertir = convertir
+
+    def valor(self, fila):
+        valor = fila[self.clave]
+        if valor is None or self.convertir is None:
+            return valor
+        return self.convertir(valor)
+
+
+def opciones(choices):
+    """Conversión de un valor de choices a su etiqueta"""
+    etiquetas = dict(choices)
+    return lambda valor: etiquetas.get(valor, valor)
+
+
+def _fecha_local(valor):
+    if isinstance(valor, datetime) and timezone.is_aware(valor):
+        return timezone.localtime(valor).replace(tzinfo=None)
+    return valor
+
+
+def filas(queryset, columnas):
+    """Recorre el queryset con un cursor por lotes y genera los valores de cada fila"""
+    claves = list(dict.fromkeys(columna.clave for columna in columnas))
+    for fila in queryset.values(*claves).iterator(chunk_size=TAMANIO_LOTE):
+        yield [_fecha_local(columna.valor(fila)) for columna in columnas]
+
+
+class _Salida:
+    """Archivo de solo escritura que acumula lo escrito hasta que se retira"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+class _TextoCSV:
+    """Destino de csv.writer que acumula las líneas escritas hasta que se retiran"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, texto):
+        self._partes.append(texto)
+
+    def retirar(self):
+        texto = ''.join(self._partes)
+        self._partes = []
+        return texto
+
+
+def _bloques(partes):
+    """Agrupa cadenas en bloques UTF-8 de al menos TAMANIO_BLOQUE caracteres"""
+    bloque = []
+    tamanio = 0
+    for parte in partes:
+        bloque.append(parte)
+        tamanio += len(parte)
+        if tamanio >= TAMANIO_BLOQUE:
+            yield ''.join(bloque).encode('utf-8')
+            bloque, tamanio = [], 0
+    if bloque:
+        yield ''.join(bloque).encode('utf-8')
+
+
+def generar_csv(titulos, valores):
+    """Genera el CSV en bloques de bytes (con BOM para que Excel lo abra como UTF-8)"""
+    destino = _TextoCSV()
+    escritor = csv.writer(destino)
+
+    def lineas():
+        escritor.writerow(titulos)
+        yield '\ufeff' + destino.retirar()
+        for fila in valores:
+            escritor.writerow(['' if valor is None else _texto_csv(valor) for valor in fila])
+            yield destino.retirar()
+
+    return _bloques(lineas())
+
+
+# Primeros caracteres con los que una planilla interpreta el texto como fórmula
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _texto_csv(valor):
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(valor, str) and valor[:1] in _INICIO_FORMULA:
+        # Que una planilla no lo interprete como fórmula
+        return "'" + valor
+    return valor
+
+
+# Partes fijas del XLSX
+_TIPOS_CONTENIDO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_RELACIONES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{hoja}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_RELACIONES_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Estilos de celda: 0 general, 1 fecha y hora, 2 fecha, 3 título en negrita
+_ESTILOS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="2"><numFmt numFmtId="164" formatCode="dd/mm/yyyy hh:mm"/>'
+    '<numFmt numFmtId="165" formatCode="dd/mm/yyyy"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '</styleSheet>'
+)
+_INICIO_HOJA = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" '
+    'activePane="bottomLeft" state="frozen"/></sheetView></sheetViews>'
+    '<sheetData>'
+)
+_FIN_HOJA = '</sheetData></worksheet>'
+
+_ORIGEN_EXCEL = datetime(1899, 12, 30)
+# Caracteres de control que XML 1.0 no admite ni escapados (Excel rechaza el archivo)
+_CONTROL_INVALIDO = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _celda(valor, estilo_texto=''):
+    if valor is None:
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c><v>{valor}</v></c>'
+    if isinstance(valor, datetime):
+        return f'<c s="1"><v>{(valor - _ORIGEN_EXCEL).total_seconds() / 86400:.6f}</v></c>'
+    if isinstance(valor, date):
+        return f'<c s="2"><v>{(valor - _ORIGEN_EXCEL.date()).days}</v></c>'
+    texto = escape(_CONTROL_INVALIDO.sub('', str(valor)))
+    return f'<c t="inlineStr"{estilo_texto}><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def generar_xlsx(titulos, valores, hoja='Datos'):
+    """Genera el XLSX (una hoja con la fila de títulos congelada) en bloques de bytes"""
+    salida = _Salida()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as archivo:
+        archivo.writestr('[Content_Types].xml', _TIPOS_CONTENIDO)
+        archivo.writestr('_rels/.rels', _RELACIONES)
+        archivo.writestr('xl/workbook.xml', _LIBRO.format(hoja=escape(hoja, {'"': '&quot;'})))
+        archivo.writestr('xl/_rels/workbook.xml.rels', _RELACIONES_LIBRO)
+        archivo.writestr('xl/styles.xml', _ESTILOS)
+        with archivo.open('xl/worksheets/sheet1.xml', 'w') as parte:
+            filas_xml = [_INICIO_HOJA, '<row>', *(_celda(t, ' s="3"') for t in titulos), '</row>']
+            for fila in valores:
+                filas_xml.append('<row>' + ''.join(_celda(valor) for valor in fila) + '</row>')
+                if len(filas_xml) >= 500:
+                    parte.write(''.join(filas_xml).encode('utf-8'))
+                    filas_xml = []
+                    datos = salida.retirar()
+                    if datos:
+                        yield datos
+            filas_xml.append(_FIN_HOJA)
+            parte.write(''.join(filas_xml).encode('utf-8'))
+    yield salida.retirar()
+
+
+def respuesta_exportacion(nombre, formato, columnas, queryset, hoja='Datos'):
+    """StreamingHttpResponse con el archivo (nombre sin extensión) de las filas del queryset"""
+    titulos = [columna.titulo for columna in columnas]
+    valores = filas(queryset, columnas)
+    if formato == 'xlsx':
+        contenido = generar_xlsx(titulos, valores, hoja)
+    else:
+        contenido = generar_csv(titulos, valores)
+    respuesta = StreamingHttpResponse(contenido, content_type=FORMATOS[formato])
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+    return respuesta
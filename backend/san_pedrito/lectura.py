@@ -0,0 +1,146 @@
+"""
+Listados de solo lectura sin instancias de modelos.
+
+Un ModelSerializer arma por cada fila una instancia del modelo, recorre su árbol de
+campos y llama a las propiedades calculadas. Para los listados grandes eso cuesta más
+que la consulta. CodificadorFilas compila una vez por serializer qué columna de
+values() alimenta cada campo y qué conversión necesita, y luego arma cada fila con un
+solo recorrido sobre esa lista. Los campos que no son columnas (propiedades del
+modelo) se calculan en la consulta con las expresiones de Meta.anotaciones.
+
+La salida es la misma que la del serializer: mismas claves, mismo orden y los mismos
+to_representation de DRF para fechas, decimales, opciones, archivos e ids.
+"""
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import FileField
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from .campos import Seleccion
+
+# Cómo se convierte el valor de cada columna
+CRUDO = 'crudo'        # el valor de values() tal cual (ids, propiedades, anotaciones)
+CAMPO = 'campo'        # field.to_representation(valor)
+ARCHIVO = 'archivo'    # field.to_representation(FieldFile) a partir del nombre guardado
+
+
+def _formateador_archivo(representar, campo_modelo):
+    def formatear(nombre):
+        return representar(campo_modelo.attr_class(None, campo_modelo, nombre))
+    return formatear
+
+
+class CodificadorFilas:
+    """Arma la representación de un serializer de listado a partir de filas de values()"""
+    _compilados = {}
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.modelo = serializer_class.Meta.model
+        self.anotaciones = dict(getattr(serializer_class.Meta, 'anotaciones', {}))
+        self.columnas = self._compilar(serializer_class().fields)
+
+    @classmethod
+    def para(cls, serializer_class):
+        """Retorna el codificador (compilado una sola vez) del serializer"""
+        codificador = cls._compilados.get(serializer_class)
+        if codificador is None:
+            codificador = cls._compilados[serializer_class] = cls(serializer_class)
+        return codificador
+
+    def _campo_modelo(self, nombre, ruta):
+        modelo = self.modelo
+        campo_modelo = None
+        for parte in ruta:
+            if campo_modelo is not None:
+                modelo = campo_modelo.related_model
+            try:
+                campo_modelo = modelo._meta.get_field(parte)
+            except (FieldDoesNotExist, AttributeError):
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{nombre}: '{'.'.join(ruta)}' no es una columna; "
+                    f"declarar su expresión en Meta.anotaciones"
+                )
+        return campo_modelo
+
+    def _compilar(self, campos):
+        columnas = []
+        for nombre, campo in campos.items():
+            if campo.write_only:
+                continue
+            if nombre in self.anotaciones:
+                tipo = CRUDO if type(campo) is serializers.ReadOnlyField else CAMPO
+                columnas.append((nombre, nombre, tipo, None))
+                continue
+            campo_modelo = self._campo_modelo(nombre, campo.source_attrs)
+            clave = '__'.join(campo.source_attrs)
+            if isinstance(campo_modelo, FileField):
+                columnas.append((nombre, clave, ARCHIVO, campo_modelo))
+            elif type(campo) is serializers.ReadOnlyField or isinstance(campo, PrimaryKeyRelatedField):
+                columnas.append((nombre, clave, CRUDO, None))
+            else:
+                columnas.append((nombre, clave, CAMPO, None))
+        return columnas
+
+    def preparar(self, queryset, extra=()):
+        """Convierte el queryset en uno de values() con las columnas y anotaciones necesarias"""
+        claves = [clave for _, clave, _, _ in self.columnas]
+        claves.extend(campo for campo in extra if campo not in claves)
+        return (
+            queryset.select_related(None).prefetch_related(None)
+            .annotate(**self.anotaciones)
+            .values(*claves)
+        )
+
+    def _formateadores(self, serializer):
+        campos = serializer.fields
+        formateadores = []
+        for nombre, clave, tipo, campo_modelo in self.columnas:
+            if tipo == CRUDO:
+                formatear = None
+            elif tipo == ARCHIVO:
+                formatear = _formateador_archivo(campos[nombre].to_representation, campo_modelo)
+            else:
+                formatear = campos[nombre].to_representation
+            formateadores.append((nombre, clave, formatear))
+        return formateadores
+
+    def iterar(self, filas, serializer):
+        """Genera la representación de cada fila a medida que se recorre (para respuestas en streaming)"""
+        formateadores = self._formateadores(serializer)
+        for fila in filas:
+            datos = {}
+            for nombre, clave, formatear in formateadores:
+                valor = fila[clave]
+                datos[nombre] = valor if valor is None or formatear is None else formatear(valor)
+            yield datos
+
+    def codificar(self, filas, serializer):
+        """Retorna la lista de representaciones de las filas; serializer aporta el contexto"""
+        return list(self.iterar(filas, serializer))
+
+
+class ListadoRapidoMixin:
+    """
+    Resuelve la acción list con CodificadorFilas en lugar de instanciar el serializer por
+    fila. Si el request pide una selección de campos (?fields=, ?omit=, ?expand=) se usa
+    el camino normal del serializer.
+    """
+    listado_rapido = True
+
+    def list(self, request, *args, **kwargs):
+        if not self.listado_rapido or Seleccion.desde_request(request) is not None:
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.get_serializer()
+        codificador = CodificadorFilas.para(type(serializer))
+        orden = [campo.lstrip('-') for campo in getattr(self, 'orden_cursor', ())]
+        queryset = codificador.preparar(
+            self.filter_queryset(self.get_queryset()),
+            extra=[campo for campo in orden if campo != 'pk']
+        )
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(codificador.codificar(page, serializer))
+        return Response(codificador.codificar(queryset, serializer))
@@ -0,0 +1,167 @@
+"""
+Paginación de los listados de la API.
+
+La paginación por número de página de siempre (PageNumberPagination, con count total)
+se mantiene para las pantallas que muestran totales. PaginacionKeyset pagina por cursor:
+en lugar de OFFSET filtra por los valores de la última fila de la página anterior, por
+lo que no hace COUNT(*) y el costo de una página no crece con su profundidad.
+
+PaginacionSeleccionable permite elegir el modo por endpoint (atributo
+paginacion_por_defecto de la vista) o por request (?paginacion=cursor|paginas).
+Las vistas que la usan definen orden_cursor: los campos del orden, terminando en la
+clave primaria para que el orden sea total (ej. ('-fecha', '-id')). En modo cursor el
+parámetro ordering no aplica: el orden es siempre orden_cursor.
+"""
+import base64
+import json
+from types import SimpleNamespace
+from django.db.models import Q
+from django.utils.encoding import force_str
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, replace_query_param
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+class PaginacionKeyset(BasePagination):
+    """Paginación por cursor sobre un orden total de varias columnas"""
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def __init__(self, orden=None):
+        self.orden = tuple(orden or ())
+
+    def _campos(self, queryset):
+        campos = []
+        for campo in self.orden:
+            descendente = campo.startswith('-')
+            nombre = campo.lstrip('-')
+            if nombre == 'pk':
+                nombre = queryset.model._meta.pk.name
+            campos.append((nombre, descendente, queryset.model._meta.get_field(nombre)))
+        return campos
+
+    def get_page_size(self, request):
+        try:
+            tamanio = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(tamanio, self.max_page_size))
+
+    def _decodificar(self, campos, request):
+        valor = request.query_params.get(self.cursor_query_param)
+        if not valor:
+            return None, False
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(valor.encode('ascii')).decode('utf-8'))
+            valores = [campo.to_python(v) for (_, _, campo), v in zip(campos, datos['v'], strict=True)]
+            return valores, bool(datos.get('a'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _codificar(self, campos, fila, anterior):
+        if isinstance(fila, dict):  # Filas de values()
+            fila = SimpleNamespace(**{campo.attname: fila[nombre] for nombre, _, campo in campos})
+        valores = [force_str(campo.value_to_string(fila)) for _, _, campo in campos]
+        datos = json.dumps({'v': valores, 'a': int(anterior)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii')
+
+    def _filtro(self, campos, valores, anterior):
+        """(c1 < v1) OR (c1 = v1 AND c2 < v2) OR ... según la dirección de cada campo"""
+        filtro = Q()
+        iguales = Q()
+        for (nombre, descendente, _), valor in zip(campos, valores):
+            operador = 'lt' if descendente != anterior else 'gt'
+            filtro |= iguales & Q(**{f'{nombre}__{operador}': valor})
+            iguales &= Q(**{nombre: valor})
+        return filtro
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.orden:
+            self.orden = tuple(getattr(view, 'orden_cursor', ()))
+        campos = self._campos(queryset)
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        valores, anterior = self._decodificar(campos, request)
+
+        orden = [('-' if descendente != anterior else '') + nombre for nombre, descendente, _ in campos]
+        queryset = queryset.order_by(*orden)
+        if valores is not None:
+            queryset = queryset.filter(self._filtro(campos, valores, anterior))
+
+        filas = list(queryset[:self.page_size + 1])
+        hay_mas = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+        if anterior:
+            filas.reverse()
+
+        # Hay página siguiente si quedaron filas después (o si venimos retrocediendo)
+        self.cursor_siguiente = None
+        self.cursor_anterior = None
+        if filas:
+            if hay_mas or anterior:
+                self.cursor_siguiente = self._codificar(campos, filas[-1], False)
+            if valores is not None and (not anterior or hay_mas):
+                self.cursor_anterior = self._codificar(campos, filas[0], True)
+        return filas
+
+    def _url(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._url(self.cursor_siguiente),
+            'previous': self._url(self.cursor_anterior),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class PaginacionSeleccionable(BasePagination):
+    """Usa paginación por cursor o por número de página según la vista y el request"""
+    parametro = 'paginacion'
+
+    def __init__(self):
+        self.paginador = None
+
+    def _modo(self, request, view):
+        modo = request.query_params.get(self.parametro)
+        if modo in ('cursor', 'paginas'):
+            return modo
+        if request.query_params.get(PaginacionKeyset.cursor_query_param):
+            return 'cursor'
+        return getattr(view, 'paginacion_por_defecto', 'paginas')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self._modo(request, view) == 'cursor':
+            self.paginador = PaginacionKeyset(getattr(view, 'orden_cursor', None))
+        else:
+            self.paginador = PageNumberPagination()
+        return self.paginador.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginador.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return PageNumberPagination().get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.paginador.to_html() if self.paginador else ''
+
+    def get_results(self, data):
+        return data['results']
@@ -0,0 +1,25 @@
+"""
+Pool de procesos compartido para el trabajo de CPU (dibujar etiquetas, generar miniaturas).
+
+Cada proceso (worker web, worker del outbox o comando) crea a lo sumo un pool, recién
+cuando se usa por primera vez, con PROCESOS_TRABAJO procesos. Los comandos de carga
+masiva pueden pedir un pool propio con otra cantidad mediante crear_pool.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+
+_pool = None
+
+
+def crear_pool(procesos=None):
+    """Retorna un pool nuevo con la cantidad de procesos indicada (por defecto, uno por CPU)"""
+    return ProcessPoolExecutor(max_workers=procesos or os.cpu_count())
+
+
+def obtener_pool():
+    """Retorna el pool compartido del proceso, creándolo la primera vez"""
+    global _pool
+    if _pool is None:
+        _pool = crear_pool(settings.PROCESOS_TRABAJO)
+    return _pool
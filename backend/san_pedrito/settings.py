@@ -45,6 +45,8 @@ INSTALLED_APPS = [
     'prendas',
     'clientes',
     'ventas',
+    'eventos',
+    'sincronizacion',
 ]
 
 MIDDLEWARE = [
@@ -88,6 +90,16 @@ DATABASES = {
     )
 }
 
+# Cache
+# Por defecto en memoria del proceso. Con varios workers conviene un backend compartido
+# (Redis o memcached) para que las invalidaciones lleguen a todos los procesos.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -127,6 +139,32 @@ STATIC_ROOT = os.environ.get('STATIC_ROOT', os.path.join(BASE_DIR, 'static'))
 MEDIA_URL = os.environ.get('MEDIA_URL', '/media/')
 MEDIA_ROOT = os.environ.get('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
 
+# Umbral de stock bajo para variantes sin umbral propio, de su prenda ni de su categoría
+# (al cambiarlo, ejecutar manage.py reconstruir_alertas)
+STOCK_UMBRAL_POR_DEFECTO = int(os.environ.get('STOCK_UMBRAL_POR_DEFECTO', 5))
+
+# Procesos del pool compartido de cada worker para el trabajo de CPU (etiquetas); cada
+# worker web tiene el suyo, así que conviene pocos (0: uno por CPU)
+PROCESOS_TRABAJO = int(os.environ.get('PROCESOS_TRABAJO', 2))
+
+# Outbox de eventos: intentos antes de marcar un evento como fallido
+EVENTOS_MAXIMO_INTENTOS = int(os.environ.get('EVENTOS_MAXIMO_INTENTOS', 8))
+
+# Numeración de ventas: prefijo del punto de venta de esta instalación y números que
+# reserva cada worker por vez en las bases sin secuencias (SQLite)
+VENTAS_PUNTO_VENTA = os.environ.get('VENTAS_PUNTO_VENTA', '')
+VENTAS_BLOQUE_NUMEROS = int(os.environ.get('VENTAS_BLOQUE_NUMEROS', 20))
+
+# Sincronización de la PWA: días que se guardan las bajas (un cursor más viejo recibe todo)
+SINCRONIZACION_RETENCION_BAJAS_DIAS = int(os.environ.get('SINCRONIZACION_RETENCION_BAJAS_DIAS', 30))
+
+# Tickets de venta: encabezado y pie, columnas del ticket en texto (impresoras de 80 mm)
+# y segundos que se guardan en la cache las páginas ya dibujadas
+TICKETS_COMERCIO = os.environ.get('TICKETS_COMERCIO', 'San Pedrito')
+TICKETS_PIE = os.environ.get('TICKETS_PIE', 'Gracias por su compra')
+TICKETS_COLUMNAS = int(os.environ.get('TICKETS_COLUMNAS', 42))
+TICKETS_CACHE_SEGUNDOS = int(os.environ.get('TICKETS_CACHE_SEGUNDOS', 7 * 24 * 3600))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -29,6 +29,7 @@ urlpatterns = [
     path('api/clientes/', include('clientes.urls')),
     path('api/ventas/', include('ventas.urls')),
     path('api/usuarios/', include('usuarios.urls')),
+    path('api/sincronizacion/', include('sincronizacion.urls')),
     
     # Autenticación
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import Baja
+
+@admin.register(Baja)
+class BajaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'modelo', 'objeto_id', 'fecha')
+    list_filter = ('modelo',)
+    search_fields = ('objeto_id',)
+    date_hierarchy = 'fecha'
+    readonly_fields = ('modelo', 'objeto_id', 'fecha')
+    
+    def has_add_permission(self, request):
+        return False
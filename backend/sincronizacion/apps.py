@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SincronizacionConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'sincronizacion'
+    verbose_name = 'Sincronización de la PWA'
+    
+    def ready(self):
+        import sincronizacion.signals
@@ -0,0 +1,121 @@
+"""
+Sincronización incremental del catálogo y los clientes para la PWA.
+
+La primera sincronización (sin cursor) envía todos los registros activos. Cada respuesta
+termina con un cursor que el cliente guarda y manda en la siguiente (?cursor=); entonces
+solo se envían las filas cuyo actualizado (ultima_actualizacion en clientes) es posterior
+al cursor, más las bajas: registros eliminados (modelo Baja) o desactivados (activo=False).
+
+La respuesta es NDJSON, un registro JSON por línea:
+
+    {"completa": true}                        cabecera; true si reemplaza los datos locales
+    {"modelo": "prendas", "datos": {...}}     alta o modificación (se aplica como upsert)
+    {"modelo": "variantes", "baja": 15}       eliminado o desactivado
+    {"cursor": "eyJ..."}                      cursor de la próxima sincronización
+
+Si la respuesta se corta antes de la línea del cursor, el cliente repite con el cursor
+anterior. El cursor es el inicio de la sincronización menos MARGEN_CURSOR: las
+transacciones que estaban en curso al leer (auto_now toma la hora antes del commit) se
+vuelven a enviar en la próxima, y como se aplican como upsert repetirlas no cambia nada.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from clientes.models import Cliente
+from clientes.serializers import ClienteListSerializer
+from prendas.models import Categoria, Talla, Color, Prenda, VariantePrenda
+from prendas.serializers import (
+    CategoriaSerializer, TallaSerializer, ColorSerializer, PrendaListSerializer, VariantePrendaSerializer
+)
+from san_pedrito.lectura import CodificadorFilas
+from .models import Baja
+
+MARGEN_CURSOR = timedelta(minutes=5)
+TAMANIO_LOTE = 2000
+
+
+class VarianteSincronizacionSerializer(VariantePrendaSerializer):
+    """Variante con la prenda a la que pertenece (la PWA las guarda por separado)"""
+
+    class Meta(VariantePrendaSerializer.Meta):
+        fields = ['id', 'prenda', *VariantePrendaSerializer.Meta.fields[1:]]
+
+
+TipoSincronizado = namedtuple('TipoSincronizado', 'nombre modelo serializer campo_fecha')
+
+# En orden de dependencias: las referencias antes que las filas que las usan
+TIPOS = (
+    TipoSincronizado('categorias', Categoria, CategoriaSerializer, 'actualizado'),
+    TipoSincronizado('tallas', Talla, TallaSerializer, 'actualizado'),
+    TipoSincronizado('colores', Color, ColorSerializer, 'actualizado'),
+    TipoSincronizado('prendas', Prenda, PrendaListSerializer, 'actualizado'),
+    TipoSincronizado('variantes', VariantePrenda, VarianteSincronizacionSerializer, 'actualizado'),
+    TipoSincronizado('clientes', Cliente, ClienteListSerializer, 'ultima_actualizacion'),
+)
+TIPOS_POR_MODELO = {tipo.modelo: tipo for tipo in TIPOS}
+TIPOS_POR_NOMBRE = {tipo.nombre: tipo for tipo in TIPOS}
+
+
+def retencion_bajas():
+    """Tiempo que se guardan las bajas; un cursor más viejo recibe una sincronización completa"""
+    return timedelta(days=getattr(settings, 'SINCRONIZACION_RETENCION_BAJAS_DIAS', 30))
+
+
+def codificar_cursor(fecha):
+    datos = json.dumps({'desde': fecha.isoformat()}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii')
+
+
+def leer_cursor(valor):
+    """Retorna la fecha del cursor; lanza ValueError si el cursor no es válido"""
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(valor.encode('ascii')).decode('utf-8'))
+        fecha = parse_datetime(datos['desde'])
+    except (TypeError, KeyError, UnicodeError, AttributeError, ValueError):
+        raise ValueError("Cursor inválido")
+    if fecha is None or timezone.is_naive(fecha):
+        raise ValueError("Cursor inválido")
+    return fecha
+
+
+def _tiene_activo(modelo):
+    return any(campo.name == 'activo' for campo in modelo._meta.concrete_fields)
+
+
+def sincronizar(desde=None, request=None):
+    """
+    Genera los registros de la sincronización (cabecera, altas, bajas y cursor) a partir
+    de la fecha de un cursor, o completa si desde es None o anterior a la retención de bajas.
+    """
+    inicio = timezone.now()
+    completa = desde is None or desde < inicio - retencion_bajas()
+    yield {'completa': completa}
+
+    for tipo in TIPOS:
+        queryset = tipo.modelo.objects.order_by()
+        if not completa:
+            queryset = queryset.filter(**{f'{tipo.campo_fecha}__gte': desde})
+        if _tiene_activo(tipo.modelo):
+            if not completa:
+                inactivos = queryset.filter(activo=False).values_list('pk', flat=True)
+                for pk in inactivos.iterator(chunk_size=TAMANIO_LOTE):
+                    yield {'modelo': tipo.nombre, 'baja': pk}
+            queryset = queryset.filter(activo=True)
+
+        codificador = CodificadorFilas.para(tipo.serializer)
+        filas = codificador.preparar(queryset).iterator(chunk_size=TAMANIO_LOTE)
+        for datos in codificador.iterar(filas, tipo.serializer(context={'request': request})):
+            yield {'modelo': tipo.nombre, 'datos': datos}
+
+    if not completa:
+        bajas = Baja.objects.filter(fecha__gte=desde).values_list('modelo', 'objeto_id')
+        for nombre, objeto_id in bajas.iterator(chunk_size=TAMANIO_LOTE):
+            tipo = TIPOS_POR_NOMBRE.get(nombre)
+            if tipo is not None:
+                yield {'modelo': nombre, 'baja': tipo.modelo._meta.pk.to_python(objeto_id)}
+
+    yield {'cursor': codificar_cursor(inicio - MARGEN_CURSOR)}
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from sincronizacion.delta import retencion_bajas
+from sincronizacion.models import Baja
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina las bajas más viejas que la retención (SINCRONIZACION_RETENCION_BAJAS_DIAS). "
+        "Los clientes con un cursor anterior a la retención reciben una sincronización completa."
+    )
+
+    def handle(self, *args, **options):
+        eliminadas, _ = Baja.objects.filter(fecha__lt=timezone.now() - retencion_bajas()).delete()
+        self.stdout.write(self.style.SUCCESS(f"Bajas eliminadas: {eliminadas}"))
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:50
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Baja',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(help_text='Nombre del modelo en la sincronización (ej. prendas)', max_length=20)),
+                ('objeto_id', models.CharField(max_length=64)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Baja',
+                'verbose_name_plural': 'Bajas',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['fecha'], name='sincronizac_fecha_337158_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import models
+from django.utils import timezone
+
+class Baja(models.Model):
+    """
+    Marca de un registro eliminado (tombstone) para la sincronización incremental.
+
+    Las filas eliminadas ya no tienen actualizado que consultar, así que cada borrado
+    de un modelo sincronizado deja una baja que se envía a los clientes cuyo cursor es
+    anterior. Se purgan con manage.py purgar_bajas.
+    """
+    modelo = models.CharField(max_length=20, help_text="Nombre del modelo en la sincronización (ej. prendas)")
+    objeto_id = models.CharField(max_length=64)
+    fecha = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = "Baja"
+        verbose_name_plural = "Bajas"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['fecha']),
+        ]
+    
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id} ({self.fecha:%Y-%m-%d %H:%M})"
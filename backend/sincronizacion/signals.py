@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from prendas.models import Categoria, Talla, Color, Prenda, VariantePrenda
+from .delta import TIPOS_POR_MODELO
+from .models import Baja
+
+# Campos de las referencias que los registros sincronizados repiten (categoria_nombre,
+# talla_nombre, color_nombre, color_hex) y las filas que los repiten
+DEPENDIENTES = {
+    Categoria: (('nombre',), Prenda, 'categoria'),
+    Talla: (('nombre',), VariantePrenda, 'talla'),
+    Color: (('nombre', 'codigo_hex'), VariantePrenda, 'color'),
+}
+
+def registrar_baja(sender, instance, **kwargs):
+    """Deja la baja del registro eliminado para las sincronizaciones incrementales."""
+    Baja.objects.create(modelo=TIPOS_POR_MODELO[sender].nombre, objeto_id=str(instance.pk))
+
+for modelo in TIPOS_POR_MODELO:
+    post_delete.connect(registrar_baja, sender=modelo, dispatch_uid=f'sincronizacion_baja_{modelo._meta.label_lower}')
+
+@receiver(post_init, sender=Categoria)
+@receiver(post_init, sender=Talla)
+@receiver(post_init, sender=Color)
+def recordar_campos_repetidos(sender, instance, **kwargs):
+    """Guarda los valores cargados de los campos que repiten las filas dependientes."""
+    campos, _, _ = DEPENDIENTES[sender]
+    instance._repetidos_original = tuple(instance.__dict__.get(campo) for campo in campos)
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_save, sender=Talla)
+@receiver(post_save, sender=Color)
+def actualizar_dependientes(sender, instance, created, **kwargs):
+    """Si cambia un nombre o color repetido, marca como modificadas las filas que lo repiten."""
+    campos, dependiente, campo_fk = DEPENDIENTES[sender]
+    actuales = tuple(getattr(instance, campo) for campo in campos)
+    if not created and actuales != instance._repetidos_original:
+        dependiente.objects.filter(**{campo_fk: instance}).update(actualizado=timezone.now())
+    instance._repetidos_original = actuales
@@ -0,0 +1,159 @@
+import gzip
+import json
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from clientes.models import Cliente
+from prendas.models import Categoria, Talla, Color, Prenda, VariantePrenda
+from .delta import codificar_cursor, leer_cursor
+from .models import Baja
+
+Usuario = get_user_model()
+
+class SincronizacionTests(APITestCase):
+    """Pruebas para la sincronización incremental de la PWA"""
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            email='test@example.com',
+            password='testpassword',
+            nombre='Test',
+            apellido='User'
+        )
+        self.client.force_authenticate(user=self.usuario)
+        self.categoria = Categoria.objects.create(nombre='Remeras')
+        self.talla = Talla.objects.create(nombre='2 años', orden=1)
+        self.color = Color.objects.create(nombre='Rojo', codigo_hex='#FF0000')
+        self.prendas = [
+            Prenda.objects.create(
+                nombre=f'Remera {i}',
+                categoria=self.categoria,
+                precio_costo=Decimal('1000'),
+                precio_venta=Decimal('2000')
+            )
+            for i in range(3)
+        ]
+        self.variantes = [
+            VariantePrenda.objects.create(prenda=prenda, talla=self.talla, color=self.color, stock=2)
+            for prenda in self.prendas
+        ]
+        self.cliente = Cliente.objects.create(nombre='Ana', apellido='Pérez')
+        self.inactiva = Prenda.objects.create(
+            nombre='Discontinuada', categoria=self.categoria, activo=False,
+            precio_costo=Decimal('1000'), precio_venta=Decimal('2000')
+        )
+
+    def sincronizar(self, cursor=None, **extra):
+        parametros = {'cursor': cursor} if cursor else {}
+        response = self.client.get(reverse('sincronizacion-list'), parametros, **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        contenido = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            contenido = gzip.decompress(contenido)
+        return [json.loads(linea) for linea in contenido.decode('utf-8').splitlines()]
+
+    def agrupar(self, registros):
+        datos, bajas = {}, {}
+        for registro in registros[1:-1]:
+            if 'datos' in registro:
+                datos.setdefault(registro['modelo'], []).append(registro['datos'])
+            else:
+                bajas.setdefault(registro['modelo'], []).append(registro['baja'])
+        return datos, bajas
+
+    def test_sincronizacion_completa(self):
+        """Prueba que sin cursor se envían todos los registros activos y un cursor al final"""
+        registros = self.sincronizar()
+        self.assertEqual(registros[0], {'completa': True})
+        self.assertIn('cursor', registros[-1])
+        datos, bajas = self.agrupar(registros)
+
+        self.assertEqual(bajas, {})
+        self.assertEqual({p['id'] for p in datos['prendas']}, {p.pk for p in self.prendas})
+        self.assertEqual(len(datos['categorias']), 1)
+        self.assertEqual(len(datos['tallas']), 1)
+        self.assertEqual(len(datos['colores']), 1)
+        self.assertEqual(datos['clientes'][0]['id'], str(self.cliente.pk))
+        variante = datos['variantes'][0]
+        self.assertEqual(variante['prenda'], self.variantes[0].prenda_id)
+        self.assertTrue(variante['disponible'])
+
+    def test_sincronizacion_incremental(self):
+        """Prueba que con cursor solo se envían los cambios, las bajas y las desactivaciones"""
+        # Sin stock ni movimientos, para poder eliminarla
+        sin_stock = VariantePrenda.objects.create(
+            prenda=self.prendas[1], talla=Talla.objects.create(nombre='4 años', orden=2), color=self.color
+        )
+        cursor = codificar_cursor(timezone.now())
+
+        prenda = self.prendas[0]
+        prenda.precio_venta = Decimal('2500')
+        prenda.save()
+        eliminada = sin_stock.pk
+        sin_stock.delete()
+        self.cliente.activo = False
+        self.cliente.save()
+
+        registros = self.sincronizar(cursor)
+        self.assertEqual(registros[0], {'completa': False})
+        datos, bajas = self.agrupar(registros)
+
+        self.assertEqual([p['id'] for p in datos['prendas']], [prenda.pk, self.prendas[1].pk])
+        self.assertEqual(datos['prendas'][0]['precio_venta'], '2500.00')
+        self.assertNotIn('categorias', datos)
+        self.assertNotIn('clientes', datos)
+        self.assertEqual(bajas, {'variantes': [eliminada], 'clientes': [str(self.cliente.pk)]})
+        self.assertTrue(Baja.objects.filter(modelo='variantes', objeto_id=str(eliminada)).exists())
+
+        # El nuevo cursor empieza antes de esta sincronización (margen para transacciones en curso)
+        self.assertLess(leer_cursor(registros[-1]['cursor']), timezone.now())
+
+    def test_renombrar_referencias_reenvia_dependientes(self):
+        """Prueba que renombrar una categoría, talla o color reenvía las filas que repiten el nombre"""
+        cursor = codificar_cursor(timezone.now())
+        self.categoria.nombre = 'Camisetas'
+        self.categoria.save()
+        datos, _ = self.agrupar(self.sincronizar(cursor))
+        self.assertEqual({p['id'] for p in datos['prendas']}, {p.pk for p in self.prendas})
+        self.assertEqual({p['categoria_nombre'] for p in datos['prendas']}, {'Camisetas'})
+        self.assertNotIn('variantes', datos)
+
+        cursor = codificar_cursor(timezone.now())
+        self.color.codigo_hex = '#CC0000'
+        self.color.save()
+        datos, _ = self.agrupar(self.sincronizar(cursor))
+        self.assertEqual({v['color_hex'] for v in datos['variantes']}, {'#CC0000'})
+        self.assertEqual(len(datos['variantes']), len(self.variantes))
+
+        # Un cambio que no se repite en otras filas no las reenvía
+        cursor = codificar_cursor(timezone.now())
+        self.talla.orden = 2
+        self.talla.save()
+        datos, _ = self.agrupar(self.sincronizar(cursor))
+        self.assertEqual(list(datos), ['tallas'])
+
+    def test_respuesta_comprimida(self):
+        """Prueba que la respuesta se comprime con gzip cuando el cliente lo acepta"""
+        response = self.client.get(reverse('sincronizacion-list'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        lineas = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8').splitlines()
+        self.assertEqual(json.loads(lineas[0]), {'completa': True})
+
+    def test_cursor_invalido_o_vencido(self):
+        """Prueba que un cursor inválido da 400 y uno más viejo que las bajas pide todo de nuevo"""
+        response = self.client.get(reverse('sincronizacion-list'), {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        viejo = codificar_cursor(timezone.now() - timedelta(days=365))
+        self.assertEqual(self.sincronizar(viejo)[0], {'completa': True})
+
+    def test_requiere_autenticacion(self):
+        """Prueba que la sincronización no está disponible sin autenticación"""
+        self.client.force_authenticate(user=None)
+        response = self.client.get(reverse('sincronizacion-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import SincronizacionViewSet
+
+router = DefaultRouter()
+router.register(r'', SincronizacionViewSet, basename='sincronizacion')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
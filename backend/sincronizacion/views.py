@@ -0,0 +1,64 @@
+import zlib
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import permissions, status, viewsets
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from .delta import leer_cursor, sincronizar
+
+TAMANIO_BLOQUE = 64 * 1024
+
+
+def _ndjson(registros):
+    """Agrupa los registros en bloques de líneas JSON para no escribir una por una"""
+    codificar = JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    bloque = []
+    tamanio = 0
+    for registro in registros:
+        linea = (codificar(registro) + '\n').encode('utf-8')
+        bloque.append(linea)
+        tamanio += len(linea)
+        if tamanio >= TAMANIO_BLOQUE:
+            yield b''.join(bloque)
+            bloque, tamanio = [], 0
+    if bloque:
+        yield b''.join(bloque)
+
+
+def _gzip(bloques):
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+class SincronizacionViewSet(viewsets.ViewSet):
+    """
+    Sincronización de la PWA: catálogo (categorías, tallas, colores, prendas y variantes)
+    y clientes. Sin cursor envía todo; con ?cursor= (el de la última línea de la
+    respuesta anterior) solo los cambios y las bajas desde entonces. Ver sincronizacion.delta.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def list(self, request):
+        cursor = request.query_params.get('cursor')
+        desde = None
+        if cursor:
+            try:
+                desde = leer_cursor(cursor)
+            except ValueError as error:
+                return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        contenido = _ndjson(sincronizar(desde, request))
+        comprimir = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        respuesta = StreamingHttpResponse(
+            _gzip(contenido) if comprimir else contenido,
+            content_type='application/x-ndjson; charset=utf-8'
+        )
+        if comprimir:
+            respuesta['Content-Encoding'] = 'gzip'
+        patch_vary_headers(respuesta, ['Accept-Encoding'])
+        patch_cache_control(respuesta, private=True, no_store=True)
+        return respuesta
@@ -1,5 +1,7 @@
+import base64
 from django.contrib import admin
 from django.utils.html import format_html
+from . import qr
 from .models import Venta, ItemVenta, Devolucion, ItemDevolucion
 
 class ItemVentaInline(admin.TabularInline):
@@ -11,18 +13,18 @@ class ItemVentaInline(admin.TabularInline):
 
 @admin.register(Venta)
 class VentaAdmin(admin.ModelAdmin):
-    list_display = ('numero', 'cliente_display', 'fecha_display', 'total_display', 'estado_display', 'metodo_pago')
-    list_filter = ('estado', 'metodo_pago', 'fecha')
+    list_display = ('numero', 'cliente_display', 'fecha_display', 'total_display', 'cantidad_items', 'estado_display', 'metodo_pago')
+    list_filter = ('estado', 'metodo_pago', 'punto_venta', 'fecha')
     search_fields = ('numero', 'cliente__nombre', 'cliente__apellido', 'notas')
-    readonly_fields = ('numero', 'subtotal', 'total', 'qr_code_display', 'creado', 'actualizado')
+    readonly_fields = ('numero', 'subtotal', 'total', 'cantidad_items', 'cantidad_lineas', 'qr_code_display', 'creado', 'actualizado')
     autocomplete_fields = ('cliente',)
     inlines = [ItemVentaInline]
     fieldsets = (
         ('Información básica', {
-            'fields': ('numero', 'cliente', 'fecha', 'estado', 'metodo_pago')
+            'fields': ('numero', 'punto_venta', 'cliente', 'fecha', 'estado', 'metodo_pago')
         }),
         ('Importes', {
-            'fields': ('subtotal', 'descuento', 'impuestos', 'total')
+            'fields': ('subtotal', 'descuento', 'impuestos', 'total', 'cantidad_items', 'cantidad_lineas')
         }),
         ('Información adicional', {
             'fields': ('notas', 'vendedor', 'qr_code_display')
@@ -32,6 +34,10 @@ class VentaAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        # El listado, el autocompletado y __str__ muestran el cliente de cada venta
+        return super().get_queryset(request).select_related('cliente')
+    
     def cliente_display(self, obj):
         return obj.cliente
     cliente_display.short_description = 'Cliente'
@@ -56,8 +62,9 @@ class VentaAdmin(admin.ModelAdmin):
     estado_display.short_description = 'Estado'
     
     def qr_code_display(self, obj):
-        if obj.qr_code:
-            return format_html('<img src="{}" height="150" />', obj.qr_code.url)
+        if obj.numero:
+            svg = base64.b64encode(qr.qr_venta(obj, 'svg')).decode('ascii')
+            return format_html('<img src="data:image/svg+xml;base64,{}" height="150" />', svg)
         return "-"
     qr_code_display.short_description = 'Código QR'
 
@@ -84,6 +91,12 @@ class DevolucionAdmin(admin.ModelAdmin):
         }),
     )
     
+    def save_formset(self, request, form, formset, change):
+        # Registrar el usuario en los movimientos de stock de los items devueltos
+        for formulario in formset.forms:
+            formulario.instance.usuario_movimiento = request.user
+        super().save_formset(request, form, formset, change)
+    
     def venta_display(self, obj):
         return f"Venta #{obj.venta.numero}"
     venta_display.short_description = 'Venta'
@@ -118,6 +131,11 @@ class ItemVentaAdmin(admin.ModelAdmin):
     readonly_fields = ('subtotal',)
     autocomplete_fields = ('venta', 'variante')
     
+    def delete_queryset(self, request, queryset):
+        # Uno por uno: ItemVenta.delete actualiza los totales y cantidades de la venta
+        for item in queryset:
+            item.delete()
+    
     def venta_display(self, obj):
         return f"Venta #{obj.venta.numero}"
     venta_display.short_description = 'Venta'
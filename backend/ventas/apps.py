@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class VentasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ventas'
-    verbose_name = 'Gestión de Ventas'
\ No newline at end of file
+    verbose_name = 'Gestión de Ventas'
+    
+    def ready(self):
+        import ventas.signals
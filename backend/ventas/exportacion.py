@@ -0,0 +1,67 @@
+"""
+Columnas de las exportaciones de ventas, items de venta y devoluciones.
+
+Cada columna lee una clave de values(), así que los datos de cliente, prenda,
+categoría, talla y color salen de los JOIN de la misma consulta, sin consultas por fila.
+"""
+from django.db.models import CharField, Value
+from django.db.models.functions import Concat
+from san_pedrito.exportacion import Columna, opciones
+from .models import Venta, Devolucion
+
+NOMBRE_CLIENTE = Concat('cliente__nombre', Value(' '), 'cliente__apellido', output_field=CharField())
+
+COLUMNAS_VENTAS = [
+    Columna('Número', 'numero'),
+    Columna('Fecha', 'fecha'),
+    Columna('Punto de venta', 'punto_venta'),
+    Columna('Cliente', 'cliente_nombre'),
+    Columna('Documento', 'cliente__numero_documento'),
+    Columna('Estado', 'estado', opciones(Venta.ESTADO_CHOICES)),
+    Columna('Método de pago', 'metodo_pago', opciones(Venta.METODO_PAGO_CHOICES)),
+    Columna('Unidades', 'cantidad_items'),
+    Columna('Items', 'cantidad_lineas'),
+    Columna('Subtotal', 'subtotal'),
+    Columna('Descuento', 'descuento'),
+    Columna('Impuestos', 'impuestos'),
+    Columna('Total', 'total'),
+    Columna('Vendedor', 'vendedor'),
+    Columna('Notas', 'notas'),
+]
+
+COLUMNAS_ITEMS = [
+    Columna('Venta', 'venta__numero'),
+    Columna('Fecha', 'venta__fecha'),
+    Columna('Estado', 'venta__estado', opciones(Venta.ESTADO_CHOICES)),
+    Columna('Código', 'variante__prenda__codigo'),
+    Columna('Prenda', 'variante__prenda__nombre'),
+    Columna('Categoría', 'variante__prenda__categoria__nombre'),
+    Columna('Talla', 'variante__talla__nombre'),
+    Columna('Color', 'variante__color__nombre'),
+    Columna('Código de barras', 'variante__codigo_barras'),
+    Columna('Cantidad', 'cantidad'),
+    Columna('Precio unitario', 'precio_unitario'),
+    Columna('Descuento', 'descuento_item'),
+    Columna('Subtotal', 'subtotal'),
+]
+
+COLUMNAS_DEVOLUCIONES = [
+    Columna('Id', 'id'),
+    Columna('Venta', 'venta__numero'),
+    Columna('Fecha', 'fecha'),
+    Columna('Cliente', 'cliente_nombre'),
+    Columna('Motivo', 'motivo', opciones(Devolucion.MOTIVO_CHOICES)),
+    Columna('Descripción', 'descripcion'),
+    Columna('Monto devuelto', 'monto_devuelto'),
+    Columna('Procesado por', 'procesado_por'),
+]
+
+
+def ventas(queryset):
+    return queryset.select_related(None).prefetch_related(None).annotate(cliente_nombre=NOMBRE_CLIENTE)
+
+
+def devoluciones(queryset):
+    return queryset.select_related(None).prefetch_related(None).annotate(
+        cliente_nombre=Concat('venta__cliente__nombre', Value(' '), 'venta__cliente__apellido', output_field=CharField())
+    )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from ventas.numeracion import crear_serie
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea la numeración (secuencia en PostgreSQL) de los puntos de venta indicados, a partir "
+        "del mayor número que ya tengan. Ejecutarlo al habilitar un punto de venta nuevo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('series', nargs='*', default=[''],
+                            help="Prefijos de los puntos de venta (sin argumentos, la serie general)")
+
+    def handle(self, *args, **options):
+        for serie in options['series']:
+            try:
+                siguiente = crear_serie(serie)
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"{serie or 'General'}: próximo número {siguiente}"))
@@ -0,0 +1,62 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from ventas.models import Venta
+
+DIRECTORIO = 'ventas/qr_codes'
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra los PNG de QR guardados por las ventas anteriores y limpia Venta.qr_code. "
+        "El QR se genera a pedido (/api/ventas/<id>/qr/), así que los archivos ya no se usan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help="Ventas que se actualizan por consulta"
+        )
+        parser.add_argument(
+            '--simular', action='store_true',
+            help="Solo informa lo que se borraría"
+        )
+
+    def handle(self, *args, **options):
+        simular = options['simular']
+        ventas = 0
+        borrados = set()
+
+        # Referencias de las ventas: se borra el archivo y luego se limpia el campo, por lotes
+        pendientes = Venta.objects.exclude(qr_code='').exclude(qr_code=None).order_by('pk')
+        ultimo = None
+        while True:
+            lote = pendientes.filter(pk__gt=ultimo) if ultimo else pendientes
+            filas = list(lote.values_list('pk', 'qr_code')[:options['lote']])
+            if not filas:
+                break
+            ultimo = filas[-1][0]
+            for _, nombre in filas:
+                if default_storage.exists(nombre):
+                    borrados.add(nombre)
+                    if not simular:
+                        default_storage.delete(nombre)
+            ventas += len(filas)
+            if not simular:
+                Venta.objects.filter(pk__in=[pk for pk, _ in filas]).update(qr_code=None)
+
+        # Archivos que ninguna venta referencia (ventas eliminadas)
+        try:
+            _, nombres = default_storage.listdir(DIRECTORIO)
+        except FileNotFoundError:
+            nombres = []
+        for nombre in nombres:
+            nombre = f'{DIRECTORIO}/{nombre}'
+            if nombre not in borrados:
+                borrados.add(nombre)
+                if not simular:
+                    default_storage.delete(nombre)
+
+        prefijo = "Simulación: " if simular else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefijo}Ventas actualizadas: {ventas} | Archivos borrados: {len(borrados)}"
+        ))
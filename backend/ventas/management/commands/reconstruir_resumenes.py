@@ -0,0 +1,33 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from ventas.resumenes import reconstruir
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye los resúmenes diarios de ventas de las estadísticas a partir de las ventas. "
+        "La migración los carga al instalarlos; después los mantiene el worker de eventos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help="Primer día (YYYY-MM-DD); por defecto, el de la primera venta")
+        parser.add_argument('--hasta', help="Último día (YYYY-MM-DD); por defecto, el de la última venta")
+        parser.add_argument(
+            '--dias-por-lote', type=int, default=31,
+            help="Días que se recalculan por transacción"
+        )
+
+    def _fecha(self, valor, opcion):
+        try:
+            return date.fromisoformat(valor)
+        except ValueError:
+            raise CommandError(f"--{opcion} inválido: {valor!r} (formato YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        desde = self._fecha(options['desde'], 'desde') if options['desde'] else None
+        hasta = self._fecha(options['hasta'], 'hasta') if options['hasta'] else None
+        rango = reconstruir(desde, hasta, options['dias_por_lote'])
+        if rango is None:
+            self.stdout.write("No hay ventas para resumir")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Resúmenes reconstruidos del {rango[0]} al {rango[1]}"))
@@ -0,0 +1,8 @@
+from datetime import date
+from eventos.outbox import manejador
+from .resumenes import recalcular_dias
+
+@manejador('venta.modificada')
+def actualizar_resumenes(evento):
+    """Recalcula los resúmenes diarios de los días de la venta modificada"""
+    recalcular_dias(date.fromisoformat(dia) for dia in evento.datos['dias'])
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='venta',
+            name='ventas_vent_fecha_8683f5_idx',
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha', 'id'], name='ventas_vent_fecha_817832_idx'),
+        ),
+    ]
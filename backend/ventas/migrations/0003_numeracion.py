@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:57
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0002_indices_paginacion_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorVenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serie', models.CharField(blank=True, help_text='Prefijo del punto de venta (vacío para la serie general)', max_length=10, unique=True)),
+                ('ultimo', models.PositiveBigIntegerField(default=0, help_text='Último número reservado por algún worker')),
+            ],
+            options={
+                'verbose_name': 'Contador de Ventas',
+                'verbose_name_plural': 'Contadores de Ventas',
+            },
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='punto_venta',
+            field=models.CharField(blank=True, default='', help_text='Prefijo de la numeración del punto de venta (vacío para la serie general)', max_length=10, validators=[django.core.validators.RegexValidator('^[A-Z0-9]*$', 'Solo letras mayúsculas y dígitos')]),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prendas', '0007_sincronizacion'),
+        ('ventas', '0003_numeracion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiarioVenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente de pago'), ('PAGADA', 'Pagada'), ('CANCELADA', 'Cancelada'), ('DEVUELTA', 'Devuelta')], max_length=20)),
+                ('metodo_pago', models.CharField(choices=[('EFECTIVO', 'Efectivo'), ('TARJETA_CREDITO', 'Tarjeta de Crédito'), ('TARJETA_DEBITO', 'Tarjeta de Débito'), ('TRANSFERENCIA', 'Transferencia Bancaria'), ('MERCADO_PAGO', 'Mercado Pago'), ('OTRO', 'Otro')], max_length=20)),
+                ('cantidad', models.PositiveIntegerField(default=0, help_text='Cantidad de ventas')),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Ventas',
+                'verbose_name_plural': 'Resúmenes Diarios de Ventas',
+                'ordering': ['dia', 'estado', 'metodo_pago'],
+                'unique_together': {('dia', 'estado', 'metodo_pago')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenDiarioPrenda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('cantidad', models.PositiveIntegerField(default=0, help_text='Unidades vendidas')),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('prenda', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_ventas', to='prendas.prenda')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario por Prenda',
+                'verbose_name_plural': 'Resúmenes Diarios por Prenda',
+                'ordering': ['dia', 'prenda'],
+                'unique_together': {('dia', 'prenda')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenDiarioCategoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('cantidad', models.PositiveIntegerField(default=0, help_text='Unidades vendidas')),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_ventas', to='prendas.categoria')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario por Categoría',
+                'verbose_name_plural': 'Resúmenes Diarios por Categoría',
+                'ordering': ['dia', 'categoria'],
+                'unique_together': {('dia', 'categoria')},
+            },
+        ),
+    ]
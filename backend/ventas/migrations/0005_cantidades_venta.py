@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:09
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_cantidades_ventas(apps, schema_editor):
+    Venta = apps.get_model('ventas', 'Venta')
+    ItemVenta = apps.get_model('ventas', 'ItemVenta')
+    items = ItemVenta.objects.filter(venta=OuterRef('pk')).order_by().values('venta')
+    Venta.objects.update(
+        cantidad_items=Coalesce(Subquery(items.annotate(total=Sum('cantidad')).values('total')), Value(0)),
+        cantidad_lineas=Coalesce(Subquery(items.annotate(total=Count('id')).values('total')), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0004_resumenes_diarios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='cantidad_items',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Unidades vendidas (suma de las cantidades de los items)'),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='cantidad_lineas',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Cantidad de items (líneas) de la venta'),
+        ),
+        migrations.RunPython(calcular_cantidades_ventas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+from ventas.numeracion import crear_serie
+
+
+def crear_series(apps, schema_editor):
+    """Crea la numeración de la serie general y de los puntos de venta que ya tienen ventas"""
+    Venta = apps.get_model('ventas', 'Venta')
+    ContadorVenta = apps.get_model('ventas', 'ContadorVenta')
+    series = {''} | set(Venta.objects.values_list('punto_venta', flat=True).distinct())
+    for serie in sorted(series):
+        crear_serie(serie, schema_editor.connection, Venta, ContadorVenta)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0005_cantidades_venta'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_series, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+from ventas.resumenes import reconstruir
+
+
+def cargar_resumenes(apps, schema_editor):
+    """Calcula los resúmenes diarios de las ventas anteriores a las tablas de resúmenes"""
+    reconstruir(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0006_series_numeracion'),
+    ]
+
+    operations = [
+        migrations.RunPython(cargar_resumenes, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,12 @@
-from django.db import models
-from django.core.validators import MinValueValidator
+from django.conf import settings
+from django.db import models, transaction
+from django.core.validators import MinValueValidator, RegexValidator
 from django.utils import timezone
 from clientes.models import Cliente
-from prendas.models import VariantePrenda
+from prendas.models import Categoria, Prenda, VariantePrenda
+from prendas.stock import modificar_stock
+from .numeracion import asignar_numero
 import uuid
-import qrcode
-from io import BytesIO
-from django.core.files import File
-from PIL import Image
 
 class Venta(models.Model):
     """Modelo para registrar ventas de prendas"""
@@ -29,16 +28,24 @@ class Venta(models.Model):
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     numero = models.CharField(max_length=20, unique=True, blank=True, null=True, help_text="Número de venta")
+    punto_venta = models.CharField(
+        max_length=10, blank=True, default='',
+        validators=[RegexValidator(r'^[A-Z0-9]*$', "Solo letras mayúsculas y dígitos")],
+        help_text="Prefijo de la numeración del punto de venta (vacío para la serie general)"
+    )
     cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT, related_name='ventas')
     fecha = models.DateTimeField(default=timezone.now)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     descuento = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     impuestos = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     total = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+    cantidad_items = models.PositiveIntegerField(default=0, editable=False, help_text="Unidades vendidas (suma de las cantidades de los items)")
+    cantidad_lineas = models.PositiveIntegerField(default=0, editable=False, help_text="Cantidad de items (líneas) de la venta")
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PENDIENTE')
     metodo_pago = models.CharField(max_length=20, choices=METODO_PAGO_CHOICES, default='EFECTIVO')
     notas = models.TextField(blank=True, null=True)
     vendedor = models.CharField(max_length=100, blank=True, null=True, help_text="Nombre del vendedor")
+    # Ya no se genera: el QR se arma a pedido (ventas.qr). Queda hasta borrar los PNG viejos con purgar_qr_ventas
     qr_code = models.ImageField(upload_to='ventas/qr_codes/', blank=True, null=True)
     creado = models.DateTimeField(auto_now_add=True)
     actualizado = models.DateTimeField(auto_now=True)
@@ -50,7 +57,7 @@ class Venta(models.Model):
         indexes = [
             models.Index(fields=['numero']),
             models.Index(fields=['cliente']),
-            models.Index(fields=['fecha']),
+            models.Index(fields=['fecha', 'id']),
             models.Index(fields=['estado']),
         ]
     
@@ -58,46 +65,41 @@ class Venta(models.Model):
         return f"Venta #{self.numero} - {self.cliente.nombre_completo}"
     
     def save(self, *args, **kwargs):
-        # Generar número de venta si no existe
+        # Asignar el número de la serie del punto de venta (sin leer las ventas existentes)
         if not self.numero:
-            ultimo_numero = Venta.objects.all().order_by('-creado').values_list('numero', flat=True).first()
-            if ultimo_numero and ultimo_numero.isdigit():
-                self.numero = str(int(ultimo_numero) + 1).zfill(8)
-            else:
-                self.numero = '00000001'
+            if not self.punto_venta:
+                self.punto_venta = getattr(settings, 'VENTAS_PUNTO_VENTA', '')
+            self.numero = asignar_numero(self.punto_venta)
         
         # Calcular total si no se ha establecido
         if not self.total:
             self.total = self.subtotal - self.descuento + self.impuestos
         
-        # Generar código QR si no existe
-        if not self.qr_code:
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(f"VENTA:{self.id}|NUMERO:{self.numero}|CLIENTE:{self.cliente.id}|FECHA:{self.fecha}|TOTAL:{self.total}")
-            qr.make(fit=True)
-            
-            img = qr.make_image(fill_color="black", back_color="white")
-            buffer = BytesIO()
-            img.save(buffer, format="PNG")
-            self.qr_code.save(f"venta_{self.numero}_qr.png", File(buffer), save=False)
-        
-        super().save(*args, **kwargs)
+        # Los receptores de post_save publican eventos: que se confirmen junto con la venta
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
-    @property
-    def cantidad_items(self):
-        """Retorna la cantidad total de items en la venta"""
-        return sum(item.cantidad for item in self.items.all())
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
     
     @property
     def esta_pagada(self):
         """Retorna True si la venta está pagada"""
         return self.estado == 'PAGADA'
 
+class ContadorVenta(models.Model):
+    """Último número reservado de cada serie de ventas, en las bases sin secuencias (ver ventas.numeracion)"""
+    serie = models.CharField(max_length=10, unique=True, blank=True, help_text="Prefijo del punto de venta (vacío para la serie general)")
+    ultimo = models.PositiveBigIntegerField(default=0, help_text="Último número reservado por algún worker")
+    
+    class Meta:
+        verbose_name = "Contador de Ventas"
+        verbose_name_plural = "Contadores de Ventas"
+    
+    def __str__(self):
+        return f"{self.serie or 'General'}: {self.ultimo}"
+
 class ItemVenta(models.Model):
     """Modelo para items individuales dentro de una venta"""
     venta = models.ForeignKey(Venta, on_delete=models.CASCADE, related_name='items')
@@ -133,17 +135,21 @@ class ItemVenta(models.Model):
         self.actualizar_totales_venta()
     
     def actualizar_totales_venta(self):
-        """Actualiza los totales de la venta asociada"""
+        """
+        Actualiza los totales de la venta asociada. Solo para ediciones de items sueltos
+        (admin): las ventas nuevas se registran con ventas.registro.registrar_venta.
+        """
         venta = self.venta
-        items = venta.items.all()
-        
-        # Calcular subtotal sumando los subtotales de todos los items
-        subtotal = sum(item.subtotal for item in items)
+        totales = venta.items.aggregate(
+            subtotal=models.Sum('subtotal'), unidades=models.Sum('cantidad'), lineas=models.Count('id')
+        )
         
         # Actualizar venta
-        venta.subtotal = subtotal
-        venta.total = subtotal - venta.descuento + venta.impuestos
-        venta.save()
+        venta.subtotal = totales['subtotal'] or 0
+        venta.total = venta.subtotal - venta.descuento + venta.impuestos
+        venta.cantidad_items = totales['unidades'] or 0
+        venta.cantidad_lineas = totales['lineas']
+        venta.save(update_fields=['subtotal', 'total', 'cantidad_items', 'cantidad_lineas', 'actualizado'])
 
 class Devolucion(models.Model):
     """Modelo para registrar devoluciones de ventas"""
@@ -198,19 +204,69 @@ class ItemDevolucion(models.Model):
         if self.cantidad > self.item_venta.cantidad:
             raise ValueError("La cantidad a devolver no puede exceder la cantidad vendida")
         
-        # Si es un nuevo item, actualizar el stock
+        # Si es un nuevo item, devolver el stock
         if not self.pk:
-            # Devolver stock
-            variante = self.item_venta.variante
-            variante.stock += self.cantidad
-            variante.save()
+            modificar_stock(
+                {self.item_venta.variante_id: self.cantidad},
+                'DEVOLUCION', f"devolucion:{self.devolucion_id}", getattr(self, 'usuario_movimiento', None)
+            )
         
         super().save(*args, **kwargs)
     
     def delete(self, *args, **kwargs):
         # Restar stock al eliminar una devolución
-        variante = self.item_venta.variante
-        variante.stock -= self.cantidad
-        variante.save()
+        modificar_stock(
+            {self.item_venta.variante_id: -self.cantidad},
+            'DEVOLUCION', f"devolucion:{self.devolucion_id}", getattr(self, 'usuario_movimiento', None)
+        )
         
-        super().delete(*args, **kwargs)
\ No newline at end of file
+        super().delete(*args, **kwargs)
+
+class ResumenDiarioVenta(models.Model):
+    """Cantidad y monto de las ventas de un día por estado y método de pago (ver ventas.resumenes)"""
+    dia = models.DateField()
+    estado = models.CharField(max_length=20, choices=Venta.ESTADO_CHOICES)
+    metodo_pago = models.CharField(max_length=20, choices=Venta.METODO_PAGO_CHOICES)
+    cantidad = models.PositiveIntegerField(default=0, help_text="Cantidad de ventas")
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name = "Resumen Diario de Ventas"
+        verbose_name_plural = "Resúmenes Diarios de Ventas"
+        ordering = ['dia', 'estado', 'metodo_pago']
+        unique_together = ('dia', 'estado', 'metodo_pago')
+    
+    def __str__(self):
+        return f"{self.dia} {self.estado} {self.metodo_pago}: {self.cantidad} (${self.monto})"
+
+class ResumenDiarioCategoria(models.Model):
+    """Unidades y monto vendidos por categoría en un día, solo de ventas pagadas"""
+    dia = models.DateField()
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='resumenes_ventas')
+    cantidad = models.PositiveIntegerField(default=0, help_text="Unidades vendidas")
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name = "Resumen Diario por Categoría"
+        verbose_name_plural = "Resúmenes Diarios por Categoría"
+        ordering = ['dia', 'categoria']
+        unique_together = ('dia', 'categoria')
+    
+    def __str__(self):
+        return f"{self.dia} {self.categoria_id}: {self.cantidad} (${self.monto})"
+
+class ResumenDiarioPrenda(models.Model):
+    """Unidades y monto vendidos por prenda en un día, solo de ventas pagadas"""
+    dia = models.DateField()
+    prenda = models.ForeignKey(Prenda, on_delete=models.CASCADE, related_name='resumenes_ventas')
+    cantidad = models.PositiveIntegerField(default=0, help_text="Unidades vendidas")
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name = "Resumen Diario por Prenda"
+        verbose_name_plural = "Resúmenes Diarios por Prenda"
+        ordering = ['dia', 'prenda']
+        unique_together = ('dia', 'prenda')
+    
+    def __str__(self):
+        return f"{self.dia} {self.prenda_id}: {self.cantidad} (${self.monto})"
@@ -0,0 +1,209 @@
+"""
+Numeración de las ventas.
+
+Los números se asignan sin leer las ventas existentes ni bloquear una fila por venta:
+
+- En PostgreSQL cada serie tiene su secuencia (nextval no espera a otras transacciones
+  y no se revierte).
+- En las demás bases (SQLite) cada worker reserva en ContadorVenta un bloque de
+  VENTAS_BLOQUE_NUMEROS números con un UPDATE y los entrega desde memoria; solo vuelve
+  a la base cuando agota el bloque.
+
+Los números no se repiten y crecen dentro de cada worker, pero puede haber huecos (un
+rollback, el resto de un bloque al reiniciar) y con varios workers en SQLite dos ventas
+seguidas pueden tener números de bloques distintos. Cada punto de venta puede tener su
+propia serie con un prefijo: 'LOCAL2' -> 'LOCAL2-00000042'. La serie general no tiene
+prefijo y continúa la numeración anterior.
+
+Las secuencias (y los contadores de las series que ya tienen ventas) se crean fuera de
+las ventas, con crear_serie: la migración 0006 para las series existentes y el comando
+crear_serie_ventas para habilitar un punto de venta nuevo. En PostgreSQL una serie sin
+secuencia se rechaza.
+"""
+import re
+import threading
+import weakref
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, connection as conexion_por_defecto, transaction
+from django.db.models import F
+from django.db.models.functions import Length
+
+DIGITOS = 8
+SERIE_VALIDA = re.compile(r'^[A-Z0-9]{0,10}$')
+
+_estado = threading.local()
+_secuencias = set()
+
+
+class SerieInexistente(ValueError):
+    """La serie no tiene secuencia: hay que crearla con el comando crear_serie_ventas"""
+
+
+def tamanio_bloque():
+    return getattr(settings, 'VENTAS_BLOQUE_NUMEROS', 20)
+
+
+def formatear(serie, numero):
+    return f"{serie}-{numero:0{DIGITOS}d}" if serie else f"{numero:0{DIGITOS}d}"
+
+
+def nombre_secuencia(serie):
+    return f"ventas_numero_{serie.lower()}" if serie else 'ventas_numero'
+
+
+def _numero_inicial(serie, modelo_venta):
+    """Primer número libre de una serie: el siguiente al mayor que ya tenga alguna venta"""
+    prefijo = f"{serie}-" if serie else ''
+    ultimo = (
+        modelo_venta.objects.filter(numero__regex=rf'^{prefijo}[0-9]+$')
+        .order_by(Length('numero').desc(), '-numero')
+        .values_list('numero', flat=True)
+        .first()
+    )
+    return int(ultimo[len(prefijo):]) + 1 if ultimo else 1
+
+
+def crear_serie(serie, conexion=None, modelo_venta=None, modelo_contador=None):
+    """
+    Prepara la numeración de una serie para que siga al mayor número que ya tenga: en
+    PostgreSQL crea su secuencia (o la adelanta con setval), en las demás bases adelanta
+    su ContadorVenta si ya tiene ventas. Es idempotente. Los modelos se reciben para
+    poder usarla desde una migración. Retorna el próximo número de la serie.
+    """
+    if not SERIE_VALIDA.match(serie):
+        raise ValueError(f"Punto de venta inválido: {serie!r} (hasta 10 letras mayúsculas o dígitos)")
+    conexion = conexion or conexion_por_defecto
+    modelo_venta = modelo_venta or apps.get_model('ventas', 'Venta')
+    modelo_contador = modelo_contador or apps.get_model('ventas', 'ContadorVenta')
+    inicial = _numero_inicial(serie, modelo_venta)
+
+    if conexion.vendor == 'postgresql':
+        nombre = nombre_secuencia(serie)
+        with conexion.cursor() as cursor:
+            cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {conexion.ops.quote_name(nombre)}")
+            # Nunca retroceder una secuencia que ya entregó números
+            cursor.execute(
+                "SELECT setval(%s, GREATEST(%s, last_value), %s OR is_called) FROM "
+                + conexion.ops.quote_name(nombre),
+                [nombre, max(inicial - 1, 1), inicial > 1]
+            )
+            cursor.execute(f"SELECT CASE WHEN is_called THEN last_value + 1 ELSE last_value END FROM "
+                           f"{conexion.ops.quote_name(nombre)}")
+            return cursor.fetchone()[0]
+
+    with transaction.atomic(using=conexion.alias):
+        contador = modelo_contador.objects.select_for_update().filter(serie=serie).first()
+        if contador is not None:
+            if contador.ultimo < inicial - 1:
+                contador.ultimo = inicial - 1
+                contador.save(update_fields=['ultimo'])
+            return contador.ultimo + 1
+        if inicial > 1:
+            modelo_contador.objects.create(serie=serie, ultimo=inicial - 1)
+    return inicial
+
+
+def _siguiente_postgresql(conexion, serie):
+    nombre = nombre_secuencia(serie)
+    with conexion.cursor() as cursor:
+        if nombre not in _secuencias:
+            cursor.execute("SELECT 1 FROM pg_class WHERE relkind = 'S' AND relname = %s", [nombre])
+            if cursor.fetchone() is None:
+                raise SerieInexistente(
+                    f"El punto de venta {serie!r} no tiene numeración: crearla con manage.py crear_serie_ventas {serie}"
+                )
+            _secuencias.add(nombre)
+        cursor.execute("SELECT nextval(%s)", [nombre])
+        return cursor.fetchone()[0]
+
+
+def serie_habilitada(serie):
+    """Indica si ya se pueden numerar ventas de la serie (en PostgreSQL, si tiene secuencia)"""
+    conexion = transaction.get_connection()
+    if conexion.vendor != 'postgresql' or nombre_secuencia(serie) in _secuencias:
+        return True
+    with conexion.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_class WHERE relkind = 'S' AND relname = %s", [nombre_secuencia(serie)])
+        return cursor.fetchone() is not None
+
+
+class _Confirmacion:
+    """Callback on_commit de la reserva de un bloque: lo marca confirmado"""
+
+    def __init__(self, bloque):
+        self.bloque = bloque
+
+    def __call__(self):
+        self.bloque.confirmado = True
+
+
+class _Bloque:
+    """Números reservados por este worker: de siguiente a hasta, inclusive"""
+
+    def __init__(self, siguiente, hasta):
+        self.siguiente = siguiente
+        self.hasta = hasta
+        self.confirmado = False
+        self._confirmacion = None
+
+    def esperar_confirmacion(self):
+        """
+        Registra el callback on_commit que confirma la reserva. Solo la lista de callbacks
+        de la transacción lo retiene: si la transacción o el savepoint de la reserva se
+        revierten, Django lo descarta y la referencia débil queda vacía.
+        """
+        confirmacion = _Confirmacion(self)
+        self._confirmacion = weakref.ref(confirmacion)
+        transaction.on_commit(confirmacion)
+
+    def vigente(self):
+        if self.siguiente > self.hasta:
+            return False
+        # Sin confirmar vale mientras la transacción que lo reservó siga abierta; si se
+        # revirtió, el UPDATE de la reserva también se deshizo y otro worker puede
+        # tomar esos números
+        return self.confirmado or (self._confirmacion is not None and self._confirmacion() is not None)
+
+
+def _reservar_bloque(serie, tamanio):
+    from .models import ContadorVenta
+    contador = ContadorVenta.objects.filter(serie=serie)
+    # El UPDATE bloquea la fila hasta el final de la transacción: la lectura ve el valor propio
+    with transaction.atomic():
+        if not contador.update(ultimo=F('ultimo') + tamanio):
+            # Serie sin ventas (crear_serie ya adelantó los contadores de las que tienen)
+            try:
+                with transaction.atomic():
+                    ContadorVenta.objects.create(serie=serie, ultimo=tamanio)
+            except IntegrityError:
+                # Otro worker creó la serie al mismo tiempo
+                contador.update(ultimo=F('ultimo') + tamanio)
+        hasta = contador.values_list('ultimo', flat=True).get()
+    bloque = _Bloque(hasta - tamanio + 1, hasta)
+    bloque.esperar_confirmacion()
+    return bloque
+
+
+def siguiente_numero(serie=''):
+    """Retorna el próximo número (entero) de la serie"""
+    conexion = transaction.get_connection()
+    if conexion.vendor == 'postgresql':
+        return _siguiente_postgresql(conexion, serie)
+
+    bloques = getattr(_estado, 'bloques', None)
+    if bloques is None:
+        bloques = _estado.bloques = {}
+    bloque = bloques.get(serie)
+    if bloque is None or not bloque.vigente():
+        bloque = bloques[serie] = _reservar_bloque(serie, tamanio_bloque())
+    numero = bloque.siguiente
+    bloque.siguiente += 1
+    return numero
+
+
+def asignar_numero(serie=''):
+    """Retorna el número de venta formateado para la serie (prefijo del punto de venta)"""
+    if not SERIE_VALIDA.match(serie):
+        raise ValueError(f"Punto de venta inválido: {serie!r} (hasta 10 letras mayúsculas o dígitos)")
+    return formatear(serie, siguiente_numero(serie))
@@ -0,0 +1,61 @@
+"""
+Códigos QR de los tickets de venta, generados a pedido.
+
+El QR no se guarda: se arma con los campos de la venta (id, número, cliente, fecha y
+total) cada vez que se pide, en SVG o PNG. Como el resultado depende solo de ese
+contenido, la versión (hash del contenido) sirve de clave para una cache LRU de los
+bytes ya generados y de ETag; las URLs que incluyen la versión (?v=) no cambian de
+contenido y se pueden cachear en el navegador sin revalidar.
+"""
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+import qrcode
+import qrcode.image.svg
+
+FORMATOS = {
+    'svg': 'image/svg+xml',
+    'png': 'image/png',
+}
+MAXIMO_CACHE = 512
+
+# Campos de Venta que forman el contenido del QR
+CAMPOS = ('id', 'numero', 'cliente_id', 'fecha', 'total')
+
+
+def contenido(venta):
+    """Texto codificado en el QR de la venta"""
+    # Total con dos decimales: igual recién creada (Decimal('100')) que leída de la base
+    return f"VENTA:{venta.id}|NUMERO:{venta.numero}|CLIENTE:{venta.cliente_id}|FECHA:{venta.fecha}|TOTAL:{venta.total:.2f}"
+
+
+def version(venta):
+    """Hash corto del contenido: cambia solo si cambia alguno de los campos del QR"""
+    return hashlib.sha256(contenido(venta).encode('utf-8')).hexdigest()[:16]
+
+
+@lru_cache(maxsize=MAXIMO_CACHE)
+def renderizar(texto, formato='svg'):
+    """Retorna los bytes del QR del texto en el formato indicado ('svg' o 'png')"""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de QR inválido: {formato!r}")
+    qr = qrcode.QRCode(
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+        image_factory=qrcode.image.svg.SvgPathImage if formato == 'svg' else None,
+    )
+    qr.add_data(texto)
+    qr.make(fit=True)
+    buffer = BytesIO()
+    if formato == 'svg':
+        qr.make_image().save(buffer)
+    else:
+        # En blanco y negro (1 bit por pixel): el PNG queda de pocos KB
+        qr.make_image(fill_color="black", back_color="white").get_image().convert('1').save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def qr_venta(venta, formato='svg'):
+    """Retorna los bytes del QR de la venta, desde la cache si ya se generó"""
+    return renderizar(contenido(venta), formato)
@@ -0,0 +1,56 @@
+"""
+Registro de una venta completa en una sola pasada.
+
+Crear los items uno por uno dispara ItemVenta.save, que recalcula los totales de la
+venta leyendo todos sus items y vuelve a guardarla: con n items son n lecturas de los
+items y n escrituras extra de la venta. Aquí los subtotales se calculan una vez en
+Python, la venta se guarda una sola vez con sus totales y cantidades definitivos y los
+items se insertan con un único bulk_create, así que la cantidad de consultas no
+depende de la cantidad de items.
+
+bulk_create no llama a ItemVenta.save; ItemVenta.actualizar_totales_venta queda para
+las ediciones de items sueltos (admin).
+"""
+from decimal import Decimal
+from django.db import transaction
+from eventos.outbox import publicar
+from prendas.stock import descontar_stock
+from .models import Venta, ItemVenta
+
+
+def subtotal_item(datos):
+    """Subtotal de un item a partir de sus datos (cantidad, precio_unitario, descuento_item)"""
+    return (datos['precio_unitario'] * datos.get('cantidad', 1)) - datos.get('descuento_item', Decimal('0'))
+
+
+@transaction.atomic
+def registrar_venta(datos, items, usuario=None):
+    """
+    Crea la venta con sus items, descuenta el stock y publica 'venta.creada'.
+
+    datos son los campos de la venta y items una lista de diccionarios con variante,
+    cantidad, precio_unitario y descuento_item. Lanza StockInsuficiente si alguna
+    variante no alcanza (la transacción se revierte completa).
+    """
+    items = [dict(item, subtotal=subtotal_item(item)) for item in items]
+    subtotal = sum((item['subtotal'] for item in items), Decimal('0'))
+    venta = Venta(
+        subtotal=subtotal,
+        total=subtotal - datos.get('descuento', 0) + datos.get('impuestos', 0),
+        cantidad_items=sum(item.get('cantidad', 1) for item in items),
+        cantidad_lineas=len(items),
+        **datos
+    )
+
+    # Descontar stock de todas las variantes en un único UPDATE condicional
+    cantidades = {}
+    for item in items:
+        variante_id = item['variante'].pk
+        cantidades[variante_id] = cantidades.get(variante_id, 0) + item.get('cantidad', 1)
+    descontar_stock(cantidades, f"venta:{venta.id}", usuario)
+
+    venta.save()
+    ItemVenta.objects.bulk_create([ItemVenta(venta=venta, **item) for item in items])
+
+    publicar('venta.creada', {'venta': str(venta.id), 'fecha': venta.fecha.isoformat()})
+    return venta
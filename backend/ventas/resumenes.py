@@ -0,0 +1,161 @@
+"""
+Resúmenes diarios de ventas para las estadísticas.
+
+Tres tablas con una fila por día y dimensión: ventas por estado y método de pago,
+unidades y monto por categoría y por prenda (estas dos solo de ventas pagadas, como
+las estadísticas). Las estadísticas de cualquier rango se leen sumando esas filas, sin
+recorrer las ventas ni sus items.
+
+Los resúmenes no se incrementan con sumas y restas: cada cambio de una venta (alta,
+cambio de estado, edición de items, baja) publica 'venta.modificada' con los días
+afectados y el manejador vuelve a calcular esos días completos desde las ventas.
+Recalcular un día es idempotente, así que un evento repetido o procesado fuera de orden
+deja el mismo resultado. Los días son los de la zona horaria del sistema
+(TIME_ZONE), igual que fecha__date.
+
+Los montos devueltos no entran en los resúmenes, como tampoco entraban en las
+estadísticas. Una devolución solo cambia el estado de la venta a DEVUELTA: ese cambio
+publica 'venta.modificada' y la venta pasa a contarse como devuelta (y deja de sumar
+por categoría y prenda). 'devolucion.creada' no tiene manejador aquí y recalcular no
+lee Devolucion.
+
+La migración 0007 carga los resúmenes de las ventas existentes con reconstruir; el
+comando reconstruir_resumenes hace lo mismo a pedido.
+"""
+from datetime import datetime, time, timedelta
+from django.apps import apps as apps_globales
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import ResumenDiarioVenta, ResumenDiarioCategoria, ResumenDiarioPrenda
+
+
+def dia_de(fecha):
+    """Día (en la zona horaria del sistema) de una fecha de venta"""
+    return timezone.localtime(fecha).date() if timezone.is_aware(fecha) else fecha.date()
+
+
+def _inicio(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+@transaction.atomic
+def recalcular(desde, hasta, apps=apps_globales):
+    """
+    Vuelve a calcular los resúmenes de los días desde..hasta (inclusive). apps permite
+    usarla con los modelos históricos de una migración.
+    """
+    Venta, ItemVenta = apps.get_model('ventas', 'Venta'), apps.get_model('ventas', 'ItemVenta')
+    ResumenDiarioVenta = apps.get_model('ventas', 'ResumenDiarioVenta')
+    ResumenDiarioCategoria = apps.get_model('ventas', 'ResumenDiarioCategoria')
+    ResumenDiarioPrenda = apps.get_model('ventas', 'ResumenDiarioPrenda')
+    # Rango sobre fecha (usa el índice) en lugar de fecha__date
+    rango = {'fecha__gte': _inicio(desde), 'fecha__lt': _inicio(hasta + timedelta(days=1))}
+    ventas = (
+        Venta.objects.filter(**rango).order_by()
+        .values('estado', 'metodo_pago', dia=TruncDate('fecha'))
+        .annotate(cantidad=Count('id'), monto=Sum('total'))
+    )
+    rango_items = {f'venta__{campo}': valor for campo, valor in rango.items()}
+    items = (
+        ItemVenta.objects.filter(venta__estado='PAGADA', **rango_items).order_by()
+        .values(
+            dia=TruncDate('venta__fecha'),
+            prenda=F('variante__prenda_id'),
+            categoria=F('variante__prenda__categoria_id'),
+        )
+        .annotate(cantidad=Sum('cantidad'), monto=Sum('subtotal'))
+    )
+
+    por_categoria = {}
+    por_prenda = []
+    for fila in items:
+        por_prenda.append(ResumenDiarioPrenda(
+            dia=fila['dia'], prenda_id=fila['prenda'], cantidad=fila['cantidad'], monto=fila['monto']
+        ))
+        resumen = por_categoria.get((fila['dia'], fila['categoria']))
+        if resumen is None:
+            resumen = por_categoria[(fila['dia'], fila['categoria'])] = ResumenDiarioCategoria(
+                dia=fila['dia'], categoria_id=fila['categoria']
+            )
+        resumen.cantidad += fila['cantidad']
+        resumen.monto += fila['monto']
+
+    for modelo in (ResumenDiarioVenta, ResumenDiarioCategoria, ResumenDiarioPrenda):
+        modelo.objects.filter(dia__gte=desde, dia__lte=hasta).delete()
+    ResumenDiarioVenta.objects.bulk_create([ResumenDiarioVenta(**fila) for fila in ventas])
+    ResumenDiarioCategoria.objects.bulk_create(por_categoria.values())
+    ResumenDiarioPrenda.objects.bulk_create(por_prenda)
+
+
+def reconstruir(desde=None, hasta=None, dias_por_lote=31, apps=apps_globales):
+    """
+    Recalcula los resúmenes de desde..hasta (por defecto, de la primera a la última venta)
+    en transacciones de dias_por_lote días. Retorna (desde, hasta), o None si no hay ventas.
+    """
+    extremos = apps.get_model('ventas', 'Venta').objects.aggregate(primera=Min('fecha'), ultima=Max('fecha'))
+    if extremos['primera'] is not None:
+        desde = desde or dia_de(extremos['primera'])
+        hasta = hasta or dia_de(extremos['ultima'])
+    if desde is None or hasta is None:
+        return None
+
+    lote = timedelta(days=max(dias_por_lote, 1))
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(inicio + lote - timedelta(days=1), hasta)
+        recalcular(inicio, fin, apps)
+        inicio = fin + timedelta(days=1)
+    return desde, hasta
+
+
+def recalcular_dias(dias):
+    """Recalcula cada uno de los días indicados"""
+    for dia in sorted(set(dias)):
+        recalcular(dia, dia)
+
+
+def estadisticas(fecha_inicio, fecha_fin):
+    """Estadísticas de las ventas pagadas entre las dos fechas (inclusive), desde los resúmenes"""
+    pagadas = ResumenDiarioVenta.objects.filter(dia__gte=fecha_inicio, dia__lte=fecha_fin, estado='PAGADA')
+    totales = pagadas.aggregate(cantidad=Sum('cantidad'), monto=Sum('monto'))
+    total_ventas = totales['cantidad'] or 0
+    monto_total = totales['monto'] or 0
+
+    ventas_por_categoria = [
+        {'categoria': fila['categoria__nombre'], 'cantidad': fila['cantidad'], 'monto': fila['monto']}
+        for fila in ResumenDiarioCategoria.objects.filter(dia__gte=fecha_inicio, dia__lte=fecha_fin)
+        .values('categoria__nombre')
+        .annotate(cantidad=Sum('cantidad'), monto=Sum('monto'))
+        .order_by('-monto')
+    ]
+    productos_mas_vendidos = [
+        {
+            'variante__prenda__id': fila['prenda'],
+            'variante__prenda__nombre': fila['prenda__nombre'],
+            'variante__prenda__codigo': fila['prenda__codigo'],
+            'cantidad': fila['cantidad'],
+            'monto': fila['monto'],
+        }
+        for fila in ResumenDiarioPrenda.objects.filter(dia__gte=fecha_inicio, dia__lte=fecha_fin)
+        .values('prenda', 'prenda__nombre', 'prenda__codigo')
+        .annotate(cantidad=Sum('cantidad'), monto=Sum('monto'))
+        .order_by('-cantidad', 'prenda')[:10]
+    ]
+    ventas_por_dia = (
+        pagadas.values('dia')
+        .annotate(cantidad=Sum('cantidad'), monto=Sum('monto'))
+        .order_by('dia')
+    )
+
+    return {
+        'resumen': {
+            'total_ventas': total_ventas,
+            'monto_total': monto_total,
+            'ticket_promedio': monto_total / total_ventas if total_ventas > 0 else 0,
+        },
+        'ventas_por_categoria': ventas_por_categoria,
+        'productos_mas_vendidos': productos_mas_vendidos,
+        'ventas_por_dia': list(ventas_por_dia),
+    }
@@ -1,12 +1,21 @@
+from django.db.models import CharField, Value
+from django.db.models.functions import Concat
 from rest_framework import serializers
+from san_pedrito.campos import CamposDinamicosMixin
+from django.conf import settings
 from django.db import transaction
+from django.urls import reverse
+from . import numeracion, qr
 from .models import Venta, ItemVenta, Devolucion, ItemDevolucion
+from .registro import registrar_venta
 from clientes.models import Cliente
 from clientes.serializers import ClienteListSerializer
+from eventos.outbox import publicar
 from prendas.models import VariantePrenda
+from prendas.stock import StockInsuficiente
 from prendas.serializers import VariantePrendaSerializer
 
-class ItemVentaSerializer(serializers.ModelSerializer):
+class ItemVentaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializador para items de venta con información básica"""
     variante_nombre = serializers.ReadOnlyField(source='variante.prenda.nombre')
     variante_talla = serializers.ReadOnlyField(source='variante.talla.nombre')
@@ -17,36 +26,46 @@ class ItemVentaSerializer(serializers.ModelSerializer):
         fields = ['id', 'variante', 'variante_nombre', 'variante_talla', 'variante_color',
                   'cantidad', 'precio_unitario', 'descuento_item', 'subtotal']
         read_only_fields = ['id', 'subtotal', 'variante_nombre', 'variante_talla', 'variante_color']
+        expandibles = {'variante': VariantePrendaSerializer}
 
 class ItemVentaDetalleSerializer(ItemVentaSerializer):
     """Serializador para detalles completos de items de venta"""
     variante = VariantePrendaSerializer(read_only=True)
 
-class VentaListSerializer(serializers.ModelSerializer):
+class VentaListSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializador para listar ventas con información básica"""
     cliente_nombre = serializers.ReadOnlyField(source='cliente.nombre_completo')
-    cantidad_items = serializers.ReadOnlyField()
     
     class Meta:
         model = Venta
         fields = ['id', 'numero', 'cliente', 'cliente_nombre', 'fecha', 
-                  'total', 'estado', 'metodo_pago', 'cantidad_items']
-        read_only_fields = ['id', 'numero', 'cantidad_items']
+                  'total', 'estado', 'metodo_pago', 'cantidad_items', 'cantidad_lineas']
+        read_only_fields = ['id', 'numero', 'cantidad_items', 'cantidad_lineas']
+        expandibles = {'cliente': ClienteListSerializer}
+        anotaciones = {
+            'cliente_nombre': Concat('cliente__nombre', Value(' '), 'cliente__apellido', output_field=CharField()),
+        }
 
-class VentaDetalleSerializer(serializers.ModelSerializer):
+class VentaDetalleSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializador para ver detalles completos de una venta"""
     cliente = ClienteListSerializer(read_only=True)
     items = ItemVentaDetalleSerializer(many=True, read_only=True)
-    cantidad_items = serializers.ReadOnlyField()
+    qr_code = serializers.SerializerMethodField()
     
     class Meta:
         model = Venta
-        fields = ['id', 'numero', 'cliente', 'fecha', 'subtotal', 'descuento', 
+        fields = ['id', 'numero', 'punto_venta', 'cliente', 'fecha', 'subtotal', 'descuento', 
                   'impuestos', 'total', 'estado', 'metodo_pago', 'notas', 
-                  'vendedor', 'qr_code', 'cantidad_items', 'items', 
+                  'vendedor', 'qr_code', 'cantidad_items', 'cantidad_lineas', 'items', 
                   'creado', 'actualizado']
-        read_only_fields = ['id', 'numero', 'subtotal', 'total', 'cantidad_items', 
-                           'qr_code', 'creado', 'actualizado']
+        read_only_fields = ['id', 'numero', 'punto_venta', 'subtotal', 'total', 'cantidad_items', 
+                           'cantidad_lineas', 'qr_code', 'creado', 'actualizado']
+    
+    def get_qr_code(self, obj):
+        """URL versionada del QR del ticket (cacheable mientras no cambie el contenido)"""
+        url = f"{reverse('venta-qr', args=[obj.pk])}?v={qr.version(obj)}"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
 
 class ItemVentaCreateSerializer(serializers.ModelSerializer):
     """Serializador para crear items de venta"""
@@ -55,21 +74,21 @@ class ItemVentaCreateSerializer(serializers.ModelSerializer):
         fields = ['variante', 'cantidad', 'precio_unitario', 'descuento_item']
     
     def validate_variante(self, value):
-        """Validar que la variante exista y tenga stock suficiente"""
+        """Validar que la variante esté activa"""
         if not value.activo:
             raise serializers.ValidationError("La variante seleccionada no está activa")
-        
-        cantidad = self.initial_data.get('cantidad', 1)
-        try:
-            cantidad = int(cantidad)
-        except (ValueError, TypeError):
-            raise serializers.ValidationError("La cantidad debe ser un número entero")
-        
-        if value.stock < cantidad:
-            raise serializers.ValidationError(f"Stock insuficiente. Disponible: {value.stock}")
-        
         return value
     
+    def validate(self, data):
+        """
+        Verificación temprana de stock con la variante ya cargada. La verificación
+        definitiva la hace el UPDATE condicional de VentaCreateSerializer.create.
+        """
+        variante = data['variante']
+        if variante.stock < data.get('cantidad', 1):
+            raise serializers.ValidationError({'variante': f"Stock insuficiente. Disponible: {variante.stock}"})
+        return data
+    
     def validate_cantidad(self, value):
         """Validar que la cantidad sea positiva"""
         if value <= 0:
@@ -88,7 +107,7 @@ class VentaCreateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Venta
-        fields = ['cliente', 'fecha', 'descuento', 'impuestos', 'estado', 
+        fields = ['cliente', 'punto_venta', 'fecha', 'descuento', 'impuestos', 'estado', 
                   'metodo_pago', 'notas', 'vendedor', 'items']
     
     def validate_cliente(self, value):
@@ -103,42 +122,22 @@ class VentaCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Debe incluir al menos un item en la venta")
         return value
     
-    @transaction.atomic
+    def validate(self, data):
+        """Validar que la serie del punto de venta tenga numeración"""
+        serie = data.get('punto_venta') or getattr(settings, 'VENTAS_PUNTO_VENTA', '')
+        if not numeracion.serie_habilitada(serie):
+            raise serializers.ValidationError({
+                'punto_venta': "El punto de venta no tiene numeración (crearla con manage.py crear_serie_ventas)"
+            })
+        return data
+    
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        
-        # Calcular subtotal inicial
-        subtotal = 0
-        for item_data in items_data:
-            cantidad = item_data.get('cantidad', 1)
-            precio = item_data.get('precio_unitario', 0)
-            descuento = item_data.get('descuento_item', 0)
-            subtotal += (cantidad * precio) - descuento
-        
-        # Crear venta
-        venta = Venta.objects.create(
-            subtotal=subtotal,
-            total=subtotal - validated_data.get('descuento', 0) + validated_data.get('impuestos', 0),
-            **validated_data
-        )
-        
-        # Crear items y actualizar stock
-        for item_data in items_data:
-            variante = item_data['variante']
-            cantidad = item_data['cantidad']
-            
-            # Actualizar stock
-            variante.stock -= cantidad
-            variante.save()
-            
-            # Crear item
-            ItemVenta.objects.create(
-                venta=venta,
-                subtotal=(item_data['precio_unitario'] * cantidad) - item_data.get('descuento_item', 0),
-                **item_data
-            )
-        
-        return venta
+        request = self.context.get('request')
+        try:
+            return registrar_venta(validated_data, items_data, getattr(request, 'user', None))
+        except StockInsuficiente as e:
+            raise serializers.ValidationError({'items': e.mensajes()})
 
 class VentaUpdateSerializer(serializers.ModelSerializer):
     """Serializador para actualizar ventas"""
@@ -153,7 +152,7 @@ class VentaUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("No se puede cambiar el estado de una venta devuelta")
         return value
 
-class ItemDevolucionSerializer(serializers.ModelSerializer):
+class ItemDevolucionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializador para items de devolución"""
     item_venta_detalle = ItemVentaSerializer(source='item_venta', read_only=True)
     
@@ -162,7 +161,7 @@ class ItemDevolucionSerializer(serializers.ModelSerializer):
         fields = ['id', 'item_venta', 'item_venta_detalle', 'cantidad', 'monto']
         read_only_fields = ['id', 'item_venta_detalle']
 
-class DevolucionSerializer(serializers.ModelSerializer):
+class DevolucionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializador para ver devoluciones"""
     items = ItemDevolucionSerializer(many=True, read_only=True)
     venta_numero = serializers.ReadOnlyField(source='venta.numero')
@@ -173,6 +172,7 @@ class DevolucionSerializer(serializers.ModelSerializer):
         fields = ['id', 'venta', 'venta_numero', 'fecha', 'motivo', 'motivo_display', 
                   'descripcion', 'monto_devuelto', 'procesado_por', 'items']
         read_only_fields = ['id', 'venta_numero', 'motivo_display']
+        expandibles = {'venta': VentaListSerializer}
 
 class ItemDevolucionCreateSerializer(serializers.ModelSerializer):
     """Serializador para crear items de devolución"""
@@ -243,6 +243,7 @@ class DevolucionCreateSerializer(serializers.ModelSerializer):
         
         # Crear devolución
         devolucion = Devolucion.objects.create(**validated_data)
+        request = self.context.get('request')
         
         # Crear items y actualizar stock
         for item_data in items_data:
@@ -250,9 +251,11 @@ class DevolucionCreateSerializer(serializers.ModelSerializer):
             cantidad = item_data['cantidad']
             
             # Crear item de devolución
-            ItemDevolucion.objects.create(
-                devolucion=devolucion,
-                **item_data
-            )
+            item = ItemDevolucion(devolucion=devolucion, **item_data)
+            item.usuario_movimiento = getattr(request, 'user', None)
+            item.save()
         
+        publicar('devolucion.creada', {
+            'devolucion': devolucion.id, 'venta': str(venta.id), 'fecha': devolucion.fecha.isoformat()
+        })
         return devolucion
\ No newline at end of file
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from eventos.outbox import publicar
+from .models import Venta
+from .resumenes import dia_de
+
+@receiver(post_init, sender=Venta)
+def recordar_fecha(sender, instance, **kwargs):
+    """Guarda la fecha con la que se cargó la venta: si se edita, cambian dos días de los resúmenes."""
+    instance._fecha_original = instance.__dict__.get('fecha')
+
+@receiver(post_save, sender=Venta)
+@receiver(post_delete, sender=Venta)
+def publicar_modificacion(sender, instance, **kwargs):
+    """Publica los días de la venta para que el worker recalcule sus resúmenes diarios."""
+    fechas = {instance._fecha_original, instance.fecha} - {None}
+    publicar('venta.modificada', {
+        'venta': str(instance.pk),
+        'dias': sorted({dia_de(fecha).isoformat() for fecha in fechas}),
+    })
+    instance._fecha_original = instance.fecha
@@ -0,0 +1,599 @@
+import csv
+import random
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest.mock import patch
+from xml.etree import ElementTree
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from clientes.models import Cliente
+from eventos.outbox import procesar_pendientes
+from prendas.models import Categoria, Talla, Color, Prenda, VariantePrenda
+from .models import Venta, ItemVenta, Devolucion, ContadorVenta, ResumenDiarioVenta, ResumenDiarioCategoria, ResumenDiarioPrenda
+from .registro import registrar_venta
+from . import numeracion, qr, tickets
+
+Usuario = get_user_model()
+
+class NumeracionVentasTests(TestCase):
+    """Pruebas para la asignación de números de venta"""
+
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nombre='Ana', apellido='Pérez')
+
+    def vender(self, **datos):
+        return Venta.objects.create(cliente=self.cliente, subtotal=Decimal('100'), total=Decimal('100'), **datos)
+
+    def test_numeros_consecutivos_por_serie(self):
+        """Prueba que cada punto de venta tiene su serie y la general continúa la numeración anterior"""
+        self.vender(numero='00000041')
+        self.assertEqual(numeracion.crear_serie(''), 42)  # Lo que hace la migración con las ventas existentes
+        self.assertEqual([self.vender().numero for _ in range(3)], ['00000042', '00000043', '00000044'])
+        self.assertEqual(self.vender(punto_venta='LOCAL2').numero, 'LOCAL2-00000001')
+        self.assertEqual(self.vender(punto_venta='LOCAL2').numero, 'LOCAL2-00000002')
+        with override_settings(VENTAS_PUNTO_VENTA='CENTRO'):
+            venta = self.vender()
+        self.assertEqual((venta.punto_venta, venta.numero), ('CENTRO', 'CENTRO-00000001'))
+
+    @override_settings(VENTAS_BLOQUE_NUMEROS=5)
+    def test_reserva_por_bloques(self):
+        """Prueba que solo se consulta la base al agotar el bloque reservado"""
+        self.vender()
+        with CaptureQueriesContext(connection) as consultas:
+            for _ in range(4):
+                self.vender()
+        self.assertFalse([c for c in consultas if 'contadorventa' in c['sql']])
+        self.assertFalse([c for c in consultas if c['sql'].startswith('SELECT') and 'ventas_venta' in c['sql']])
+        self.vender()
+        self.assertEqual(ContadorVenta.objects.get(serie='').ultimo, 10)
+
+    def test_bloque_revertido_no_se_reutiliza(self):
+        """Prueba que si se revierte la transacción que reservó el bloque se reserva de nuevo"""
+        try:
+            with transaction.atomic():
+                self.vender()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(ContadorVenta.objects.exists())
+        self.assertEqual(self.vender().numero, '00000001')
+        self.assertEqual(ContadorVenta.objects.get().ultimo, numeracion.tamanio_bloque())
+
+    def test_punto_de_venta_invalido(self):
+        """Prueba que se rechaza un prefijo que no es de letras mayúsculas y dígitos"""
+        with self.assertRaises(ValueError):
+            self.vender(punto_venta='local 2')
+
+class NumeracionConcurrenteTests(TransactionTestCase):
+    """Pruebas de la numeración con ventas creadas en paralelo"""
+
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nombre='Ana', apellido='Pérez')
+
+    def test_ventas_en_paralelo_sin_colisiones(self):
+        """Prueba que miles de ventas simultáneas desde varios workers no repiten números"""
+        workers, ventas_por_worker = 8, 250
+        errores = []
+
+        def crear():
+            Venta.objects.create(cliente=self.cliente, subtotal=Decimal('100'), total=Decimal('100'))
+
+        def vender(en_transaccion):
+            try:
+                for _ in range(ventas_por_worker):
+                    while True:
+                        try:
+                            if en_transaccion:
+                                with transaction.atomic():
+                                    crear()
+                            else:
+                                crear()
+                            break
+                        except OperationalError as e:
+                            # La base de pruebas en memoria no espera al otro escritor como
+                            # una base en archivo: reintentar (también prueba el descarte
+                            # de bloques reservados en transacciones revertidas)
+                            if 'locked' not in str(e):
+                                raise
+                            time.sleep(random.uniform(0.001, 0.01))
+            except Exception as e:
+                errores.append(e)
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=vender, args=(i % 2 == 0,)) for i in range(workers)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        numeros = list(Venta.objects.values_list('numero', flat=True))
+        self.assertEqual(len(numeros), workers * ventas_por_worker)
+        self.assertEqual(len(set(numeros)), len(numeros))
+
+class QrVentaTests(APITestCase):
+    """Pruebas para el QR de los tickets generado a pedido"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        configuracion = override_settings(MEDIA_ROOT=self.media)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        usuario = Usuario.objects.create_user(
+            email='test@example.com', password='testpassword', nombre='Test', apellido='User'
+        )
+        self.client.force_authenticate(user=usuario)
+        self.cliente = Cliente.objects.create(nombre='Ana', apellido='Pérez')
+        self.venta = Venta.objects.create(cliente=self.cliente, subtotal=Decimal('100'), total=Decimal('100'))
+        self.url = reverse('venta-qr', args=[self.venta.pk])
+
+    def test_guardar_no_genera_archivo(self):
+        """Prueba que crear una venta no genera ni guarda la imagen del QR"""
+        self.assertFalse(self.venta.qr_code)
+        self.assertFalse(default_storage.exists('ventas/qr_codes'))
+
+    def test_qr_svg_y_png(self):
+        """Prueba que el QR se genera en SVG por defecto o en PNG, y se rechazan otros formatos"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn(b'<svg', response.content)
+
+        response = self.client.get(self.url, {'formato': 'png'})
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(response.content.startswith(b'\x89PNG'))
+
+        response = self.client.get(self.url, {'formato': 'gif'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cache_y_version(self):
+        """Prueba la URL versionada del detalle, el ETag y que la versión cambia con el contenido"""
+        detalle = self.client.get(reverse('venta-detail', args=[self.venta.pk])).data
+        self.assertTrue(detalle['qr_code'].endswith(f"{self.url}?v={qr.version(self.venta)}"))
+
+        response = self.client.get(detalle['qr_code'])
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('no-cache', self.client.get(self.url)['Cache-Control'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        anterior = qr.version(self.venta)
+        Venta.objects.filter(pk=self.venta.pk).update(total=Decimal('80'))
+        self.venta.refresh_from_db()
+        self.assertNotEqual(qr.version(self.venta), anterior)
+
+    def test_purgar_qr_guardados(self):
+        """Prueba que el comando borra los PNG de las ventas anteriores y los huérfanos"""
+        nombre = default_storage.save('ventas/qr_codes/venta_1_qr.png', ContentFile(b'png'))
+        huerfano = default_storage.save('ventas/qr_codes/venta_2_qr.png', ContentFile(b'png'))
+        Venta.objects.filter(pk=self.venta.pk).update(qr_code=nombre)
+
+        salida = StringIO()
+        call_command('purgar_qr_ventas', '--simular', stdout=salida)
+        self.assertIn('Archivos borrados: 2', salida.getvalue())
+        self.assertTrue(default_storage.exists(nombre))
+
+        call_command('purgar_qr_ventas', stdout=StringIO())
+        self.assertFalse(default_storage.exists(nombre))
+        self.assertFalse(default_storage.exists(huerfano))
+        self.venta.refresh_from_db()
+        self.assertFalse(self.venta.qr_code)
+
+class RegistroVentaTests(APITestCase):
+    """Pruebas para la creación de ventas con todos sus items en una pasada"""
+
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            email='test@example.com', password='testpassword', nombre='Test', apellido='User'
+        )
+        self.client.force_authenticate(user=usuario)
+        self.cliente = Cliente.objects.create(nombre='Ana', apellido='Pérez')
+        categoria = Categoria.objects.create(nombre='Remeras')
+        color = Color.objects.create(nombre='Rojo', codigo_hex='#FF0000')
+        prenda = Prenda.objects.create(
+            nombre='Remera', categoria=categoria, precio_costo=Decimal('1000'), precio_venta=Decimal('2000')
+        )
+        self.variantes = [
+            VariantePrenda.objects.create(
+                prenda=prenda, talla=Talla.objects.create(nombre=f'{i} años', orden=i), color=color, stock=5
+            )
+            for i in range(10)
+        ]
+
+    def vender(self, cantidad_items):
+        items = [
+            {'variante': variante.pk, 'cantidad': 2, 'precio_unitario': '2000.00', 'descuento_item': '100.00'}
+            for variante in self.variantes[:cantidad_items]
+        ]
+        return self.client.post(
+            reverse('venta-list'),
+            {'cliente': str(self.cliente.pk), 'descuento': '500.00', 'impuestos': '0.00', 'items': items},
+            format='json'
+        )
+
+    def test_totales_y_stock(self):
+        """Prueba que los subtotales, los totales y el stock quedan bien con una sola escritura de la venta"""
+        response = self.vender(3)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        venta = Venta.objects.get()
+        self.assertEqual(venta.subtotal, Decimal('11700'))
+        self.assertEqual(venta.total, Decimal('11200'))
+        self.assertEqual((venta.cantidad_items, venta.cantidad_lineas), (6, 3))
+        self.assertEqual(
+            list(venta.items.values_list('subtotal', flat=True)), [Decimal('3900')] * 3
+        )
+        self.assertEqual(
+            list(VariantePrenda.objects.filter(pk__in=[v.pk for v in self.variantes[:3]]).values_list('stock', flat=True)),
+            [3, 3, 3]
+        )
+
+    def test_consultas_independientes_de_los_items(self):
+        """Prueba que una venta de 10 items hace las mismas consultas que una de 2"""
+        numeracion.asignar_numero()  # Reserva el bloque de números
+        with CaptureQueriesContext(connection) as pocos:
+            self.vender(2)
+        with CaptureQueriesContext(connection) as muchos:
+            self.vender(10)
+        # Fuera de la validación del serializer, que busca cada variante por id
+        registro = lambda consultas: [c for c in consultas if not c['sql'].endswith('LIMIT 21')]
+        self.assertEqual(len(registro(muchos)), len(registro(pocos)))
+        self.assertEqual(len([c for c in muchos if c['sql'].startswith('UPDATE "ventas_venta"')]), 0)
+
+    def test_stock_insuficiente_revierte_todo(self):
+        """Prueba que si una variante no alcanza no se crea la venta ni se descuenta stock"""
+        VariantePrenda.objects.filter(pk=self.variantes[1].pk).update(stock=1)
+        response = self.vender(2)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('items', response.data)
+        self.assertFalse(Venta.objects.exists())
+        self.assertEqual(VariantePrenda.objects.get(pk=self.variantes[0].pk).stock, 5)
+
+    def test_edicion_de_item_recalcula_totales(self):
+        """Prueba que editar un item suelto (admin) sigue recalculando los totales de la venta"""
+        self.vender(2)
+        item = ItemVenta.objects.first()
+        item.subtotal = Decimal('1000')
+        item.cantidad = 1
+        item.save()
+        venta = Venta.objects.get()
+        self.assertEqual((venta.subtotal, venta.total), (Decimal('4900'), Decimal('4400')))
+        self.assertEqual((venta.cantidad_items, venta.cantidad_lineas), (3, 2))
+
+        ItemVenta.objects.last().delete()
+        venta.refresh_from_db()
+        self.assertEqual((venta.cantidad_items, venta.cantidad_lineas), (1, 1))
+
+    def test_listado_con_consultas_fijas(self):
+        """Prueba que el listado hace las mismas consultas con cualquier cantidad de ventas"""
+        def consultas(parametros):
+            with CaptureQueriesContext(connection) as capturadas:
+                response = self.client.get(reverse('venta-list'), parametros)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(capturadas), response.data['results']
+
+        self.vender(2)
+        cantidad, resultados = consultas({})
+        seleccion, _ = consultas({'fields': 'numero,cliente_nombre,cantidad_items,cantidad_lineas'})
+        for _ in range(4):
+            self.vender(1)
+        self.assertEqual(consultas({})[0], cantidad)
+        self.assertEqual(consultas({'fields': 'numero,cliente_nombre,cantidad_items,cantidad_lineas'})[0], seleccion)
+        self.assertEqual(
+            (resultados[0]['cliente_nombre'], resultados[0]['cantidad_items'], resultados[0]['cantidad_lineas']),
+            ('Ana Pérez', 4, 2)
+        )
+
+class ResumenesDiariosTests(APITestCase):
+    """Pruebas para las estadísticas servidas desde los resúmenes diarios"""
+
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            email='test@example.com', password='testpassword', nombre='Test', apellido='User'
+        )
+        self.client.force_authenticate(user=usuario)
+        self.cliente = Cliente.objects.create(nombre='Ana', apellido='Pérez')
+        talla = Talla.objects.create(nombre='2 años', orden=1)
+        color = Color.objects.create(nombre='Rojo', codigo_hex='#FF0000')
+        self.variantes = {}
+        for nombre in ('Remeras', 'Buzos'):
+            prenda = Prenda.objects.create(
+                nombre=nombre[:-1], categoria=Categoria.objects.create(nombre=nombre),
+                precio_costo=Decimal('1000'), precio_venta=Decimal('2000')
+            )
+            self.variantes[nombre] = VariantePrenda.objects.create(prenda=prenda, talla=talla, color=color, stock=50)
+
+    def vender(self, dia, estado='PAGADA', **cantidades):
+        fecha = timezone.make_aware(datetime(2024, 3, dia, 23, 30))
+        items = [
+            {'variante': self.variantes[nombre], 'cantidad': cantidad, 'precio_unitario': Decimal('1000')}
+            for nombre, cantidad in cantidades.items()
+        ]
+        return registrar_venta({'cliente': self.cliente, 'fecha': fecha, 'estado': estado}, items)
+
+    def estadisticas(self):
+        response = self.client.get(
+            reverse('venta-estadisticas'), {'fecha_inicio': '2024-03-01', 'fecha_fin': '2024-03-31'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_estadisticas_desde_resumenes(self):
+        """Prueba que las estadísticas suman los resúmenes de las ventas pagadas del rango"""
+        self.vender(1, Remeras=2, Buzos=1)
+        self.vender(1, Remeras=1)
+        self.vender(2, Buzos=3)
+        self.vender(2, 'PENDIENTE', Buzos=5)
+        procesar_pendientes()
+
+        with CaptureQueriesContext(connection) as consultas:
+            datos = self.estadisticas()
+        self.assertFalse([c for c in consultas if 'ventas_venta' in c['sql'] or 'ventas_itemventa' in c['sql']])
+
+        self.assertEqual(datos['resumen']['total_ventas'], 3)
+        self.assertEqual(datos['resumen']['monto_total'], Decimal('7000'))
+        self.assertEqual(
+            [(d['categoria'], d['cantidad'], d['monto']) for d in datos['ventas_por_categoria']],
+            [('Buzos', 4, Decimal('4000')), ('Remeras', 3, Decimal('3000'))]
+        )
+        self.assertEqual(datos['productos_mas_vendidos'][0]['variante__prenda__nombre'], 'Buzo')
+        # 23:30 hora local es el día siguiente en UTC: los días son los de TIME_ZONE
+        self.assertEqual(
+            [(str(d['dia']), d['cantidad']) for d in datos['ventas_por_dia']],
+            [('2024-03-01', 2), ('2024-03-02', 1)]
+        )
+        self.assertEqual(ResumenDiarioVenta.objects.get(estado='PENDIENTE').monto, Decimal('5000'))
+
+    def test_cambios_de_estado_y_fecha(self):
+        """Prueba que cancelar o mover una venta de día recalcula los días afectados"""
+        venta = self.vender(1, Remeras=2)
+        otra = self.vender(1, Buzos=1)
+        procesar_pendientes()
+
+        venta.estado = 'CANCELADA'
+        venta.save()
+        otra = Venta.objects.get(pk=otra.pk)
+        otra.fecha += timedelta(days=3)
+        otra.save()
+        procesar_pendientes()
+
+        datos = self.estadisticas()
+        self.assertEqual(datos['resumen']['total_ventas'], 1)
+        self.assertEqual([str(d['dia']) for d in datos['ventas_por_dia']], ['2024-03-04'])
+        self.assertEqual(list(ResumenDiarioPrenda.objects.values_list('dia', flat=True)), [timezone.localtime(otra.fecha).date()])
+
+    def test_reconstruir(self):
+        """Prueba que el comando reconstruye los mismos resúmenes que el worker"""
+        self.vender(1, Remeras=2, Buzos=1)
+        self.vender(5, Buzos=3)
+        procesar_pendientes()
+        esperado = self.estadisticas()
+
+        ResumenDiarioVenta.objects.all().delete()
+        ResumenDiarioPrenda.objects.all().delete()
+        call_command('reconstruir_resumenes', '--dias-por-lote', '2', stdout=StringIO())
+        self.assertEqual(self.estadisticas(), esperado)
+
+    def test_migracion_carga_ventas_existentes(self):
+        """Prueba que la migración de carga resume las ventas anteriores a las tablas"""
+        self.vender(2, Remeras=1)
+        self.vender(3, Buzos=2)
+        procesar_pendientes()
+        esperado = self.estadisticas()
+
+        ResumenDiarioVenta.objects.all().delete()
+        ResumenDiarioCategoria.objects.all().delete()
+        ResumenDiarioPrenda.objects.all().delete()
+        migracion = import_module('ventas.migrations.0007_cargar_resumenes_diarios')
+        executor = MigrationExecutor(connection)
+        estado = executor.loader.project_state(('ventas', '0007_cargar_resumenes_diarios'))
+        migracion.cargar_resumenes(estado.apps, None)
+        self.assertEqual(self.estadisticas(), esperado)
+
+class ExportacionTests(APITestCase):
+    """Pruebas para las exportaciones en streaming de ventas, items y devoluciones"""
+
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            email='test@example.com', password='testpassword', nombre='Test', apellido='User'
+        )
+        self.client.force_authenticate(user=usuario)
+        cliente = Cliente.objects.create(nombre='Ana', apellido='Pérez', numero_documento='30111222')
+        prenda = Prenda.objects.create(
+            nombre='Remera', categoria=Categoria.objects.create(nombre='Remeras'),
+            precio_costo=Decimal('1000'), precio_venta=Decimal('2000')
+        )
+        variante = VariantePrenda.objects.create(
+            prenda=prenda, talla=Talla.objects.create(nombre='2 años', orden=1),
+            color=Color.objects.create(nombre='Rojo', codigo_hex='#FF0000'), stock=20
+        )
+        notas = {'PAGADA': '=SUMA(A1)', 'PENDIENTE': '\t=1+1\x01'}
+        self.ventas = [
+            registrar_venta(
+                {'cliente': cliente, 'estado': estado, 'notas': notas.get(estado, '')},
+                [{'variante': variante, 'cantidad': 2, 'precio_unitario': Decimal('1500')}]
+            )
+            for estado in ('PAGADA', 'PENDIENTE', 'PAGADA')
+        ]
+        Devolucion.objects.create(venta=self.ventas[2], motivo='TALLA', monto_devuelto=Decimal('1500'))
+
+    def descargar(self, ruta, **parametros):
+        response = self.client.get(reverse(ruta), parametros)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def leer_csv(self, ruta, **parametros):
+        response, contenido = self.descargar(ruta, **parametros)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment;', response['Content-Disposition'])
+        return list(csv.reader(contenido.decode('utf-8-sig').splitlines()))
+
+    def test_ventas_csv_con_filtros(self):
+        """Prueba que la exportación de ventas respeta los filtros del listado"""
+        filas = self.leer_csv('venta-exportar', estado='PAGADA')
+        self.assertEqual(filas[0][:4], ['Número', 'Fecha', 'Punto de venta', 'Cliente'])
+        self.assertEqual(len(filas), 2)
+        fila = dict(zip(filas[0], filas[1]))
+        self.assertEqual(fila['Número'], self.ventas[0].numero)
+        self.assertEqual((fila['Cliente'], fila['Documento'], fila['Estado']), ('Ana Pérez', '30111222', 'Pagada'))
+        self.assertEqual((fila['Unidades'], fila['Total']), ('2', '3000.00'))
+        # Los textos que empiezan como fórmula se exportan como texto
+        self.assertEqual(fila['Notas'], "'=SUMA(A1)")
+        filas = self.leer_csv('venta-exportar', estado='PENDIENTE')
+        self.assertEqual(dict(zip(filas[0], filas[1]))['Notas'], "'\t=1+1\x01")
+
+    def test_items_y_devoluciones(self):
+        """Prueba las exportaciones de items (con prenda, talla y color) y de devoluciones"""
+        filas = self.leer_csv('venta-exportar-items', estado='PENDIENTE')
+        self.assertEqual(len(filas), 2)
+        fila = dict(zip(filas[0], filas[1]))
+        self.assertEqual(
+            (fila['Venta'], fila['Prenda'], fila['Categoría'], fila['Talla'], fila['Color'], fila['Subtotal']),
+            (self.ventas[1].numero, 'Remera', 'Remeras', '2 años', 'Rojo', '3000.00')
+        )
+
+        filas = self.leer_csv('devolucion-exportar', motivo='TALLA')
+        self.assertEqual(len(filas), 2)
+        fila = dict(zip(filas[0], filas[1]))
+        self.assertEqual((fila['Venta'], fila['Motivo'], fila['Cliente']), (self.ventas[2].numero, 'Talla incorrecta', 'Ana Pérez'))
+        self.assertEqual(len(self.leer_csv('devolucion-exportar', motivo='DEFECTO')), 1)
+
+    def test_xlsx(self):
+        """Prueba que el XLSX es un libro válido con una fila por venta y valores tipados"""
+        response, contenido = self.descargar('venta-exportar', formato='xlsx')
+        self.assertEqual(response['Content-Disposition'][-6:-1], '.xlsx')
+        with zipfile.ZipFile(BytesIO(contenido)) as libro:
+            self.assertIsNone(libro.testzip())
+            for nombre in libro.namelist():
+                ElementTree.fromstring(libro.read(nombre))
+            hoja = ElementTree.fromstring(libro.read('xl/worksheets/sheet1.xml'))
+        espacio = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        filas = hoja.findall(f'{espacio}sheetData/{espacio}row')
+        self.assertEqual(len(filas), 4)
+        celdas = filas[1].findall(f'{espacio}c')
+        self.assertEqual(celdas[1].get('s'), '1')  # Fecha con formato de fecha
+        self.assertEqual(celdas[12].find(f'{espacio}v').text, '3000.00')
+        # Sin los caracteres de control que XML 1.0 no admite
+        notas = [c.find(f'{espacio}is/{espacio}t') for fila in filas[1:] for c in fila.findall(f'{espacio}c')]
+        self.assertIn('\t=1+1', [t.text for t in notas if t is not None])
+
+        response = self.client.get(reverse('venta-exportar'), {'formato': 'pdf'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TicketsTests(APITestCase):
+    """Pruebas para los tickets imprimibles en PDF y texto"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        usuario = Usuario.objects.create_user(
+            email='test@example.com', password='testpassword', nombre='Test', apellido='User'
+        )
+        self.client.force_authenticate(user=usuario)
+        self.cliente = Cliente.objects.create(nombre='Ana', apellido='Pérez')
+        prenda = Prenda.objects.create(
+            nombre='Remera', categoria=Categoria.objects.create(nombre='Remeras'),
+            precio_costo=Decimal('1000'), precio_venta=Decimal('2000')
+        )
+        self.variante = VariantePrenda.objects.create(
+            prenda=prenda, talla=Talla.objects.create(nombre='2 años', orden=1),
+            color=Color.objects.create(nombre='Rojo', codigo_hex='#FF0000'), stock=50
+        )
+        self.venta = self.registrar(metodo_pago='EFECTIVO')
+        self.url = reverse('venta-ticket', args=[self.venta.pk])
+
+    def registrar(self, **datos):
+        return registrar_venta(
+            {'cliente': self.cliente, 'vendedor': 'Laura', **datos},
+            [{'variante': self.variante, 'cantidad': 2, 'precio_unitario': Decimal('12500'),
+              'descuento_item': Decimal('500')}]
+        )
+
+    def test_ticket_texto(self):
+        """Prueba el ticket de ancho fijo con encabezado, items, totales y el contenido del QR"""
+        response = self.client.get(self.url, {'formato': 'texto'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Ticket-QR'], qr.contenido(self.venta))
+        lineas = response.content.decode('utf-8').splitlines()
+        self.assertEqual(lineas[0].strip(), 'San Pedrito')
+        self.assertTrue(all(len(linea) <= 42 for linea in lineas))
+        texto = '\n'.join(lineas)
+        self.assertIn(self.venta.numero, texto)
+        self.assertIn('Ana Pérez', texto)
+        self.assertIn('Remera 2 años Rojo', texto)
+        self.assertIn('2 x $ 12.500', texto)
+        self.assertRegex(texto, r'TOTAL +\$ 24\.500')
+
+    def test_ticket_pdf_y_cache(self):
+        """Prueba el PDF, que la página se dibuja una vez y que el ETag responde 304"""
+        with patch.object(tickets, 'renderizar_pagina', wraps=tickets.renderizar_pagina) as renderizar:
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            self.assertTrue(response.content.startswith(b'%PDF'))
+            self.client.get(self.url)
+            self.assertEqual(renderizar.call_count, 1)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(self.url, {'formato': 'html'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_clave_cambia_con_el_contenido(self):
+        """Prueba que el hash cambia al cambiar el estado o los items de la venta"""
+        etag = self.client.get(self.url)['ETag']
+        self.venta.estado = 'ANULADA'
+        self.venta.save()
+        etag_anulada = self.client.get(self.url)['ETag']
+        self.assertNotEqual(etag, etag_anulada)
+
+        item = self.venta.items.get()
+        item.cantidad = 3
+        item.save()
+        self.assertNotEqual(self.client.get(self.url)['ETag'], etag_anulada)
+
+    def test_tickets_del_dia(self):
+        """Prueba la reimpresión de los tickets de un día en orden, con un PDF de una página por venta"""
+        segunda = self.registrar()
+        Venta.objects.filter(pk=segunda.pk).update(fecha=self.venta.fecha + timedelta(minutes=5))
+        anterior = self.registrar()
+        Venta.objects.filter(pk=anterior.pk).update(fecha=self.venta.fecha - timedelta(days=1))
+        dia = timezone.localtime(self.venta.fecha).date()
+
+        with self.assertNumQueries(2):  # Ventas con su cliente e items con prenda, talla y color
+            response = self.client.get(reverse('venta-tickets'), {'fecha': str(dia), 'formato': 'texto'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        textos = response.content.decode('utf-8').split('\f')
+        self.assertEqual(len(textos), 2)
+        self.assertIn(self.venta.numero, textos[0])
+        self.assertIn(segunda.numero, textos[1])
+
+        response = self.client.get(reverse('venta-tickets'), {'fecha': str(dia)})
+        self.assertEqual(response.content.count(b'/Type /Page\n'), 2)
+
+        response = self.client.get(reverse('venta-tickets'), {'fecha': 'ayer'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('venta-tickets'), {'fecha': str(dia + timedelta(days=1))})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,224 @@
+"""
+Tickets de venta para imprimir: PDF (una página de 80 mm por ticket) y texto plano de
+ancho fijo para impresoras térmicas ESC/POS.
+
+Los dos formatos salen de la misma lista de renglones (encabezado del comercio, datos
+de la venta, items, totales y pie). El PDF además lleva el QR de la venta; en el texto
+el QR no se puede dibujar, así que la vista envía su contenido en un encabezado para
+que el cliente de impresión lo imprima con el comando QR de la impresora.
+
+Cada página dibujada se guarda en la cache de Django con el hash de los datos del
+ticket (y VERSION): si cambian los items, el estado o los totales, cambia la clave y
+la página vieja deja de usarse hasta vencer. El mismo hash es el ETag de la respuesta.
+"""
+import hashlib
+import json
+import textwrap
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from io import BytesIO
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.utils import timezone
+from PIL import Image, ImageDraw, ImageFont
+from prendas.etiquetas import formatear_precio
+from . import qr
+from .models import ItemVenta
+
+FORMATOS = {
+    'pdf': 'application/pdf',
+    'texto': 'text/plain; charset=utf-8',
+}
+EXTENSIONES = {'pdf': 'pdf', 'texto': 'txt'}
+VERSION = 1  # Cambiarla cuando cambia el diseño para no usar páginas viejas de la cache
+MAXIMO_TICKETS = 1000
+
+DPI = 203  # Resolución habitual de las impresoras térmicas
+ANCHO = 576  # 72 mm imprimibles de un rollo de 80 mm
+MARGEN = 12
+LADO_QR = 260
+
+
+def columnas():
+    return getattr(settings, 'TICKETS_COLUMNAS', 42)
+
+
+def cargar(ventas):
+    """Queryset de ventas con el cliente y los items (con prenda, talla y color) en 2 consultas"""
+    return ventas.select_related('cliente').prefetch_related(Prefetch(
+        'items', queryset=ItemVenta.objects.select_related('variante__prenda', 'variante__talla', 'variante__color')
+    ))
+
+
+def ventas_del_dia(ventas, dia):
+    """Filtra las ventas de un día (zona horaria del sistema) en orden de emisión"""
+    inicio = timezone.make_aware(datetime.combine(dia, time.min))
+    fin = timezone.make_aware(datetime.combine(dia + timedelta(days=1), time.min))
+    return ventas.filter(fecha__gte=inicio, fecha__lt=fin).order_by('fecha', 'numero')
+
+
+def datos_ticket(venta):
+    """Contenido del ticket: todo lo que se imprime, en valores simples"""
+    return {
+        'comercio': getattr(settings, 'TICKETS_COMERCIO', 'San Pedrito'),
+        'pie': getattr(settings, 'TICKETS_PIE', 'Gracias por su compra'),
+        'numero': venta.numero,
+        'fecha': timezone.localtime(venta.fecha).strftime('%d/%m/%Y %H:%M'),
+        'cliente': venta.cliente.nombre_completo,
+        'vendedor': venta.vendedor or '',
+        'metodo_pago': venta.get_metodo_pago_display(),
+        'estado': venta.get_estado_display(),
+        'items': [
+            {
+                'descripcion': f"{item.variante.prenda.nombre} {item.variante.talla.nombre} {item.variante.color.nombre}",
+                'cantidad': item.cantidad,
+                'precio_unitario': str(item.precio_unitario),
+                'descuento': str(item.descuento_item),
+                'subtotal': str(item.subtotal),
+            }
+            for item in venta.items.all()
+        ],
+        'subtotal': str(venta.subtotal),
+        'descuento': str(venta.descuento),
+        'impuestos': str(venta.impuestos),
+        'total': str(venta.total),
+        'qr': qr.contenido(venta),
+    }
+
+
+def clave_ticket(datos):
+    """Hash del contenido del ticket: si cambia algún dato o el diseño, cambia la clave"""
+    contenido = json.dumps([VERSION, datos], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def _renglones(datos):
+    """Renglones del ticket: (tipo, izquierda, derecha)"""
+    renglones = [('titulo', datos['comercio'], ''), ('separador', '', '')]
+    renglones.append(('par', 'Venta', datos['numero']))
+    renglones.append(('par', 'Fecha', datos['fecha']))
+    renglones.append(('par', 'Cliente', datos['cliente']))
+    if datos['vendedor']:
+        renglones.append(('par', 'Vendedor', datos['vendedor']))
+    renglones.append(('separador', '', ''))
+    for item in datos['items']:
+        renglones.append(('texto', item['descripcion'], ''))
+        renglones.append((
+            'par', f"  {item['cantidad']} x {formatear_precio(item['precio_unitario'])}",
+            formatear_precio(item['subtotal'])
+        ))
+        if float(item['descuento']):
+            renglones.append(('par', '  Descuento', f"-{formatear_precio(item['descuento'])}"))
+    renglones.append(('separador', '', ''))
+    renglones.append(('par', 'Subtotal', formatear_precio(datos['subtotal'])))
+    if float(datos['descuento']):
+        renglones.append(('par', 'Descuento', f"-{formatear_precio(datos['descuento'])}"))
+    if float(datos['impuestos']):
+        renglones.append(('par', 'Impuestos', formatear_precio(datos['impuestos'])))
+    renglones.append(('total', 'TOTAL', formatear_precio(datos['total'])))
+    renglones.append(('par', 'Pago', datos['metodo_pago']))
+    renglones.append(('par', 'Estado', datos['estado']))
+    renglones.append(('separador', '', ''))
+    renglones.append(('qr', datos['qr'], ''))
+    renglones.append(('centro', datos['pie'], ''))
+    return renglones
+
+
+def texto_ticket(datos, ancho=None):
+    """Ticket en texto plano de ancho fijo (por defecto TICKETS_COLUMNAS caracteres)"""
+    ancho = ancho or columnas()
+    lineas = []
+    for tipo, izquierda, derecha in _renglones(datos):
+        if tipo == 'separador':
+            lineas.append('-' * ancho)
+        elif tipo in ('titulo', 'centro'):
+            lineas.extend(linea.center(ancho).rstrip() for linea in textwrap.wrap(izquierda, ancho))
+        elif tipo == 'texto':
+            lineas.extend(textwrap.wrap(izquierda, ancho))
+        elif tipo in ('par', 'total'):
+            disponible = ancho - len(derecha) - 1
+            if len(izquierda) > disponible:
+                izquierda = izquierda[:max(disponible - 1, 0)] + '…'
+            lineas.append(f"{izquierda:<{disponible}} {derecha}")
+    return '\n'.join(lineas) + '\n'
+
+
+@lru_cache(maxsize=None)
+def _fuente(tamano):
+    return ImageFont.load_default(size=tamano)
+
+
+def _pegar_qr(pagina, texto, y):
+    imagen = Image.open(BytesIO(qr.renderizar(texto, 'png')))
+    modulos = imagen.size[0] // 10  # renderizar usa 10 pixeles por módulo
+    imagen = imagen.resize((modulos, modulos), Image.NEAREST)
+    escala = max(1, LADO_QR // modulos)
+    imagen = imagen.resize((modulos * escala, modulos * escala), Image.NEAREST)
+    pagina.paste(imagen, ((ANCHO - imagen.size[0]) // 2, y))
+    return imagen.size[1]
+
+
+def renderizar_pagina(datos):
+    """Dibuja el ticket y retorna el PNG de la página (blanco y negro, ANCHO pixeles)"""
+    normal, grande = _fuente(22), _fuente(30)
+    disponible = ANCHO - 2 * MARGEN
+    # Alto máximo posible; al final se recorta a lo usado
+    pagina = Image.new('L', (ANCHO, 40 * (len(_renglones(datos)) + 2 * len(datos['items'])) + LADO_QR + 200), 255)
+    dibujo = ImageDraw.Draw(pagina)
+    y = MARGEN
+    for tipo, izquierda, derecha in _renglones(datos):
+        fuente = grande if tipo in ('titulo', 'total') else normal
+        if tipo == 'separador':
+            dibujo.line((MARGEN, y + 10, ANCHO - MARGEN, y + 10), fill=0, width=2)
+            y += 22
+        elif tipo == 'qr':
+            y += _pegar_qr(pagina, izquierda, y + 8) + 16
+        elif tipo in ('titulo', 'centro', 'texto'):
+            palabras = izquierda.split()
+            while palabras:
+                linea = palabras.pop(0)
+                while palabras and dibujo.textlength(f"{linea} {palabras[0]}", font=fuente) <= disponible:
+                    linea = f"{linea} {palabras.pop(0)}"
+                x = MARGEN if tipo == 'texto' else (ANCHO - dibujo.textlength(linea, font=fuente)) // 2
+                dibujo.text((x, y), linea, font=fuente, fill=0)
+                y += fuente.size + 8
+        else:
+            ancho_derecha = dibujo.textlength(derecha, font=fuente)
+            dibujo.text((ANCHO - MARGEN - ancho_derecha, y), derecha, font=fuente, fill=0)
+            while izquierda and dibujo.textlength(izquierda, font=fuente) > disponible - ancho_derecha - MARGEN:
+                izquierda = izquierda[:-1]
+            dibujo.text((MARGEN, y), izquierda, font=fuente, fill=0)
+            y += fuente.size + 8
+
+    pagina = pagina.crop((0, 0, ANCHO, y + MARGEN)).convert('1', dither=Image.Dither.NONE)
+    salida = BytesIO()
+    pagina.save(salida, 'PNG', optimize=True, dpi=(DPI, DPI))
+    return salida.getvalue()
+
+
+def pagina_ticket(datos, clave=None):
+    """PNG de la página del ticket, desde la cache si ya se dibujó"""
+    clave = clave or clave_ticket(datos)
+    nombre = f'ventas:ticket:{clave}'
+    pagina = cache.get(nombre)
+    if pagina is None:
+        pagina = renderizar_pagina(datos)
+        cache.set(nombre, pagina, getattr(settings, 'TICKETS_CACHE_SEGUNDOS', 7 * 24 * 3600))
+    return pagina
+
+
+def pdf_tickets(lista_datos):
+    """PDF con una página por ticket, en el orden de la lista"""
+    paginas = [Image.open(BytesIO(pagina_ticket(datos))) for datos in lista_datos]
+    salida = BytesIO()
+    paginas[0].save(salida, 'PDF', save_all=True, append_images=paginas[1:], resolution=DPI)
+    return salida.getvalue()
+
+
+def tickets(lista_datos, formato):
+    """Archivo con los tickets en el formato indicado ('pdf' o 'texto')"""
+    if formato == 'pdf':
+        return pdf_tickets(lista_datos)
+    # En el texto, una línea en blanco y un salto de página entre tickets
+    return '\n\f'.join(texto_ticket(datos) for datos in lista_datos).encode('utf-8')
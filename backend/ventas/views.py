@@ -3,9 +3,11 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Sum, Count
+from django.db.models import Q
+from django.http import HttpResponse
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.cache import patch_cache_control
+from datetime import datetime, timedelta
 from .models import Venta, ItemVenta, Devolucion, ItemDevolucion
 from .serializers import (
     VentaListSerializer,
@@ -17,8 +19,24 @@ from .serializers import (
     DevolucionCreateSerializer
 )
 from .filters import VentaFilter, DevolucionFilter
+from . import exportacion, qr, resumenes, tickets
+from prendas.referencias import etag_coincide
+from san_pedrito.exportacion import FORMATOS as FORMATOS_EXPORTACION, respuesta_exportacion
+from san_pedrito.paginacion import PaginacionSeleccionable
+from san_pedrito.campos import CamposDinamicosViewMixin
+from san_pedrito.lectura import ListadoRapidoMixin
 
-class VentaViewSet(viewsets.ModelViewSet):
+def _exportar(request, nombre, columnas, queryset, hoja):
+    """Respuesta en streaming con el archivo en el formato de ?formato= (csv por defecto)"""
+    formato = request.query_params.get('formato', 'csv')
+    if formato not in FORMATOS_EXPORTACION:
+        return Response(
+            {'error': f"Formato inválido. Opciones: {', '.join(FORMATOS_EXPORTACION)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return respuesta_exportacion(f"{nombre}-{timezone.localdate()}", formato, columnas, queryset, hoja)
+
+class VentaViewSet(ListadoRapidoMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar ventas"""
     queryset = Venta.objects.all()
     permission_classes = [IsAuthenticated]
@@ -27,6 +45,8 @@ class VentaViewSet(viewsets.ModelViewSet):
     search_fields = ['numero', 'cliente__nombre', 'cliente__apellido', 'notas']
     ordering_fields = ['fecha', 'total', 'estado']
     ordering = ['-fecha']
+    pagination_class = PaginacionSeleccionable
+    orden_cursor = ('-fecha', '-id')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -39,6 +59,16 @@ class VentaViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         queryset = Venta.objects.all()
+        if self.action == 'list':
+            # Las cantidades están en la venta: del cliente solo hace falta el nombre
+            queryset = queryset.select_related('cliente').only(
+                'id', 'numero', 'cliente', 'cliente__nombre', 'cliente__apellido', 'fecha',
+                'total', 'estado', 'metodo_pago', 'cantidad_items', 'cantidad_lineas'
+            )
+        elif self.action == 'qr':
+            queryset = queryset.only(*qr.CAMPOS)
+        elif self.action in ('retrieve', 'ticket'):
+            queryset = tickets.cargar(queryset)
         
         # Filtrar por cliente
         cliente_id = self.request.query_params.get('cliente_id', None)
@@ -76,62 +106,13 @@ class VentaViewSet(viewsets.ModelViewSet):
             from datetime import datetime
             fecha_inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
         
-        # Filtrar ventas por fecha
-        ventas = Venta.objects.filter(
-            fecha__date__gte=fecha_inicio,
-            fecha__date__lte=fecha_fin,
-            estado='PAGADA'  # Solo ventas pagadas
-        )
-        
-        # Calcular estadísticas
-        total_ventas = ventas.count()
-        monto_total = ventas.aggregate(total=Sum('total'))['total'] or 0
-        
-        # Ventas por categoría
-        from django.db.models import F
-        ventas_por_categoria = ItemVenta.objects.filter(
-            venta__in=ventas
-        ).values(
-            categoria=F('variante__prenda__categoria__nombre')
-        ).annotate(
-            cantidad=Sum('cantidad'),
-            monto=Sum('subtotal')
-        ).order_by('-monto')
-        
-        # Productos más vendidos
-        productos_mas_vendidos = ItemVenta.objects.filter(
-            venta__in=ventas
-        ).values(
-            'variante__prenda__id',
-            'variante__prenda__nombre',
-            'variante__prenda__codigo'
-        ).annotate(
-            cantidad=Sum('cantidad'),
-            monto=Sum('subtotal')
-        ).order_by('-cantidad')[:10]
-        
-        # Ventas por día
-        from django.db.models.functions import TruncDate
-        ventas_por_dia = ventas.annotate(
-            dia=TruncDate('fecha')
-        ).values('dia').annotate(
-            cantidad=Count('id'),
-            monto=Sum('total')
-        ).order_by('dia')
-        
+        # Sumar los resúmenes diarios del rango (ver ventas.resumenes)
         return Response({
             'periodo': {
                 'fecha_inicio': fecha_inicio,
                 'fecha_fin': fecha_fin,
             },
-            'resumen': {
-                'total_ventas': total_ventas,
-                'monto_total': monto_total,
-                'ticket_promedio': monto_total / total_ventas if total_ventas > 0 else 0,
-            },
-            'ventas_por_categoria': ventas_por_categoria,
-            'productos_mas_vendidos': productos_mas_vendidos,
-            'ventas_por_dia': ventas_por_dia,
+            **resumenes.estadisticas(fecha_inicio, fecha_fin),
         })
     
     @action(detail=True, methods=['get'])
@@ -149,8 +130,96 @@ class VentaViewSet(viewsets.ModelViewSet):
         devoluciones = Devolucion.objects.filter(venta=venta)
         serializer = DevolucionSerializer(devoluciones, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """Endpoint para exportar las ventas filtradas (?formato=csv|xlsx), en streaming"""
+        ventas = exportacion.ventas(self.filter_queryset(self.get_queryset()))
+        return _exportar(request, 'ventas', exportacion.COLUMNAS_VENTAS, ventas, 'Ventas')
+    
+    @action(detail=False, methods=['get'], url_path='exportar-items')
+    def exportar_items(self, request):
+        """Endpoint para exportar los items de las ventas filtradas con su prenda, talla y color"""
+        ventas = self.filter_queryset(self.get_queryset())
+        items = ItemVenta.objects.filter(venta__in=ventas.order_by().values('pk')).order_by('-venta__fecha', 'venta_id', 'id')
+        return _exportar(request, 'items-venta', exportacion.COLUMNAS_ITEMS, items, 'Items')
+    
+    @action(detail=True, methods=['get'])
+    def qr(self, request, pk=None):
+        """Endpoint para obtener el código QR del ticket (?formato=svg|png)"""
+        formato = request.query_params.get('formato', 'svg')
+        if formato not in qr.FORMATOS:
+            return Response(
+                {'error': f"Formato inválido. Opciones: {', '.join(qr.FORMATOS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        venta = self.get_object()
+        version = qr.version(venta)
+        valor_etag = f'"qr-{version}-{formato}"'
+        if etag_coincide(request, valor_etag):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(qr.qr_venta(venta, formato), content_type=qr.FORMATOS[formato])
+        response['ETag'] = valor_etag
+        if request.query_params.get('v') == version:
+            # La URL versionada siempre tiene el mismo contenido
+            patch_cache_control(response, private=True, max_age=365 * 24 * 3600, immutable=True)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @action(detail=True, methods=['get'])
+    def ticket(self, request, pk=None):
+        """Endpoint para obtener el ticket imprimible de la venta (?formato=pdf|texto)"""
+        formato = request.query_params.get('formato', 'pdf')
+        if formato not in tickets.FORMATOS:
+            return Response(
+                {'error': f"Formato inválido. Opciones: {', '.join(tickets.FORMATOS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        datos = tickets.datos_ticket(self.get_object())
+        clave = tickets.clave_ticket(datos)
+        valor_etag = f'"ticket-{clave}-{formato}"'
+        if etag_coincide(request, valor_etag):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(tickets.tickets([datos], formato), content_type=tickets.FORMATOS[formato])
+            response['Content-Disposition'] = f'inline; filename="ticket-{datos["numero"]}.{tickets.EXTENSIONES[formato]}"'
+        response['ETag'] = valor_etag
+        # El texto no lleva el QR dibujado: el cliente de impresión lo imprime con este contenido
+        response['X-Ticket-QR'] = datos['qr']
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def tickets(self, request):
+        """Endpoint para reimprimir los tickets de un día (?fecha=AAAA-MM-DD&formato=pdf|texto)"""
+        formato = request.query_params.get('formato', 'pdf')
+        if formato not in tickets.FORMATOS:
+            return Response(
+                {'error': f"Formato inválido. Opciones: {', '.join(tickets.FORMATOS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            dia = datetime.strptime(request.query_params.get('fecha', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'error': 'Fecha inválida (AAAA-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        ventas = tickets.ventas_del_dia(self.filter_queryset(self.get_queryset()), dia)
+        ventas = list(tickets.cargar(ventas)[:tickets.MAXIMO_TICKETS + 1])
+        if not ventas:
+            return Response({'error': 'No hay ventas en esa fecha'}, status=status.HTTP_404_NOT_FOUND)
+        if len(ventas) > tickets.MAXIMO_TICKETS:
+            return Response(
+                {'error': f"Demasiados tickets (máximo {tickets.MAXIMO_TICKETS}); filtre las ventas del día"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        lista_datos = [tickets.datos_ticket(venta) for venta in ventas]
+        response = HttpResponse(tickets.tickets(lista_datos, formato), content_type=tickets.FORMATOS[formato])
+        response['Content-Disposition'] = f'inline; filename="tickets-{dia}.{tickets.EXTENSIONES[formato]}"'
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
-class DevolucionViewSet(viewsets.ModelViewSet):
+class DevolucionViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar devoluciones"""
     queryset = Devolucion.objects.all()
     permission_classes = [IsAuthenticated]
@@ -164,6 +233,12 @@ class DevolucionViewSet(viewsets.ModelViewSet):
             return DevolucionCreateSerializer
         return DevolucionSerializer
     
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """Endpoint para exportar las devoluciones filtradas (?formato=csv|xlsx), en streaming"""
+        devoluciones = exportacion.devoluciones(self.filter_queryset(self.get_queryset()))
+        return _exportar(request, 'devoluciones', exportacion.COLUMNAS_DEVOLUCIONES, devoluciones, 'Devoluciones')
+    
     def get_serializer_context(self):
         context = super().get_serializer_context()
         if self.request.data.get('venta'):